@@ -110,6 +110,11 @@ def run_infer_script(
     delay_feedback: float = 0.0,
     delay_mix: float = 0.5,
     sid: int = 0,
+    f0_autotune_scale: str = "chromatic",
+    quantize: bool = False,
+    backend: str = "torch",
+    onnx_threads: int = 0,
+    embedding_disk_cache: bool = False,
 ):
     kwargs = {
         "audio_input_path": input_path,
@@ -173,8 +178,12 @@ def run_infer_script(
         "delay_feedback": delay_feedback,
         "delay_mix": delay_mix,
         "sid": sid,
+        "f0_autotune_scale": f0_autotune_scale,
     }
     infer_pipeline = import_voice_converter()
+    infer_pipeline.set_quantize(quantize)
+    infer_pipeline.set_backend(backend, onnx_threads)
+    infer_pipeline.set_embedding_disk_cache(embedding_disk_cache)
     infer_pipeline.convert_audio(
         **kwargs,
     )
@@ -244,6 +253,14 @@ def run_batch_infer_script(
     delay_feedback: float = 0.0,
     delay_mix: float = 0.5,
     sid: int = 0,
+    f0_autotune_scale: str = "chromatic",
+    quantize: bool = False,
+    backend: str = "torch",
+    onnx_threads: int = 0,
+    embedding_disk_cache: bool = False,
+    decode_workers: int = 2,
+    encode_workers: int = 2,
+    workers: int = 1,
 ):
     kwargs = {
         "audio_input_paths": input_folder,
@@ -307,8 +324,15 @@ def run_batch_infer_script(
         "delay_feedback": delay_feedback,
         "delay_mix": delay_mix,
         "sid": sid,
+        "f0_autotune_scale": f0_autotune_scale,
+        "decode_workers": decode_workers,
+        "encode_workers": encode_workers,
+        "workers": workers,
     }
     infer_pipeline = import_voice_converter()
+    infer_pipeline.set_quantize(quantize)
+    infer_pipeline.set_backend(backend, onnx_threads)
+    infer_pipeline.set_embedding_disk_cache(embedding_disk_cache)
     infer_pipeline.convert_audio_batch(
         **kwargs,
     )
@@ -316,6 +340,105 @@ def run_batch_infer_script(
     return f"Files from {input_folder} inferred successfully."
 
 
+# Multi-model infer
+def run_multi_infer_script(
+    pitch: int,
+    index_rate: float,
+    volume_envelope: int,
+    protect: float,
+    hop_length: int,
+    f0_method: str,
+    input_path: str,
+    output_folder: str,
+    pth_paths: list,
+    index_paths: list,
+    split_audio: bool,
+    f0_autotune: bool,
+    f0_autotune_strength: float,
+    clean_audio: bool,
+    clean_strength: float,
+    export_format: str,
+    f0_file: str,
+    embedder_model: str,
+    embedder_model_custom: str = None,
+    formant_shifting: bool = False,
+    formant_qfrency: float = 1.0,
+    formant_timbre: float = 1.0,
+    sid: int = 0,
+    f0_autotune_scale: str = "chromatic",
+    quantize: bool = False,
+    backend: str = "torch",
+    onnx_threads: int = 0,
+    embedding_disk_cache: bool = False,
+):
+    kwargs = {
+        "audio_input_path": input_path,
+        "audio_output_path": output_folder,
+        "model_paths": pth_paths,
+        "index_paths": index_paths,
+        "pitch": pitch,
+        "index_rate": index_rate,
+        "volume_envelope": volume_envelope,
+        "protect": protect,
+        "hop_length": hop_length,
+        "f0_method": f0_method,
+        "split_audio": split_audio,
+        "f0_autotune": f0_autotune,
+        "f0_autotune_strength": f0_autotune_strength,
+        "clean_audio": clean_audio,
+        "clean_strength": clean_strength,
+        "export_format": export_format,
+        "f0_file": f0_file,
+        "embedder_model": embedder_model,
+        "embedder_model_custom": embedder_model_custom,
+        "formant_shifting": formant_shifting,
+        "formant_qfrency": formant_qfrency,
+        "formant_timbre": formant_timbre,
+        "sid": sid,
+        "f0_autotune_scale": f0_autotune_scale,
+    }
+    infer_pipeline = import_voice_converter()
+    infer_pipeline.set_quantize(quantize)
+    infer_pipeline.set_backend(backend, onnx_threads)
+    infer_pipeline.set_embedding_disk_cache(embedding_disk_cache)
+    outputs = infer_pipeline.convert_audio_multi(
+        **kwargs,
+    )
+
+    return (
+        f"File {input_path} inferred successfully with {len(outputs)} models.",
+        outputs,
+    )
+
+
+# Inference server
+def run_serve_script(
+    host: str = "127.0.0.1",
+    port: int = 6970,
+    max_batch_size: int = 4,
+    max_wait_ms: float = 50,
+    max_queue: int = 32,
+    quantize: bool = False,
+    backend: str = "torch",
+    onnx_threads: int = 0,
+    audio_root: str = os.path.join("assets", "audios"),
+):
+    from rvc.infer.server import serve
+
+    infer_pipeline = import_voice_converter()
+    infer_pipeline.set_quantize(quantize)
+    infer_pipeline.set_backend(backend, onnx_threads)
+    serve(
+        host,
+        port,
+        max_batch_size,
+        max_wait_ms,
+        max_queue,
+        infer_pipeline,
+        audio_root,
+    )
+
+
 # TTS
 def run_tts_script(
     tts_file: str,
@@ -404,14 +527,16 @@ def run_tts_script(
         delay=None,
         sliders=None,
     )
-    
+
     edge_tts_file = output_tts_path
     final_rvc_file = output_rvc_path.replace(".wav", f".{export_format.lower()}")
     return (
         f"Text {tts_text} synthesized successfully.",  # vc_output1
-        edge_tts_file,                                  # vc_output3
-        final_rvc_file                                  # vc_output2
+        edge_tts_file,  # vc_output3
+        final_rvc_file,  # vc_output2
     )
+
+
 # Preprocess
 def run_preprocess_script(
     model_name: str,
@@ -558,13 +683,22 @@ def run_train_script(
 
 
 # Index
-def run_index_script(model_name: str, index_algorithm: str):
+def run_index_script(
+    model_name: str,
+    index_algorithm: str,
+    index_memory_mb: int = 3072,
+    index_rebuild: bool = False,
+    index_evaluate: bool = True,
+):
     index_script_path = os.path.join("rvc", "train", "process", "extract_index.py")
     command = [
         python,
         index_script_path,
         os.path.join(logs_path, model_name),
         index_algorithm,
+        str(index_memory_mb),
+        str(index_rebuild),
+        str(index_evaluate),
     ]
 
     subprocess.run(command)
@@ -577,6 +711,14 @@ def run_model_information_script(pth_path: str):
     return model_information(pth_path)
 
 
+# Optimize model
+def run_optimize_model_script(pth_path: str, output_path: str = None):
+    from rvc.infer.optimized_model import export_optimized_model
+
+    output_path = export_optimized_model(pth_path, output_path)
+    return f"Model {pth_path} optimized successfully.", output_path
+
+
 # Model blender
 def run_model_blender_script(
     model_name: str, pth_path_1: str, pth_path_2: str, ratio: float
@@ -736,6 +878,44 @@ def parse_arguments():
         choices=[(i / 10) for i in range(11)],
         default=1.0,
     )
+    f0_autotune_scale_description = "Restrict the autotune to the notes of a scale, e.g. 'chromatic', 'A minor' or 'F# pentatonic_major'. Available scales: chromatic, major, minor, harmonic_minor, pentatonic_major, pentatonic_minor and blues."
+    infer_parser.add_argument(
+        "--f0_autotune_scale",
+        type=str,
+        help=f0_autotune_scale_description,
+        default="chromatic",
+    )
+    quantize_description = "Run the voice model and the embedder with dynamic INT8 quantization. CPU only; the quantized voice model is cached next to the .pth file as .int8.pt."
+    infer_parser.add_argument(
+        "--quantize",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=quantize_description,
+        default=False,
+    )
+    backend_description = "Runtime of the voice model, the embedder and RMVPE. onnx exports them once to logs/cache/onnx and runs them through onnxruntime on the CPU; requires onnxruntime and does not support time stretching."
+    infer_parser.add_argument(
+        "--backend",
+        type=str,
+        choices=["torch", "onnx"],
+        help=backend_description,
+        default="torch",
+    )
+    onnx_threads_description = "Intra-op threads of onnxruntime for the onnx backend. 0 uses every physical core."
+    infer_parser.add_argument(
+        "--onnx_threads",
+        type=int,
+        help=onnx_threads_description,
+        default=0,
+    )
+    embedding_disk_cache_description = "Also keep the embedder outputs in logs/cache/embeddings (up to 2 GB), so converting the same input again in a later run skips the embedder."
+    infer_parser.add_argument(
+        "--embedding_disk_cache",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=embedding_disk_cache_description,
+        default=False,
+    )
     clean_audio_description = "Clean the output audio using noise reduction algorithms. Recommended for speech conversions."
     infer_parser.add_argument(
         "--clean_audio",
@@ -1236,6 +1416,24 @@ def parse_arguments():
         help=split_audio_description,
         default=False,
     )
+    batch_infer_parser.add_argument(
+        "--decode_workers",
+        type=int,
+        help="Threads loading and resampling the next input files while the current one is converted.",
+        default=2,
+    )
+    batch_infer_parser.add_argument(
+        "--encode_workers",
+        type=int,
+        help="Threads post-processing and writing the converted files while the next one is converted.",
+        default=2,
+    )
+    batch_infer_parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes converting the files in parallel, each pinned to its share of the CPU cores with one torch thread per core. Files are handed out longest first.",
+        default=1,
+    )
     batch_infer_parser.add_argument(
         "--f0_autotune",
         type=lambda x: bool(strtobool(x)),
@@ -1250,6 +1448,39 @@ def parse_arguments():
         choices=[(i / 10) for i in range(11)],
         default=1.0,
     )
+    batch_infer_parser.add_argument(
+        "--f0_autotune_scale",
+        type=str,
+        help=f0_autotune_scale_description,
+        default="chromatic",
+    )
+    batch_infer_parser.add_argument(
+        "--quantize",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=quantize_description,
+        default=False,
+    )
+    batch_infer_parser.add_argument(
+        "--backend",
+        type=str,
+        choices=["torch", "onnx"],
+        help=backend_description,
+        default="torch",
+    )
+    batch_infer_parser.add_argument(
+        "--onnx_threads",
+        type=int,
+        help=onnx_threads_description,
+        default=0,
+    )
+    batch_infer_parser.add_argument(
+        "--embedding_disk_cache",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=embedding_disk_cache_description,
+        default=False,
+    )
     batch_infer_parser.add_argument(
         "--clean_audio",
         type=lambda x: bool(strtobool(x)),
@@ -1618,6 +1849,277 @@ def parse_arguments():
         required=False,
     )
 
+    # Parser for 'multi_infer' mode
+    multi_infer_parser = subparsers.add_parser(
+        "multi_infer",
+        help="Run inference of one audio file with several models",
+    )
+    multi_infer_parser.add_argument(
+        "--pitch",
+        type=int,
+        help=pitch_description,
+        choices=range(-24, 25),
+        default=0,
+    )
+    multi_infer_parser.add_argument(
+        "--index_rate",
+        type=float,
+        help=index_rate_description,
+        choices=[i / 100.0 for i in range(0, 101)],
+        default=0.3,
+    )
+    multi_infer_parser.add_argument(
+        "--volume_envelope",
+        type=float,
+        help=volume_envelope_description,
+        choices=[i / 100.0 for i in range(0, 101)],
+        default=1,
+    )
+    multi_infer_parser.add_argument(
+        "--protect",
+        type=float,
+        help=protect_description,
+        choices=[i / 1000.0 for i in range(0, 501)],
+        default=0.33,
+    )
+    multi_infer_parser.add_argument(
+        "--hop_length",
+        type=int,
+        help=hop_length_description,
+        choices=range(1, 513),
+        default=128,
+    )
+    multi_infer_parser.add_argument(
+        "--f0_method",
+        type=str,
+        help=f0_method_description,
+        choices=[
+            "crepe",
+            "crepe-tiny",
+            "rmvpe",
+            "fcpe",
+            "hybrid[crepe+rmvpe]",
+            "hybrid[crepe+fcpe]",
+            "hybrid[rmvpe+fcpe]",
+            "hybrid[crepe+rmvpe+fcpe]",
+        ],
+        default="rmvpe",
+    )
+    multi_infer_parser.add_argument(
+        "--input_path",
+        type=str,
+        help="Full path to the input audio file.",
+        required=True,
+    )
+    multi_infer_parser.add_argument(
+        "--output_folder",
+        type=str,
+        help="Folder for the output audio files, one per model, named '<input>_<model>'.",
+        required=True,
+    )
+    multi_infer_parser.add_argument(
+        "--pth_paths",
+        type=str,
+        nargs="+",
+        help="Full paths to the RVC model files (.pth).",
+        required=True,
+    )
+    multi_infer_parser.add_argument(
+        "--index_paths",
+        type=str,
+        nargs="*",
+        help="Full paths to the index files (.index), in the same order as --pth_paths. Missing entries disable retrieval for those models.",
+        default=[],
+    )
+    multi_infer_parser.add_argument(
+        "--split_audio",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=split_audio_description,
+        default=False,
+    )
+    multi_infer_parser.add_argument(
+        "--f0_autotune",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=f0_autotune_description,
+        default=False,
+    )
+    multi_infer_parser.add_argument(
+        "--f0_autotune_strength",
+        type=float,
+        help=f0_autotune_strength_description,
+        choices=[(i / 10) for i in range(11)],
+        default=1.0,
+    )
+    multi_infer_parser.add_argument(
+        "--f0_autotune_scale",
+        type=str,
+        help=f0_autotune_scale_description,
+        default="chromatic",
+    )
+    multi_infer_parser.add_argument(
+        "--quantize",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=quantize_description,
+        default=False,
+    )
+    multi_infer_parser.add_argument(
+        "--backend",
+        type=str,
+        choices=["torch", "onnx"],
+        help=backend_description,
+        default="torch",
+    )
+    multi_infer_parser.add_argument(
+        "--onnx_threads",
+        type=int,
+        help=onnx_threads_description,
+        default=0,
+    )
+    multi_infer_parser.add_argument(
+        "--embedding_disk_cache",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=embedding_disk_cache_description,
+        default=False,
+    )
+    multi_infer_parser.add_argument(
+        "--clean_audio",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=clean_audio_description,
+        default=False,
+    )
+    multi_infer_parser.add_argument(
+        "--clean_strength",
+        type=float,
+        help=clean_strength_description,
+        choices=[(i / 10) for i in range(11)],
+        default=0.7,
+    )
+    multi_infer_parser.add_argument(
+        "--export_format",
+        type=str,
+        help=export_format_description,
+        choices=["WAV", "MP3", "FLAC", "OGG", "M4A"],
+        default="WAV",
+    )
+    multi_infer_parser.add_argument(
+        "--embedder_model",
+        type=str,
+        help=embedder_model_description,
+        choices=[
+            "contentvec",
+            "chinese-hubert-base",
+            "japanese-hubert-base",
+            "korean-hubert-base",
+            "custom",
+        ],
+        default="contentvec",
+    )
+    multi_infer_parser.add_argument(
+        "--embedder_model_custom",
+        type=str,
+        help=embedder_model_custom_description,
+        default=None,
+    )
+    multi_infer_parser.add_argument(
+        "--f0_file",
+        type=str,
+        help=f0_file_description,
+        default=None,
+    )
+    multi_infer_parser.add_argument(
+        "--formant_shifting",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=formant_shifting_description,
+        default=False,
+        required=False,
+    )
+    multi_infer_parser.add_argument(
+        "--formant_qfrency",
+        type=float,
+        help=formant_qfrency_description,
+        default=1.0,
+        required=False,
+    )
+    multi_infer_parser.add_argument(
+        "--formant_timbre",
+        type=float,
+        help=formant_timbre_description,
+        default=1.0,
+        required=False,
+    )
+    multi_infer_parser.add_argument(
+        "--sid",
+        type=int,
+        help=sid_description,
+        default=0,
+        required=False,
+    )
+
+    # Parser for 'serve' mode
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Run a local HTTP inference server that keeps models loaded and batches concurrent requests.",
+    )
+    serve_parser.add_argument(
+        "--host",
+        type=str,
+        help="Address to listen on. Requests name the voice models to load by path, so only listen on trusted interfaces.",
+        default="127.0.0.1",
+    )
+    serve_parser.add_argument(
+        "--port", type=int, help="Port to listen on.", default=6970
+    )
+    serve_parser.add_argument(
+        "--max_batch_size",
+        type=int,
+        help="Maximum number of requests for the same model and settings converted together.",
+        default=4,
+    )
+    serve_parser.add_argument(
+        "--max_wait_ms",
+        type=float,
+        help="Longest time in milliseconds a request waits for others to batch with.",
+        default=50,
+    )
+    serve_parser.add_argument(
+        "--max_queue",
+        type=int,
+        help="Maximum number of queued requests; further requests are answered with 503 until the queue drains.",
+        default=32,
+    )
+    serve_parser.add_argument(
+        "--quantize",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=quantize_description,
+        default=False,
+    )
+    serve_parser.add_argument(
+        "--backend",
+        type=str,
+        choices=["torch", "onnx"],
+        help=backend_description,
+        default="torch",
+    )
+    serve_parser.add_argument(
+        "--onnx_threads",
+        type=int,
+        help=onnx_threads_description,
+        default=0,
+    )
+    serve_parser.add_argument(
+        "--audio_root",
+        type=str,
+        help="Directory the input_path and output_path of requests are resolved against; paths outside it are refused with 403.",
+        default=os.path.join("assets", "audios"),
+    )
+
     # Parser for 'tts' mode
     tts_parser = subparsers.add_parser("tts", help="Run TTS inference")
     tts_parser.add_argument(
@@ -2049,7 +2551,7 @@ def parse_arguments():
     train_parser.add_argument(
         "--index_algorithm",
         type=str,
-        choices=["Auto", "Faiss", "KMeans"],
+        choices=["Auto", "Faiss", "KMeans", "IVF-PQ", "OPQ-IVF-PQ", "HNSW"],
         help="Choose the method for generating the index file.",
         default="Auto",
         required=False,
@@ -2065,11 +2567,32 @@ def parse_arguments():
     index_parser.add_argument(
         "--index_algorithm",
         type=str,
-        choices=["Auto", "Faiss", "KMeans"],
+        choices=["Auto", "Faiss", "KMeans", "IVF-PQ", "OPQ-IVF-PQ", "HNSW"],
         help="Choose the method for generating the index file.",
         default="Auto",
         required=False,
     )
+    index_parser.add_argument(
+        "--index_memory_mb",
+        type=int,
+        help="Memory budget in megabytes for the training sample and the feature chunks streamed from disk while building the index. Auto compresses the index when its vectors would not fit in it.",
+        default=3072,
+        required=False,
+    )
+    index_parser.add_argument(
+        "--index_rebuild",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help="Rebuild the index from scratch instead of adding new features to an existing one.",
+        default=False,
+    )
+    index_parser.add_argument(
+        "--index_evaluate",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help="Measure recall@8 and search latency against exact search after building, and tune nprobe or efSearch of the IVF-PQ and HNSW indexes on it. False skips the measurement and saves those indexes untuned.",
+        default=True,
+    )
 
     # Parser for 'model_information' mode
     model_information_parser = subparsers.add_parser(
@@ -2079,6 +2602,21 @@ def parse_arguments():
         "--pth_path", type=str, help="Path to the .pth model file.", required=True
     )
 
+    # Parser for 'optimize_model' mode
+    optimize_model_parser = subparsers.add_parser(
+        "optimize_model",
+        help="Export a model to the optimized inference format, with weight norm folded and memory-mapped weights.",
+    )
+    optimize_model_parser.add_argument(
+        "--pth_path", type=str, help="Path to the .pth model file.", required=True
+    )
+    optimize_model_parser.add_argument(
+        "--output_path",
+        type=str,
+        help="Path of the optimized model. Defaults to the .pth path with the .optimized.safetensors extension, where inference picks it up automatically.",
+        default=None,
+    )
+
     # Parser for 'model_blender' mode
     model_blender_parser = subparsers.add_parser(
         "model_blender", help="Fuse two RVC models together."
@@ -2189,6 +2727,11 @@ def main():
                 formant_qfrency=args.formant_qfrency,
                 formant_timbre=args.formant_timbre,
                 sid=args.sid,
+                f0_autotune_scale=args.f0_autotune_scale,
+                quantize=args.quantize,
+                backend=args.backend,
+                onnx_threads=args.onnx_threads,
+                embedding_disk_cache=args.embedding_disk_cache,
                 post_process=args.post_process,
                 reverb=args.reverb,
                 pitch_shift=args.pitch_shift,
@@ -2251,6 +2794,11 @@ def main():
                 formant_qfrency=args.formant_qfrency,
                 formant_timbre=args.formant_timbre,
                 sid=args.sid,
+                f0_autotune_scale=args.f0_autotune_scale,
+                quantize=args.quantize,
+                backend=args.backend,
+                onnx_threads=args.onnx_threads,
+                embedding_disk_cache=args.embedding_disk_cache,
                 post_process=args.post_process,
                 reverb=args.reverb,
                 pitch_shift=args.pitch_shift,
@@ -2287,6 +2835,52 @@ def main():
                 delay_seconds=args.delay_seconds,
                 delay_feedback=args.delay_feedback,
                 delay_mix=args.delay_mix,
+                decode_workers=args.decode_workers,
+                encode_workers=args.encode_workers,
+                workers=args.workers,
+            )
+        elif args.mode == "multi_infer":
+            run_multi_infer_script(
+                pitch=args.pitch,
+                index_rate=args.index_rate,
+                volume_envelope=args.volume_envelope,
+                protect=args.protect,
+                hop_length=args.hop_length,
+                f0_method=args.f0_method,
+                input_path=args.input_path,
+                output_folder=args.output_folder,
+                pth_paths=args.pth_paths,
+                index_paths=args.index_paths,
+                split_audio=args.split_audio,
+                f0_autotune=args.f0_autotune,
+                f0_autotune_strength=args.f0_autotune_strength,
+                clean_audio=args.clean_audio,
+                clean_strength=args.clean_strength,
+                export_format=args.export_format,
+                embedder_model=args.embedder_model,
+                embedder_model_custom=args.embedder_model_custom,
+                f0_file=args.f0_file,
+                formant_shifting=args.formant_shifting,
+                formant_qfrency=args.formant_qfrency,
+                formant_timbre=args.formant_timbre,
+                sid=args.sid,
+                f0_autotune_scale=args.f0_autotune_scale,
+                quantize=args.quantize,
+                backend=args.backend,
+                onnx_threads=args.onnx_threads,
+                embedding_disk_cache=args.embedding_disk_cache,
+            )
+        elif args.mode == "serve":
+            run_serve_script(
+                host=args.host,
+                port=args.port,
+                max_batch_size=args.max_batch_size,
+                max_wait_ms=args.max_wait_ms,
+                max_queue=args.max_queue,
+                quantize=args.quantize,
+                backend=args.backend,
+                onnx_threads=args.onnx_threads,
+                audio_root=args.audio_root,
             )
         elif args.mode == "tts":
             run_tts_script(
@@ -2365,11 +2959,19 @@ def main():
             run_index_script(
                 model_name=args.model_name,
                 index_algorithm=args.index_algorithm,
+                index_memory_mb=args.index_memory_mb,
+                index_rebuild=args.index_rebuild,
+                index_evaluate=args.index_evaluate,
             )
         elif args.mode == "model_information":
             run_model_information_script(
                 pth_path=args.pth_path,
             )
+        elif args.mode == "optimize_model":
+            run_optimize_model_script(
+                pth_path=args.pth_path,
+                output_path=args.output_path,
+            )
         elif args.mode == "model_blender":
             run_model_blender_script(
                 model_name=args.model_name,
@@ -0,0 +1,193 @@
+import numpy as np
+
+NOTE_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+NOTE_ALIASES = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#"}
+
+# Pitch classes of each scale, relative to its key
+SCALES = {
+    "chromatic": (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11),
+    "major": (0, 2, 4, 5, 7, 9, 11),
+    "minor": (0, 2, 3, 5, 7, 8, 10),
+    "harmonic_minor": (0, 2, 3, 5, 7, 8, 11),
+    "pentatonic_major": (0, 2, 4, 7, 9),
+    "pentatonic_minor": (0, 3, 5, 7, 10),
+    "blues": (0, 3, 5, 6, 7, 10),
+}
+
+# Reference notes from G1 to C6
+REF_FREQS = np.array(
+    [
+        49.00,  # G1
+        51.91,  # G#1 / Ab1
+        55.00,  # A1
+        58.27,  # A#1 / Bb1
+        61.74,  # B1
+        65.41,  # C2
+        69.30,  # C#2 / Db2
+        73.42,  # D2
+        77.78,  # D#2 / Eb2
+        82.41,  # E2
+        87.31,  # F2
+        92.50,  # F#2 / Gb2
+        98.00,  # G2
+        103.83,  # G#2 / Ab2
+        110.00,  # A2
+        116.54,  # A#2 / Bb2
+        123.47,  # B2
+        130.81,  # C3
+        138.59,  # C#3 / Db3
+        146.83,  # D3
+        155.56,  # D#3 / Eb3
+        164.81,  # E3
+        174.61,  # F3
+        185.00,  # F#3 / Gb3
+        196.00,  # G3
+        207.65,  # G#3 / Ab3
+        220.00,  # A3
+        233.08,  # A#3 / Bb3
+        246.94,  # B3
+        261.63,  # C4
+        277.18,  # C#4 / Db4
+        293.66,  # D4
+        311.13,  # D#4 / Eb4
+        329.63,  # E4
+        349.23,  # F4
+        369.99,  # F#4 / Gb4
+        392.00,  # G4
+        415.30,  # G#4 / Ab4
+        440.00,  # A4
+        466.16,  # A#4 / Bb4
+        493.88,  # B4
+        523.25,  # C5
+        554.37,  # C#5 / Db5
+        587.33,  # D5
+        622.25,  # D#5 / Eb5
+        659.25,  # E5
+        698.46,  # F5
+        739.99,  # F#5 / Gb5
+        783.99,  # G5
+        830.61,  # G#5 / Ab5
+        880.00,  # A5
+        932.33,  # A#5 / Bb5
+        987.77,  # B5
+        1046.50,  # C6
+    ]
+)
+
+
+def parse_scale(scale):
+    """
+    Returns the pitch classes (C = 0) allowed by a scale name such as "chromatic",
+    "A minor" or "F# pentatonic_major". The key defaults to C.
+
+    Args:
+        scale (str): Scale name, optionally preceded by its key.
+    """
+    parts = scale.split()
+    if len(parts) == 1:
+        key, name = "C", parts[0]
+    elif len(parts) == 2:
+        key, name = parts
+    else:
+        raise ValueError(f"Invalid autotune scale: {scale}")
+    key = NOTE_ALIASES.get(key, key)
+    if key not in NOTE_NAMES or name not in SCALES:
+        raise ValueError(f"Invalid autotune scale: {scale}")
+    root = NOTE_NAMES.index(key)
+    return sorted((root + degree) % 12 for degree in SCALES[name])
+
+
+def pitch_classes(freqs):
+    """
+    Returns the pitch class (C = 0) of the closest equal-tempered note of each frequency.
+
+    Args:
+        freqs (np.ndarray): Frequencies in Hz.
+    """
+    return (np.rint(12 * np.log2(np.asarray(freqs) / 440.0)).astype(int) + 9) % 12
+
+
+def snap_to_notes(f0, notes):
+    """
+    Returns the closest note of every F0 frame, by absolute distance in Hz. Ties go to
+    the lower note.
+
+    Args:
+        f0 (np.ndarray): F0 contour.
+        notes (np.ndarray): Ascending reference frequencies.
+    """
+    if len(notes) == 1:
+        return np.full(np.shape(f0), notes[0])
+    upper = np.clip(np.searchsorted(notes, f0), 1, len(notes) - 1)
+    low = notes[upper - 1]
+    high = notes[upper]
+    return np.where(np.abs(high - f0) < np.abs(low - f0), high, low)
+
+
+class Autotune:
+    """
+    A class for applying autotune to a given fundamental frequency (F0) contour.
+    """
+
+    def __init__(self, ref_freqs=REF_FREQS, scale="chromatic"):
+        """
+        Initializes the Autotune class with a set of reference frequencies.
+
+        Args:
+            ref_freqs: A list of reference frequencies representing musical notes.
+            scale: Scale the notes are restricted to, see `parse_scale`.
+        """
+        ref_freqs = np.sort(np.asarray(ref_freqs, dtype=np.float64))
+        allowed = parse_scale(scale)
+        self.ref_freqs = ref_freqs[np.isin(pitch_classes(ref_freqs), allowed)]
+        self.note_dict = self.ref_freqs  # No interpolation needed
+
+    def autotune_f0(self, f0, f0_autotune_strength):
+        """
+        Autotunes a given F0 contour by moving each frequency towards the closest reference
+        frequency.
+
+        Args:
+            f0: The input F0 contour as a NumPy array.
+            f0_autotune_strength: Blend between the input (0) and the snapped notes (1).
+        """
+        # compare and blend in the contour's precision, as the per-frame version did
+        closest_note = snap_to_notes(f0, self.note_dict.astype(f0.dtype))
+        return (f0 + (closest_note - f0) * f0_autotune_strength).astype(f0.dtype)
+
+
+def overlay_f0_file(f0, inp_f0, offset, frame_rate=100):
+    """
+    Replaces part of an F0 contour with a contour read from an F0 file.
+
+    Args:
+        f0 (np.ndarray): F0 contour at `frame_rate` frames per second.
+        inp_f0 (np.ndarray): (time in seconds, F0) rows, see `Pipeline.load_f0_file`.
+        offset (int): First frame of `f0` the file is aligned with.
+        frame_rate (int): Frames per second of `f0`.
+    """
+    f0 = f0.copy()
+    delta_t = np.round(
+        (inp_f0[:, 0].max() - inp_f0[:, 0].min()) * frame_rate + 1
+    ).astype("int16")
+    replace_f0 = np.interp(np.arange(delta_t), inp_f0[:, 0] * frame_rate, inp_f0[:, 1])
+    shape = f0[offset : offset + len(replace_f0)].shape[0]
+    f0[offset : offset + len(replace_f0)] = replace_f0[:shape]
+    return f0
+
+
+def quantize_f0(f0, f0_mel_min, f0_mel_max):
+    """
+    Quantizes an F0 contour to the 255 coarse mel bins used as pitch tokens.
+
+    Args:
+        f0 (np.ndarray): F0 contour in Hz.
+        f0_mel_min (float): Mel value mapped to bin 1.
+        f0_mel_max (float): Mel value mapped to bin 255.
+    """
+    f0_mel = 1127 * np.log(1 + f0 / 700)
+    voiced = f0_mel > 0
+    f0_mel[voiced] = (f0_mel[voiced] - f0_mel_min) * 254 / (f0_mel_max - f0_mel_min) + 1
+    f0_mel[f0_mel <= 1] = 1
+    f0_mel[f0_mel > 255] = 255
+    return np.rint(f0_mel).astype(int)
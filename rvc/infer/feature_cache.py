@@ -0,0 +1,253 @@
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+DEFAULT_F0_CACHE_ENTRIES = 64
+DEFAULT_EMBEDDING_CACHE_MB = 512
+DEFAULT_EMBEDDING_DISK_MB = 2048
+embedding_cache_dir = os.path.join(now_dir, "logs", "cache", "embeddings")
+
+
+def audio_hash(audio):
+    """
+    Returns a content hash of an audio array, including its dtype and shape.
+
+    Args:
+        audio (np.ndarray): The audio signal.
+    """
+    audio = np.ascontiguousarray(audio)
+    digest = hashlib.sha1(f"{audio.dtype}{audio.shape}".encode())
+    digest.update(audio.view(np.uint8))
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    A small thread-safe in-memory LRU cache with hit/miss counters.
+
+    Args:
+        max_entries (int): Maximum number of cached values.
+        max_bytes (int, optional): Maximum total `nbytes` of the cached arrays.
+    """
+
+    def __init__(self, max_entries, max_bytes=None):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the cached value for a key, or None.
+
+        Args:
+            key: A hashable cache key.
+        """
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores a value, evicting the least recently used entries when full.
+
+        Args:
+            key: A hashable cache key.
+            value: The value to store.
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            if self.max_bytes is not None:
+                total = sum(entry.nbytes for entry in self.entries.values())
+                while total > self.max_bytes and len(self.entries) > 1:
+                    total -= self.entries.popitem(last=False)[1].nbytes
+
+    def clear(self):
+        """
+        Removes every cached value and resets the counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        Returns the hit/miss counters and the number of cached values.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+            }
+
+
+class EmbeddingCache:
+    """
+    An in-memory and optional on-disk cache of embedder outputs (`last_hidden_state`).
+
+    Keys are (audio hash, embedder name) pairs; the audio hash covers the exact segment
+    fed to the embedder, so it also captures the segment boundaries. Values live in an
+    LRU memory tier bounded in bytes and, when `cache_dir` is set, in `.npy` files
+    pruned oldest-first once they exceed the disk budget. The disk tier is off by
+    default, see `set_disk_cache`.
+
+    Args:
+        cache_dir (str, optional): Directory for the on-disk tier, None keeps it in memory only.
+        memory_mb (int): Memory budget in megabytes.
+        disk_mb (int): Disk budget in megabytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir=None,
+        memory_mb=DEFAULT_EMBEDDING_CACHE_MB,
+        disk_mb=DEFAULT_EMBEDDING_DISK_MB,
+    ):
+        self.memory = LRUCache(sys.maxsize, max_bytes=memory_mb * 1024 * 1024)
+        self.disk_budget = disk_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.set_disk_cache(cache_dir)
+
+    def set_disk_cache(self, cache_dir):
+        """
+        Enables the on-disk tier in a directory, or disables it.
+
+        The size of the directory is measured once here and then tracked per write, so
+        the directory is only listed again when the budget is exceeded.
+
+        Args:
+            cache_dir (str, optional): Directory for the on-disk tier, None disables it.
+        """
+        with self.lock:
+            self.cache_dir = cache_dir
+            self.disk_bytes = 0
+            if cache_dir is not None and os.path.isdir(cache_dir):
+                self.disk_bytes = sum(size for _, size, _ in self._files())
+
+    def _path(self, key):
+        audio_key, embedder_name = key
+        embedder_key = hashlib.sha1(embedder_name.encode()).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{embedder_key}_{audio_key}.npy")
+
+    def _files(self):
+        # (mtime, size, path) of the cached files; files removed meanwhile by another
+        # process are skipped
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def get(self, key):
+        """
+        Returns the cached embedder output for a key, or None.
+
+        Args:
+            key (tuple): (audio hash, embedder name).
+        """
+        value = self.memory.get(key)
+        if value is None and self.cache_dir is not None:
+            path = self._path(key)
+            try:
+                value = np.load(path)
+                os.utime(path)
+            except FileNotFoundError:
+                # not cached, or pruned by another process in the meantime
+                return None
+            except Exception as error:
+                print(f"An error occurred reading the embedding cache: {error}")
+                return None
+            self.memory.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Stores an embedder output in memory and, if enabled, on disk.
+
+        Args:
+            key (tuple): (audio hash, embedder name).
+            value (np.ndarray): The embedder output.
+        """
+        self.memory.put(key, value)
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, value)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+        except Exception as error:
+            print(f"An error occurred writing the embedding cache: {error}")
+            return
+        with self.lock:
+            self.disk_bytes += size
+            if self.disk_bytes > self.disk_budget:
+                self._prune()
+
+    def _prune(self):
+        # other processes may share the directory, so the tracked size is only an
+        # estimate: the directory is measured again before removing anything
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.disk_budget:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.disk_bytes = total
+
+    def clear(self):
+        """
+        Removes every cached embedder output from memory and disk.
+        """
+        self.memory.clear()
+        with self.lock:
+            if self.cache_dir is not None and os.path.isdir(self.cache_dir):
+                for _, _, path in self._files():
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            self.disk_bytes = 0
+
+    def stats(self):
+        """
+        Returns the hit/miss counters of the memory tier.
+        """
+        return self.memory.stats()
+
+
+# Raw F0 contours, before transposition, autotune and quantization
+f0_cache = LRUCache(DEFAULT_F0_CACHE_ENTRIES)
+# Embedder outputs, shared by every voice converted from the same input
+embedding_cache = EmbeddingCache()
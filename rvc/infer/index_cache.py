@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+DEFAULT_BUDGET_MB = 2048
+# Companion file with the indexed vectors in id order, written by extract_index.py
+VECTORS_SUFFIX = ".vectors.npy"
+
+
+def vectors_path(file_index):
+    """
+    Returns the path of the vector file that accompanies an index file.
+
+    Args:
+        file_index (str): Path to the FAISS index file.
+    """
+    return os.path.splitext(file_index)[0] + VECTORS_SUFFIX
+
+
+def load_vectors(file_index, index):
+    """
+    Memory-maps the companion vector file of an index, or returns None if there is none
+    or it does not match the index. Only the rows gathered during retrieval are read,
+    and processes mapping the same file share its pages.
+
+    Args:
+        file_index (str): Path to the FAISS index file.
+        index (faiss.Index): The loaded index.
+    """
+    path = vectors_path(file_index)
+    if not os.path.isfile(path):
+        return None
+    vectors = np.load(path, mmap_mode="r")
+    if vectors.shape != (index.ntotal, index.d):
+        print(
+            f"Ignoring '{path}': its shape {vectors.shape} does not match the index "
+            f"({index.ntotal}, {index.d})."
+        )
+        return None
+    return vectors
+
+
+class IndexCache:
+    """
+    A process-wide LRU cache of loaded FAISS indexes and their vectors.
+
+    Vectors come from the memory-mapped companion file when the index has one, which
+    costs no private memory, and are otherwise reconstructed from the index into RAM.
+
+    Entries are keyed by the real path of the index file together with its mtime and
+    size, so an index rewritten on disk is reloaded on the next lookup. The least
+    recently used entries are evicted once the estimated memory usage exceeds the budget.
+
+    Args:
+        budget_mb (int): Memory budget for cached indexes in megabytes.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(file_index):
+        """
+        Builds the cache key for an index file.
+
+        Args:
+            file_index (str): Path to the FAISS index file.
+        """
+        real_path = os.path.realpath(file_index)
+        stat = os.stat(real_path)
+        return real_path, stat.st_mtime_ns, stat.st_size
+
+    def get(self, file_index):
+        """
+        Returns the index and its vectors, loading them on a miss.
+
+        Args:
+            file_index (str): Path to the FAISS index file.
+        """
+        key = self.make_key(file_index)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+
+        index = faiss.read_index(file_index)
+        big_npy = load_vectors(file_index, index)
+        size = key[2]
+        if big_npy is None:
+            big_npy = index.reconstruct_n(0, index.ntotal)
+            size += big_npy.nbytes
+
+        with self.lock:
+            # drop stale versions of the same file before inserting the new one
+            for stale_key in [k for k in self.entries if k[0] == key[0]]:
+                del self.entries[stale_key]
+            self.entries[key] = (index, big_npy, size)
+            self._evict()
+        return index, big_npy
+
+    def _evict(self):
+        total = sum(entry[2] for entry in self.entries.values())
+        # always keep the most recent entry, even if it alone exceeds the budget
+        while total > self.budget and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            total -= entry[2]
+            self.evictions += 1
+
+    def set_budget(self, budget_mb):
+        """
+        Changes the memory budget and evicts entries that no longer fit.
+
+        Args:
+            budget_mb (int): Memory budget for cached indexes in megabytes.
+        """
+        with self.lock:
+            self.budget = int(budget_mb * 1024 * 1024)
+            self._evict()
+
+    def clear(self):
+        """
+        Removes every cached index and resets the counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the hit/miss counters and the current memory usage of the cache.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "size_mb": sum(entry[2] for entry in self.entries.values())
+                / (1024 * 1024),
+                "budget_mb": self.budget / (1024 * 1024),
+            }
+
+
+index_cache = IndexCache()
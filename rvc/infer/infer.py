@@ -3,12 +3,15 @@ import sys
 import soxr
 import time
 import torch
+import inspect
 import librosa
 import logging
 import traceback
 import numpy as np
 import soundfile as sf
 import noisereduce as nr
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pedalboard import (
     Pedalboard,
     Chorus,
@@ -27,6 +30,29 @@ now_dir = os.getcwd()
 sys.path.append(now_dir)
 
 from rvc.infer.pipeline import Pipeline as VC
+from rvc.infer.index_cache import index_cache
+from rvc.infer.feature_cache import embedding_cache, embedding_cache_dir
+from rvc.infer.segmentation import model_key, segment_planner
+from rvc.infer.quantization import (
+    quantize_synthesizer,
+    quantize_embedder,
+    load_quantized_model,
+    save_quantized_model,
+)
+from rvc.infer.optimized_model import find_optimized_model, load_optimized_model
+from rvc.infer.onnx_backend import (
+    BACKENDS,
+    onnx_available,
+    load_onnx_synthesizer,
+    load_onnx_embedder,
+)
+from rvc.infer.sharded_batch import convert_files_sharded
+from rvc.infer.model_registry import (
+    ModelRegistry,
+    LoadedModel,
+    DEFAULT_MAX_MODELS,
+    DEFAULT_BUDGET_MB,
+)
 from rvc.lib.utils import load_audio_infer, load_embedding
 from rvc.lib.tools.split_audio import process_audio, merge_audio
 from rvc.lib.algorithm.synthesizers import Synthesizer
@@ -43,9 +69,25 @@ class VoiceConverter:
     A class for performing voice conversion using the Retrieval-Based Voice Conversion (RVC) method.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_models=DEFAULT_MAX_MODELS,
+        model_budget_mb=DEFAULT_BUDGET_MB,
+        quantize=False,
+        backend="torch",
+        onnx_threads=0,
+        embedding_disk_cache=False,
+    ):
         """
         Initializes the VoiceConverter with default configuration, and sets up models and parameters.
+
+        Args:
+            max_models (int): Maximum number of voice models kept loaded at the same time.
+            model_budget_mb (int): Memory budget for the loaded voice models in megabytes.
+            quantize (bool): Whether to run the voice models and the embedder in INT8 on the CPU.
+            backend (str): Runtime of the models, "torch" or "onnx".
+            onnx_threads (int): Intra-op threads of onnxruntime, 0 uses every physical core.
+            embedding_disk_cache (bool): Whether to turn on the on-disk tier of the embedding cache.
         """
         self.config = Config()  # Load configuration
         self.hubert_model = (
@@ -60,6 +102,75 @@ class VoiceConverter:
         self.n_spk = None  # Number of speakers in the model
         self.use_f0 = None  # Whether the model uses F0
         self.loaded_model = None
+        self.model_registry = ModelRegistry(max_models, model_budget_mb)
+        # Pipeline instances shared by models with the same sampling rate
+        self.pipelines = {}
+        # Segment lengths per model (see `model_key`), planned when a model is first set up
+        self.segment_plans = {}
+        self.model_key = None
+        self.quantize = False  # Whether models are loaded with INT8 quantization
+        self.set_quantize(quantize)
+        self.backend = "torch"  # Runtime of the voice models, embedder and RMVPE
+        self.onnx_threads = 0
+        self.set_backend(backend, onnx_threads)
+        if embedding_disk_cache:
+            self.set_embedding_disk_cache(True)
+
+    def set_quantize(self, quantize: bool):
+        """
+        Switches INT8 quantized inference on or off, unloading models of the other kind.
+
+        Args:
+            quantize (bool): Whether to run the voice models and the embedder in INT8.
+        """
+        quantize = bool(quantize)
+        if quantize and self.config.device != "cpu":
+            print("INT8 quantization is only available on the CPU, using float32.")
+            quantize = False
+        if quantize != self.quantize:
+            self.quantize = quantize
+            self.model_registry.clear()
+            self.net_g = self.hubert_model = None
+            self.loaded_model = self.last_embedder_model = None
+
+    def set_embedding_disk_cache(self, enabled: bool):
+        """
+        Switches the on-disk tier of the embedding cache in logs/cache/embeddings on or off.
+
+        Args:
+            enabled (bool): Whether embedder outputs are also kept on disk between runs.
+        """
+        cache_dir = embedding_cache_dir if enabled else None
+        if cache_dir != embedding_cache.cache_dir:
+            embedding_cache.set_disk_cache(cache_dir)
+
+    def set_backend(self, backend: str, onnx_threads: int = 0):
+        """
+        Switches the runtime of the voice models, the embedder and RMVPE, unloading
+        models of the other runtime.
+
+        Args:
+            backend (str): "torch", or "onnx" to run them through onnxruntime on the CPU.
+            onnx_threads (int): Intra-op threads of onnxruntime, 0 uses every physical core.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == "onnx" and self.config.device != "cpu":
+            print("The ONNX backend is only available on the CPU, using torch.")
+            backend = "torch"
+        elif backend == "onnx" and not onnx_available():
+            print("onnxruntime is not installed, using torch.")
+            backend = "torch"
+        onnx_threads = max(0, int(onnx_threads))
+        if backend != self.backend or onnx_threads != self.onnx_threads:
+            self.backend = backend
+            self.onnx_threads = onnx_threads
+            self.model_registry.clear()
+            self.net_g = self.hubert_model = None
+            self.loaded_model = self.last_embedder_model = None
+            for pipeline in self.pipelines.values():
+                pipeline.backend = backend
+                pipeline.onnx_threads = onnx_threads
 
     def load_hubert(self, embedder_model: str, embedder_model_custom: str = None):
         """
@@ -72,6 +183,19 @@ class VoiceConverter:
         self.hubert_model = load_embedding(embedder_model, embedder_model_custom)
         self.hubert_model = self.hubert_model.to(self.config.device).float()
         self.hubert_model.eval()
+        # identifies the embedder in the content-feature cache
+        if embedder_model != "custom":
+            self.hubert_model.embedder_name = embedder_model
+        elif embedder_model_custom and os.path.exists(embedder_model_custom):
+            self.hubert_model.embedder_name = f"custom:{os.path.realpath(embedder_model_custom)}:{os.path.getmtime(embedder_model_custom)}"
+        else:
+            self.hubert_model.embedder_name = "contentvec"
+        if self.quantize:
+            embedder_name = self.hubert_model.embedder_name
+            self.hubert_model = quantize_embedder(self.hubert_model)
+            self.hubert_model.embedder_name = f"{embedder_name}:int8"
+        elif self.backend == "onnx":
+            self.hubert_model = load_onnx_embedder(self.hubert_model, self.onnx_threads)
 
     @staticmethod
     def remove_audio_noise(data, sr, reduction_strength=0.7):
@@ -93,7 +217,9 @@ class VoiceConverter:
             return None
 
     @staticmethod
-    def convert_audio_format(input_path, output_path, output_format):
+    def convert_audio_format(
+        input_path, output_path, output_format, audio=None, sample_rate=None
+    ):
         """
         Converts an audio file to a specified output format.
 
@@ -101,11 +227,14 @@ class VoiceConverter:
             input_path (str): Path to the input audio file.
             output_path (str): Path to the output audio file.
             output_format (str): Desired audio format (e.g., "WAV", "MP3").
+            audio (np.ndarray, optional): Content of the input file, to skip reading it back.
+            sample_rate (int, optional): Sampling rate of `audio`.
         """
         try:
             if output_format != "WAV":
                 print(f"Saving audio as {output_format}...")
-                audio, sample_rate = librosa.load(input_path, sr=None)
+                if audio is None:
+                    audio, sample_rate = librosa.load(input_path, sr=None)
                 common_sample_rates = [
                     8000,
                     11025,
@@ -190,6 +319,258 @@ class VoiceConverter:
             board.append(delay)
         return board(audio_input, sample_rate)
 
+    def save_output(
+        self,
+        audio_opt,
+        audio_output_path: str,
+        clean_audio: bool = False,
+        clean_strength: float = 0.5,
+        export_format: str = "WAV",
+        post_process: bool = False,
+        sample_rate: int = None,
+        **kwargs,
+    ):
+        """
+        Cleans and post-processes converted audio, writes it at the target sampling rate
+        and returns the path of the exported file.
+
+        Args:
+            audio_opt (np.ndarray): Converted audio.
+            audio_output_path (str): Path to the output audio file.
+            clean_audio (bool): Whether to clean the audio.
+            clean_strength (float): Strength of the audio cleaning.
+            export_format (str): Format for exporting the audio.
+            post_process (bool): Whether to apply the post-processing effects.
+            sample_rate (int, optional): Sampling rate of `audio_opt`, the target sampling
+                rate of the loaded model if None.
+            **kwargs: Effect settings passed to `post_process_audio`.
+        """
+        sample_rate = sample_rate or self.tgt_sr
+        if clean_audio:
+            cleaned_audio = self.remove_audio_noise(
+                audio_opt, sample_rate, clean_strength
+            )
+            if cleaned_audio is not None:
+                audio_opt = cleaned_audio
+
+        if post_process:
+            audio_opt = self.post_process_audio(
+                audio_input=audio_opt,
+                sample_rate=sample_rate,
+                **kwargs,
+            )
+
+        sf.write(audio_output_path, audio_opt, sample_rate, format="WAV")
+        output_path_format = audio_output_path.replace(
+            ".wav", f".{export_format.lower()}"
+        )
+        return self.convert_audio_format(
+            audio_output_path,
+            output_path_format,
+            export_format,
+            audio=audio_opt,
+            sample_rate=sample_rate,
+        )
+
+    @staticmethod
+    def load_input_audio(audio_input_path: str, **kwargs):
+        """
+        Loads an input as a 16 kHz mono signal, scaled down if it peaks above 0.95.
+
+        Args:
+            audio_input_path (str): Path to the input audio file.
+            **kwargs: Formant shifting settings passed to `load_audio_infer`.
+        """
+        audio = load_audio_infer(
+            audio_input_path,
+            16000,
+            **kwargs,
+        )
+        audio_max = np.abs(audio).max() / 0.95
+
+        if audio_max > 1:
+            audio /= audio_max
+        return audio
+
+    def prepare_embedder(self, embedder_model, embedder_model_custom, resample_sr):
+        """
+        Loads the embedder if it changed and applies the output resampling rate to the
+        loaded model.
+
+        Args:
+            embedder_model (str): Embedder model name.
+            embedder_model_custom (str): Path to a custom embedder model.
+            resample_sr (int): Resample sampling rate, 0 keeps the model's rate.
+        """
+        if not self.hubert_model or embedder_model != self.last_embedder_model:
+            self.load_hubert(embedder_model, embedder_model_custom)
+            self.last_embedder_model = embedder_model
+        if self.tgt_sr != resample_sr >= 16000:
+            self.tgt_sr = resample_sr
+
+    @staticmethod
+    def clean_index_path(index_path):
+        """
+        Strips quotes and whitespace from an index path and points it at the added index.
+
+        Args:
+            index_path (str): Path to the index file.
+        """
+        return (
+            index_path.strip()
+            .strip('"')
+            .strip("\n")
+            .strip('"')
+            .strip()
+            .replace("trained", "added")
+        )
+
+    def prepare_input(self, audio, split_audio):
+        """
+        Splits a loaded input into chunks and runs the model-independent preprocessing of
+        every chunk (`Pipeline.prepare_source`). The result can be converted with several
+        models through `convert_prepared`.
+
+        Args:
+            audio (np.ndarray): The input, from `load_input_audio`.
+            split_audio (bool): Whether to split the input at silences.
+        """
+        intervals = None
+        if split_audio:
+            chunks, intervals = process_audio(audio, 16000, grid=self.vc.window)
+            print(f"Audio split into {len(chunks)} chunks for processing.")
+        else:
+            chunks = [audio]
+        return {
+            "audio": audio,
+            "chunks": chunks,
+            "intervals": intervals,
+            "sources": [self.vc.prepare_source(chunk) for chunk in chunks],
+            "raw_f0s": None,
+        }
+
+    def estimate_input_f0(self, prepared, f0_method, hop_length):
+        """
+        Estimates the raw F0 contour of every chunk of a prepared input once. Split inputs
+        are estimated as a whole and every chunk gets its slice.
+
+        Args:
+            prepared (dict): Result of `prepare_input`, updated in place.
+            f0_method (str): Method for F0 extraction.
+            hop_length (int): Hop length for F0 extraction.
+        """
+        if prepared["raw_f0s"] is not None:
+            return
+        if prepared["intervals"] is not None:
+            whole_f0 = self.vc.estimate_f0_padded(
+                prepared["audio"], f0_method, hop_length
+            )
+            prepared["raw_f0s"] = [
+                self.vc.slice_f0(whole_f0, start, end - start + self.vc.t_pad2)
+                for start, end in prepared["intervals"]
+            ]
+        else:
+            prepared["raw_f0s"] = [
+                self.vc.estimate_f0(
+                    "input_audio_path",
+                    source["audio_pad"],
+                    source["p_len"],
+                    f0_method,
+                    hop_length,
+                )
+                for source in prepared["sources"]
+            ]
+
+    def convert_prepared(self, prepared, file_index, sid=0, **settings):
+        """
+        Converts a prepared input with the loaded model and returns the converted audio
+        at `self.tgt_sr`.
+
+        Args:
+            prepared (dict): Result of `prepare_input`.
+            file_index (str): Path to the index file, from `clean_index_path`.
+            sid (int): Speaker ID.
+            **settings: Conversion settings of `Pipeline.pipeline`, e.g. pitch and f0_method.
+        """
+        chunks, intervals = prepared["chunks"], prepared["intervals"]
+        sources, raw_f0s = prepared["sources"], prepared["raw_f0s"]
+        if not self.use_f0:
+            raw_f0s = None
+        settings = dict(
+            settings,
+            model=self.hubert_model,
+            net_g=self.net_g,
+            sid=sid,
+            file_index=file_index,
+            pitch_guidance=self.use_f0,
+            version=self.version,
+        )
+
+        converted_chunks = []
+        for i, (chunk, source) in enumerate(zip(chunks, sources)):
+            converted_chunks.append(
+                self.vc.pipeline(
+                    audio=chunk,
+                    raw_f0=raw_f0s[i] if raw_f0s is not None else None,
+                    source=source,
+                    **settings,
+                )
+            )
+            if intervals is not None:
+                print(f"Converted audio chunk {len(converted_chunks)}")
+
+        segment_planner.flush()
+        if intervals is not None:
+            return merge_audio(chunks, converted_chunks, intervals, 16000, self.tgt_sr)
+        return converted_chunks[0]
+
+    def convert_input_audio(
+        self,
+        audio,
+        index_path: str,
+        pitch: int = 0,
+        f0_file: str = None,
+        f0_method: str = "rmvpe",
+        index_rate: float = 0.75,
+        volume_envelope: float = 1,
+        protect: float = 0.5,
+        hop_length: int = 128,
+        split_audio: bool = False,
+        f0_autotune: bool = False,
+        f0_autotune_strength: float = 1,
+        f0_autotune_scale: str = "chromatic",
+        embedder_model: str = "contentvec",
+        embedder_model_custom: str = None,
+        resample_sr: int = 0,
+        sid: int = 0,
+    ):
+        """
+        Converts a loaded input with the loaded model and returns the converted audio at
+        `self.tgt_sr`. The arguments are the same as for `convert_audio`.
+
+        Args:
+            audio (np.ndarray): The input, from `load_input_audio`.
+        """
+        self.prepare_embedder(embedder_model, embedder_model_custom, resample_sr)
+        prepared = self.prepare_input(audio, split_audio)
+        if self.use_f0:
+            self.estimate_input_f0(prepared, f0_method, hop_length)
+        return self.convert_prepared(
+            prepared,
+            self.clean_index_path(index_path),
+            sid=sid,
+            pitch=pitch,
+            f0_method=f0_method,
+            index_rate=index_rate,
+            volume_envelope=volume_envelope,
+            protect=protect,
+            hop_length=hop_length,
+            f0_autotune=f0_autotune,
+            f0_autotune_strength=f0_autotune_strength,
+            f0_autotune_scale=f0_autotune_scale,
+            f0_file=f0_file,
+        )
+
     def convert_audio(
         self,
         audio_input_path: str,
@@ -206,6 +587,7 @@ class VoiceConverter:
         split_audio: bool = False,
         f0_autotune: bool = False,
         f0_autotune_strength: float = 1,
+        f0_autotune_scale: str = "chromatic",
         embedder_model: str = "contentvec",
         embedder_model_custom: str = None,
         clean_audio: bool = False,
@@ -232,6 +614,7 @@ class VoiceConverter:
             index_path (str): Path to the index file.
             split_audio (bool): Whether to split the audio for processing.
             f0_autotune (bool): Whether to use F0 autotune.
+            f0_autotune_scale (str): Scale the autotune snaps to, e.g. "chromatic" or "A minor".
             clean_audio (bool): Whether to clean the audio.
             clean_strength (float): Strength of the audio cleaning.
             export_format (str): Format for exporting the audio.
@@ -252,112 +635,303 @@ class VoiceConverter:
             start_time = time.time()
             print(f"Converting audio '{audio_input_path}'...")
 
-            audio = load_audio_infer(
-                audio_input_path,
-                16000,
+            audio = self.load_input_audio(audio_input_path, **kwargs)
+            audio_opt = self.convert_input_audio(
+                audio,
+                index_path=index_path,
+                pitch=pitch,
+                f0_file=f0_file,
+                f0_method=f0_method,
+                index_rate=index_rate,
+                volume_envelope=volume_envelope,
+                protect=protect,
+                hop_length=hop_length,
+                split_audio=split_audio,
+                f0_autotune=f0_autotune,
+                f0_autotune_strength=f0_autotune_strength,
+                f0_autotune_scale=f0_autotune_scale,
+                embedder_model=embedder_model,
+                embedder_model_custom=embedder_model_custom,
+                resample_sr=resample_sr,
+                sid=sid,
+            )
+
+            audio_output_path = self.save_output(
+                audio_opt,
+                audio_output_path,
+                clean_audio,
+                clean_strength,
+                export_format,
+                post_process,
                 **kwargs,
             )
-            audio_max = np.abs(audio).max() / 0.95
-
-            if audio_max > 1:
-                audio /= audio_max
-
-            if not self.hubert_model or embedder_model != self.last_embedder_model:
-                self.load_hubert(embedder_model, embedder_model_custom)
-                self.last_embedder_model = embedder_model
-
-            file_index = (
-                index_path.strip()
-                .strip('"')
-                .strip("\n")
-                .strip('"')
-                .strip()
-                .replace("trained", "added")
+
+            elapsed_time = time.time() - start_time
+            print(
+                f"Conversion completed at '{audio_output_path}' in {elapsed_time:.2f} seconds."
             )
+        except Exception as error:
+            print(f"An error occurred during audio conversion: {error}")
+            print(traceback.format_exc())
+
+    def convert_audio_multi(
+        self,
+        audio_input_path: str,
+        audio_output_path: str,
+        model_paths: list,
+        index_paths: list = None,
+        pitch: int = 0,
+        f0_file: str = None,
+        f0_method: str = "rmvpe",
+        index_rate: float = 0.75,
+        volume_envelope: float = 1,
+        protect: float = 0.5,
+        hop_length: int = 128,
+        split_audio: bool = False,
+        f0_autotune: bool = False,
+        f0_autotune_strength: float = 1,
+        f0_autotune_scale: str = "chromatic",
+        embedder_model: str = "contentvec",
+        embedder_model_custom: str = None,
+        clean_audio: bool = False,
+        clean_strength: float = 0.5,
+        export_format: str = "WAV",
+        post_process: bool = False,
+        resample_sr: int = 0,
+        sid: int = 0,
+        **kwargs,
+    ):
+        """
+        Converts one input with several voice models and writes one output per model.
 
-            if self.tgt_sr != resample_sr >= 16000:
-                self.tgt_sr = resample_sr
+        The source-side work is done once and shared by every model: loading and
+        normalizing the audio, splitting, high-pass filtering and segmentation
+        (`prepare_input`), the raw F0 contour (`estimate_input_f0`) and the embedder
+        features (`Pipeline.embed_source`). Only the index retrieval and
+        `Synthesizer.infer` run per model.
 
-            if split_audio:
-                chunks, intervals = process_audio(audio, 16000)
-                print(f"Audio split into {len(chunks)} chunks for processing.")
-            else:
-                chunks = []
-                chunks.append(audio)
-
-            converted_chunks = []
-            for c in chunks:
-                audio_opt = self.vc.pipeline(
-                    model=self.hubert_model,
-                    net_g=self.net_g,
+        Args:
+            audio_input_path (str): Path to the input audio file.
+            audio_output_path (str): Folder for the output audio files, named after the input and the model.
+            model_paths (list): Paths to the voice conversion models.
+            index_paths (list, optional): Paths to the index files, one per model; empty strings disable retrieval.
+            **kwargs: The remaining settings are the same as for `convert_audio`.
+
+        Returns:
+            list: Paths of the exported files, in the order of `model_paths`.
+        """
+        if not model_paths:
+            print("No model paths provided. Aborting conversion.")
+            return []
+        index_paths = list(index_paths or [])
+        index_paths += [""] * (len(model_paths) - len(index_paths))
+
+        start_time = time.time()
+        print(
+            f"Converting audio '{audio_input_path}' with {len(model_paths)} models..."
+        )
+        audio = self.load_input_audio(audio_input_path, **kwargs)
+
+        os.makedirs(audio_output_path, exist_ok=True)
+        input_name = os.path.splitext(os.path.basename(audio_input_path))[0]
+        prepared = None
+        outputs = []
+        for model_path, index_path in zip(model_paths, index_paths):
+            if not os.path.isfile(model_path):
+                print(f"Model '{model_path}' not found, skipping it.")
+                continue
+            try:
+                model_start = time.time()
+                self.get_vc(model_path, sid)
+                self.prepare_embedder(
+                    embedder_model, embedder_model_custom, resample_sr
+                )
+
+                # every pipeline shares the 16 kHz settings, so the input is reusable
+                if prepared is None:
+                    prepared = self.prepare_input(audio, split_audio)
+                    for source in prepared["sources"]:
+                        self.vc.embed_source(self.hubert_model, source)
+                if self.use_f0:
+                    self.estimate_input_f0(prepared, f0_method, hop_length)
+
+                audio_opt = self.convert_prepared(
+                    prepared,
+                    self.clean_index_path(index_path),
                     sid=sid,
-                    audio=c,
                     pitch=pitch,
                     f0_method=f0_method,
-                    file_index=file_index,
                     index_rate=index_rate,
-                    pitch_guidance=self.use_f0,
                     volume_envelope=volume_envelope,
-                    version=self.version,
                     protect=protect,
                     hop_length=hop_length,
                     f0_autotune=f0_autotune,
                     f0_autotune_strength=f0_autotune_strength,
+                    f0_autotune_scale=f0_autotune_scale,
                     f0_file=f0_file,
                 )
-                converted_chunks.append(audio_opt)
-                if split_audio:
-                    print(f"Converted audio chunk {len(converted_chunks)}")
 
-            if split_audio:
-                audio_opt = merge_audio(
-                    chunks, converted_chunks, intervals, 16000, self.tgt_sr
+                model_name = os.path.splitext(os.path.basename(model_path))[0]
+                output_path = self.save_output(
+                    audio_opt,
+                    os.path.join(audio_output_path, f"{input_name}_{model_name}.wav"),
+                    clean_audio,
+                    clean_strength,
+                    export_format,
+                    post_process,
+                    **kwargs,
                 )
-            else:
-                audio_opt = converted_chunks[0]
+                outputs.append(output_path)
+                print(
+                    f"Converted with '{model_path}' at '{output_path}' in {time.time() - model_start:.2f} seconds."
+                )
+            except Exception as error:
+                print(f"An error occurred converting with '{model_path}': {error}")
+                print(traceback.format_exc())
+
+        elapsed_time = time.time() - start_time
+        print(
+            f"Multi-model conversion of '{audio_input_path}' completed in {elapsed_time:.2f} seconds."
+        )
+        return outputs
 
-            if clean_audio:
-                cleaned_audio = self.remove_audio_noise(
-                    audio_opt, self.tgt_sr, clean_strength
+    def convert_files(
+        self,
+        files: list,
+        decode_workers: int = 2,
+        encode_workers: int = 2,
+        progress=None,
+        **kwargs,
+    ):
+        """
+        Converts files with one model as a three-stage pipeline and returns throughput
+        statistics.
+
+        A pool of `decode_workers` threads loads and resamples the next inputs while the
+        calling thread, which owns the models, converts the current one, and a pool of
+        `encode_workers` threads cleans, post-processes and writes the finished outputs.
+        At most twice as many inputs as decode workers are decoded ahead, and at most
+        twice as many outputs as encode workers wait to be written, which bounds memory.
+
+        Args:
+            files (list): Pairs of input and output paths, or an iterator of them.
+            decode_workers (int): Threads decoding inputs.
+            encode_workers (int): Threads writing outputs.
+            progress (callable, optional): Called with the input path, the output path
+                and the error, or None, of every finished file.
+            **kwargs: Settings of `convert_audio`, including `model_path`.
+        """
+        stats = {
+            "files": 0,
+            "failed": 0,
+            "audio_seconds": 0.0,
+            "compute_seconds": 0.0,
+            "elapsed": 0.0,
+            "workers": 1,
+        }
+        model_path = kwargs.get("model_path")
+        if not model_path:
+            print("No model path provided. Aborting conversion.")
+            return stats
+        start_time = time.perf_counter()
+        self.get_vc(model_path, kwargs.get("sid", 0))
+        convert_names = inspect.signature(self.convert_input_audio).parameters
+        convert_kwargs = {k: v for k, v in kwargs.items() if k in convert_names}
+        output_kwargs = {k: v for k, v in kwargs.items() if k not in convert_names}
+        decode_workers = max(1, int(decode_workers))
+        encode_workers = max(1, int(encode_workers))
+
+        def report(input_path, output_path, error=None):
+            stats["failed" if error else "files"] += 1
+            if progress is not None:
+                progress(input_path, output_path, error)
+
+        def finish(input_path, future):
+            try:
+                output_path = future.result()
+                print(f"Converted '{input_path}' at '{output_path}'.")
+                report(input_path, output_path)
+            except Exception as error:
+                print(
+                    f"An error occurred writing the output of '{input_path}': {error}"
                 )
-                if cleaned_audio is not None:
-                    audio_opt = cleaned_audio
+                report(input_path, None, str(error))
+
+        pending = iter(files)
+        decoding, encoding = deque(), deque()
+        with ThreadPoolExecutor(decode_workers) as decoder, ThreadPoolExecutor(
+            encode_workers
+        ) as encoder:
+
+            def decode_ahead():
+                while len(decoding) < 2 * decode_workers:
+                    paths = next(pending, None)
+                    if paths is None:
+                        return
+                    future = decoder.submit(
+                        self.load_input_audio, paths[0], **output_kwargs
+                    )
+                    decoding.append((paths, future))
 
-            if post_process:
-                audio_opt = self.post_process_audio(
-                    audio_input=audio_opt,
+            decode_ahead()
+            while decoding:
+                (input_path, output_path), future = decoding.popleft()
+                decode_ahead()
+                try:
+                    audio = future.result()
+                    compute_start = time.perf_counter()
+                    audio_opt = self.convert_input_audio(audio, **convert_kwargs)
+                    stats["compute_seconds"] += time.perf_counter() - compute_start
+                except Exception as error:
+                    print(f"An error occurred converting '{input_path}': {error}")
+                    print(traceback.format_exc())
+                    report(input_path, None, str(error))
+                    continue
+                stats["audio_seconds"] += len(audio) / 16000
+                while len(encoding) >= 2 * encode_workers:
+                    finish(*encoding.popleft())
+                future = encoder.submit(
+                    self.save_output,
+                    audio_opt,
+                    output_path,
                     sample_rate=self.tgt_sr,
-                    **kwargs,
+                    **output_kwargs,
                 )
+                encoding.append((input_path, future))
+            while encoding:
+                finish(*encoding.popleft())
+        stats["elapsed"] = time.perf_counter() - start_time
+        return stats
 
-            sf.write(audio_output_path, audio_opt, self.tgt_sr, format="WAV")
-            output_path_format = audio_output_path.replace(
-                ".wav", f".{export_format.lower()}"
-            )
-            audio_output_path = self.convert_audio_format(
-                audio_output_path, output_path_format, export_format
-            )
-
-            elapsed_time = time.time() - start_time
-            print(
-                f"Conversion completed at '{audio_output_path}' in {elapsed_time:.2f} seconds."
-            )
-        except Exception as error:
-            print(f"An error occurred during audio conversion: {error}")
-            print(traceback.format_exc())
+    @staticmethod
+    def print_batch_stats(stats):
+        elapsed = max(stats["elapsed"], 1e-9)
+        print(
+            f"Converted {stats['files']} files ({stats['audio_seconds']:.1f} seconds of audio, {stats['failed']} failed) in {stats['elapsed']:.2f} seconds: "
+            f"{stats['files'] / elapsed:.2f} files/s, {stats['audio_seconds'] / elapsed:.2f} audio-seconds/s, "
+            f"model busy {100 * stats['compute_seconds'] / (elapsed * stats['workers']):.0f}% of the time."
+        )
 
     def convert_audio_batch(
         self,
         audio_input_paths: str,
         audio_output_path: str,
+        decode_workers: int = 2,
+        encode_workers: int = 2,
+        workers: int = 1,
         **kwargs,
     ):
         """
-        Performs voice conversion on a batch of input audio files.
+        Performs voice conversion on a batch of input audio files, overlapping decoding,
+        conversion and encoding, see `convert_files`. With several workers, the files are
+        sharded over processes pinned to separate cores, see `convert_files_sharded`.
 
         Args:
             audio_input_paths (str): List of paths to the input audio files.
             audio_output_path (str): Path to the output audio file.
+            decode_workers (int, optional): Threads decoding inputs. Default is 2.
+            encode_workers (int, optional): Threads writing outputs. Default is 2.
+            workers (int, optional): Worker processes. Default is 1.
             resample_sr (int, optional): Resample sampling rate. Default is 0.
             sid (int, optional): Speaker ID. Default is 0.
             **kwargs: Additional keyword arguments.
@@ -368,7 +942,6 @@ class VoiceConverter:
                 os.path.join(now_dir, "assets", "infer_pid.txt"), "w"
             ) as pid_file:
                 pid_file.write(str(pid))
-            start_time = time.time()
             print(f"Converting audio batch '{audio_input_paths}'...")
             audio_files = [
                 f
@@ -392,20 +965,40 @@ class VoiceConverter:
                 )
             ]
             print(f"Detected {len(audio_files)} audio files for inference.")
+            files = []
             for a in audio_files:
                 new_input = os.path.join(audio_input_paths, a)
                 new_output = os.path.splitext(a)[0] + "_output.wav"
                 new_output = os.path.join(audio_output_path, new_output)
                 if os.path.exists(new_output):
                     continue
-                self.convert_audio(
-                    audio_input_path=new_input,
-                    audio_output_path=new_output,
+                files.append((new_input, new_output))
+            if workers > 1 and len(files) > 1:
+                stats = convert_files_sharded(
+                    files,
+                    workers,
+                    converter_settings={
+                        "max_models": self.model_registry.max_models,
+                        "model_budget_mb": self.model_registry.budget / (1024 * 1024),
+                        "quantize": self.quantize,
+                        "backend": self.backend,
+                        "onnx_threads": self.onnx_threads,
+                        "embedding_disk_cache": embedding_cache.cache_dir is not None,
+                    },
                     **kwargs,
                 )
+            else:
+                stats = self.convert_files(
+                    files, decode_workers, encode_workers, **kwargs
+                )
             print(f"Conversion completed at '{audio_input_paths}'.")
-            elapsed_time = time.time() - start_time
-            print(f"Batch conversion completed in {elapsed_time:.2f} seconds.")
+            self.print_batch_stats(stats)
+            if stats["workers"] == 1:
+                cache_stats = index_cache.stats()
+                print(
+                    f"Index cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['size_mb']:.1f} MB in use."
+                )
+            return stats
         except Exception as error:
             print(f"An error occurred during audio batch conversion: {error}")
             print(traceback.format_exc())
@@ -426,12 +1019,78 @@ class VoiceConverter:
                 torch.cuda.empty_cache()
 
         if not self.loaded_model or self.loaded_model != weight_root:
-            self.load_model(weight_root)
-            if self.cpt is not None:
-                self.setup_network()
+            entry = self.model_registry.get(weight_root, self.build_model)
+            if entry is not None:
+                self.net_g = entry.net_g
+                self.tgt_sr = entry.tgt_sr
+                self.version = entry.version
+                self.use_f0 = entry.use_f0
+                self.n_spk = entry.n_spk
+                self.vocoder = entry.vocoder
+                variant = [self.backend]
+                if self.quantize:
+                    variant.append("int8")
+                self.model_key = model_key(
+                    entry.vocoder, entry.config, " ".join(variant)
+                )
                 self.setup_vc_instance()
             self.loaded_model = weight_root
 
+    def load_entry(self, weight_root):
+        """
+        Loads a float32 model, from its optimized copy if there is an up-to-date one.
+
+        Args:
+            weight_root (str): Path to the model weights.
+        """
+        optimized_path = find_optimized_model(weight_root)
+        if optimized_path is not None:
+            entry = load_optimized_model(
+                optimized_path, self.config.device, model_path=weight_root
+            )
+        else:
+            self.load_model(weight_root)
+            if self.cpt is None:
+                return None
+            self.setup_network()
+            entry = LoadedModel(
+                model_path=weight_root,
+                net_g=self.net_g,
+                tgt_sr=self.tgt_sr,
+                version=self.version,
+                use_f0=self.use_f0,
+                n_spk=self.cpt["config"][-3],
+                vocoder=self.vocoder,
+                config=list(self.cpt["config"]),
+            )
+            self.cpt = None  # the weights now live in net_g
+        return entry
+
+    def build_model(self, weight_root):
+        """
+        Loads a model from disk, quantized if enabled or exported to ONNX for
+        the onnx backend, and wraps it for the model registry.
+
+        Args:
+            weight_root (str): Path to the model weights.
+        """
+        if self.backend == "onnx":
+            entry = self.load_entry(weight_root)
+            if entry is not None:
+                entry.net_g = load_onnx_synthesizer(
+                    entry.net_g, weight_root, self.onnx_threads
+                )
+            return entry
+        entry = load_quantized_model(weight_root) if self.quantize else None
+        if entry is None:
+            entry = self.load_entry(weight_root)
+            if entry is None:
+                return None
+            if self.quantize:
+                entry.net_g = quantize_synthesizer(entry.net_g)
+                save_quantized_model(entry)
+        return entry
+
     def cleanup_model(self):
         """
         Cleans up the model and releases resources.
@@ -442,10 +1101,11 @@ class VoiceConverter:
             if torch.cuda.is_available():
                 torch.cuda.empty_cache()
 
-        del self.net_g, self.cpt
+        self.model_registry.clear()
+        self.pipelines = {}
+        self.net_g = self.cpt = self.loaded_model = None
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
-        self.cpt = None
 
     def load_model(self, weight_root):
         """
@@ -487,6 +1147,15 @@ class VoiceConverter:
         """
         Sets up the voice conversion pipeline instance based on the target sampling rate and configuration.
         """
-        if self.cpt is not None:
-            self.vc = VC(self.tgt_sr, self.config)
-            self.n_spk = self.cpt["config"][-3]
+        if self.model_key not in self.segment_plans:
+            self.segment_plans[self.model_key] = segment_planner.plan(
+                self.config.device, self.config, self.model_key
+            )
+        plan = self.segment_plans[self.model_key]
+        if self.tgt_sr not in self.pipelines:
+            self.pipelines[self.tgt_sr] = VC(self.tgt_sr, self.config, plan)
+        self.vc = self.pipelines[self.tgt_sr]
+        self.vc.apply_plan(plan)
+        self.vc.model_key = self.model_key
+        self.vc.backend = self.backend
+        self.vc.onnx_threads = self.onnx_threads
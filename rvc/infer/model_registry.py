@@ -0,0 +1,141 @@
+import os
+import threading
+import dataclasses
+from collections import OrderedDict
+
+import torch
+
+DEFAULT_MAX_MODELS = 4
+DEFAULT_BUDGET_MB = 4096
+
+
+@dataclasses.dataclass
+class LoadedModel:
+    """
+    A ready-to-use voice model together with the metadata needed to run it.
+    """
+
+    model_path: str
+    net_g: torch.nn.Module
+    tgt_sr: int
+    version: str
+    use_f0: int
+    n_spk: int
+    vocoder: str
+    size: int = 0
+    # Synthesizer constructor arguments, to rebuild the model from a state_dict
+    config: list = None
+
+    @staticmethod
+    def module_size(module):
+        """
+        Returns the number of bytes held by the state of a module, including the packed
+        weights of quantized layers.
+
+        Args:
+            module (torch.nn.Module): The module to measure, or a runtime session
+                wrapper exposing its `size`.
+        """
+        if not isinstance(module, torch.nn.Module):
+            return getattr(module, "size", 0)
+        tensors = [
+            t for t in module.state_dict().values() if isinstance(t, torch.Tensor)
+        ]
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """
+    Keeps several loaded voice models resident and evicts the least recently used ones.
+
+    Models are keyed by the real path of the weights file and its mtime, so a model
+    overwritten on disk is reloaded on the next lookup. A model is evicted when more than
+    `max_models` are resident or when their combined size exceeds the memory budget.
+
+    Args:
+        max_models (int): Maximum number of resident models.
+        budget_mb (int): Memory budget for resident models in megabytes.
+    """
+
+    def __init__(self, max_models=DEFAULT_MAX_MODELS, budget_mb=DEFAULT_BUDGET_MB):
+        self.max_models = max(1, int(max_models))
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_path):
+        real_path = os.path.realpath(model_path)
+        return real_path, os.path.getmtime(real_path)
+
+    def get(self, model_path, loader):
+        """
+        Returns the resident model for a weights file, loading it with `loader` on a miss.
+
+        Args:
+            model_path (str): Path to the model weights.
+            loader (callable): Called with `model_path`, returns a LoadedModel or None.
+        """
+        if not os.path.isfile(model_path):
+            return None
+        key = self.make_key(model_path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = loader(model_path)
+        if entry is None:
+            return None
+        entry.size = entry.size or LoadedModel.module_size(entry.net_g)
+
+        with self.lock:
+            for stale_key in [k for k in self.entries if k[0] == key[0]]:
+                del self.entries[stale_key]
+            self.entries[key] = entry
+            self._evict()
+        return entry
+
+    def _evict(self):
+        total = sum(entry.size for entry in self.entries.values())
+        evicted = False
+        while len(self.entries) > 1 and (
+            len(self.entries) > self.max_models or total > self.budget
+        ):
+            _, entry = self.entries.popitem(last=False)
+            total -= entry.size
+            self.evictions += 1
+            evicted = True
+            print(f"Evicted model '{entry.model_path}' from memory.")
+        if evicted and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def clear(self):
+        """
+        Releases every resident model.
+        """
+        with self.lock:
+            self.entries.clear()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def stats(self):
+        """
+        Returns the hit/miss counters and the resident models.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "models": [entry.model_path for entry in self.entries.values()],
+                "size_mb": sum(entry.size for entry in self.entries.values())
+                / (1024 * 1024),
+                "budget_mb": self.budget / (1024 * 1024),
+            }
@@ -0,0 +1,502 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import warnings
+import contextlib
+import importlib.util
+from typing import Optional
+
+import torch
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.algorithm.commons import fold_weight_norm
+from rvc.lib.algorithm.synthesizers import Synthesizer
+
+BACKENDS = ("torch", "onnx")
+OPSET_VERSION = 17
+onnx_dir = os.path.join(now_dir, "logs", "cache", "onnx")
+# Frames of the example input the synthesizer is exported with
+TRACE_FRAMES = 64
+rmvpe_path = os.path.join(now_dir, "rvc", "models", "predictors", "rmvpe.pt")
+
+
+def onnx_available():
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def onnx_path(kind, key):
+    """
+    Returns the cache file of an exported graph.
+
+    Args:
+        kind (str): "synthesizer", "embedder" or "rmvpe".
+        key (str): Identifies the weights the graph was exported from.
+    """
+    digest = hashlib.sha256(f"{key}:torch{torch.__version__}".encode()).hexdigest()
+    return os.path.join(onnx_dir, f"{kind}-{digest[:16]}.onnx")
+
+
+def file_key(path):
+    stat = os.stat(path)
+    return f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def create_session(path, threads=0):
+    """
+    Opens an onnxruntime CPU session with every graph optimization enabled.
+
+    Args:
+        path (str): The ONNX model.
+        threads (int): Intra-op threads, 0 lets onnxruntime use every physical core.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = int(threads)
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def _export(module, inputs, path, input_names, output_names, dynamic_axes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    # export leaves the module in the training mode it had, so set it on the module
+    # that is exported
+    module = module.eval()
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        torch.onnx.export(
+            module,
+            inputs,
+            temp_path,
+            input_names=input_names,
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=OPSET_VERSION,
+            dynamo=False,
+        )
+    os.replace(temp_path, path)
+    return path
+
+
+class OnnxModule:
+    """
+    Runs an exported graph through onnxruntime, with torch tensors in and out.
+
+    Args:
+        path (str): The ONNX model.
+        input_names (list): Names of the positional inputs, in order.
+        threads (int): Intra-op threads, 0 lets onnxruntime use every physical core.
+    """
+
+    def __init__(self, path, input_names, threads=0):
+        self.session = create_session(path, threads)
+        self.input_names = input_names
+        # onnxruntime drops the inputs the optimized graph does not use
+        self.session_inputs = {item.name for item in self.session.get_inputs()}
+        self.size = os.path.getsize(path)
+
+    def __call__(self, *inputs):
+        feed = {
+            name: tensor.detach().cpu().numpy()
+            for name, tensor in zip(self.input_names, inputs)
+            if name in self.session_inputs
+        }
+        return torch.from_numpy(self.session.run(None, feed)[0])
+
+
+class InferenceGraph(torch.nn.Module):
+    """
+    The inference path of a Synthesizer as a traceable module. It shares the modules of
+    the Synthesizer and runs `Synthesizer.infer`, whose `torch.jit.export` decorator
+    would otherwise make tracing compile the whole model as TorchScript.
+
+    Args:
+        net_g (Synthesizer): The model, in eval mode with weight norm folded.
+    """
+
+    def __init__(self, net_g):
+        super().__init__()
+        self.emb_g = net_g.emb_g
+        self.enc_p = net_g.enc_p
+        self.flow = net_g.flow
+        self.dec = net_g.dec
+        self.use_f0 = net_g.use_f0
+
+    def forward(
+        self,
+        phone: torch.Tensor,
+        phone_lengths: torch.Tensor,
+        sid: torch.Tensor,
+        pitch: Optional[torch.Tensor] = None,
+        nsff0: Optional[torch.Tensor] = None,
+    ):
+        return Synthesizer.infer(self, phone, phone_lengths, pitch, nsff0, sid)[0]
+
+
+def example_inputs(net_g, frames, device, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    inputs = (
+        torch.randn(1, frames, net_g.enc_p.emb_phone.in_features, generator=generator),
+        torch.tensor([frames]),
+        torch.zeros(1, dtype=torch.long),
+    )
+    if net_g.use_f0:
+        inputs += (
+            torch.randint(1, 255, (1, frames), generator=generator),
+            torch.rand(1, frames, generator=generator) * 300 + 100,
+        )
+    return tuple(tensor.to(device) for tensor in inputs)
+
+
+class EmbedderGraph(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, audio: torch.Tensor):
+        return self.model(audio)["last_hidden_state"]
+
+
+def export_synthesizer(net_g, path):
+    """
+    Exports `Synthesizer.infer` with dynamic batch and time axes.
+
+    Args:
+        net_g (Synthesizer): The model, on the CPU.
+        path (str): Output file.
+    """
+    fold_weight_norm(net_g)
+    names = ["phone", "phone_lengths", "sid"]
+    dynamic_axes = {
+        "phone": {0: "batch", 1: "frames"},
+        "phone_lengths": {0: "batch"},
+        "sid": {0: "batch"},
+        "audio": {0: "batch", 2: "samples"},
+    }
+    if net_g.use_f0:
+        names += ["pitch", "nsff0"]
+        dynamic_axes["pitch"] = {0: "batch", 1: "frames"}
+        dynamic_axes["nsff0"] = {0: "batch", 1: "frames"}
+    return _export(
+        InferenceGraph(net_g),
+        example_inputs(net_g, TRACE_FRAMES, "cpu"),
+        path,
+        names,
+        ["audio"],
+        dynamic_axes,
+    )
+
+
+def export_embedder(model, path):
+    """
+    Exports the `last_hidden_state` of a HuBERT embedder with dynamic batch and time
+    axes. The final projection of v1 models stays in torch.
+
+    Args:
+        model (HubertModelWithFinalProj): The embedder, on the CPU.
+        path (str): Output file.
+    """
+    return _export(
+        EmbedderGraph(model),
+        (torch.zeros(1, 16000),),
+        path,
+        ["audio"],
+        ["last_hidden_state"],
+        {
+            "audio": {0: "batch", 1: "samples"},
+            "last_hidden_state": {0: "batch", 1: "frames"},
+        },
+    )
+
+
+def export_rmvpe(model, path):
+    """
+    Exports RMVPE's E2E network with dynamic batch and time axes. The time axis has to
+    be a multiple of 32 frames, as `RMVPE0Predictor.mel2hidden` pads it.
+
+    Args:
+        model (E2E): The network, on the CPU.
+        path (str): Output file.
+    """
+    from rvc.lib.predictors.RMVPE import N_MELS
+
+    return _export(
+        model,
+        (torch.zeros(1, N_MELS, 64),),
+        path,
+        ["mel"],
+        ["hidden"],
+        {"mel": {0: "batch", 2: "frames"}, "hidden": {0: "batch", 1: "frames"}},
+    )
+
+
+class OnnxSynthesizer:
+    """
+    Runs `Synthesizer.infer` through onnxruntime.
+
+    Args:
+        path (str): The exported synthesizer.
+        use_f0 (bool): Whether the model uses pitch guidance.
+        threads (int): Intra-op threads, 0 lets onnxruntime use every physical core.
+    """
+
+    def __init__(self, path, use_f0, threads=0):
+        names = ["phone", "phone_lengths", "sid"]
+        self.use_f0 = use_f0
+        self.module = OnnxModule(
+            path, names + ["pitch", "nsff0"] if use_f0 else names, threads
+        )
+        self.size = self.module.size
+
+    def infer(self, phone, phone_lengths, pitch=None, nsff0=None, sid=None, rate=None):
+        if rate is not None:
+            raise ValueError("The ONNX backend does not support time stretching.")
+        inputs = (phone, phone_lengths, sid)
+        if self.use_f0:
+            inputs += (pitch, nsff0)
+        return self.module(*inputs).to(phone.device), None, None
+
+
+class OnnxEmbedder:
+    """
+    Runs a HuBERT embedder through onnxruntime, with the interface `Pipeline` uses.
+
+    Args:
+        path (str): The exported embedder.
+        model (HubertModelWithFinalProj): The torch embedder, for its final projection
+            and configuration.
+        threads (int): Intra-op threads, 0 lets onnxruntime use every physical core.
+    """
+
+    def __init__(self, path, model, threads=0):
+        self.module = OnnxModule(path, ["audio"], threads)
+        self.final_proj = model.final_proj
+        self.conv_kernel = list(model.config.conv_kernel)
+        self.conv_stride = list(model.config.conv_stride)
+
+    def __call__(self, audio, attention_mask=None):
+        if attention_mask is None:
+            return {"last_hidden_state": self.module(audio).to(audio.device)}
+        # padded batch: embed every input at its own length and pad the frames
+        feats = [
+            self.module(audio[i : i + 1, :length])[0]
+            for i, length in enumerate(attention_mask.sum(-1).tolist())
+        ]
+        feats = torch.nn.utils.rnn.pad_sequence(feats, batch_first=True)
+        return {"last_hidden_state": feats.to(audio.device)}
+
+    def _get_feat_extract_output_lengths(self, lengths):
+        for kernel, stride in zip(self.conv_kernel, self.conv_stride):
+            lengths = torch.div(lengths - kernel, stride, rounding_mode="floor") + 1
+        return lengths
+
+
+def load_onnx_synthesizer(net_g, model_path, threads=0):
+    """
+    Returns an OnnxSynthesizer of a model, exported once and kept in `logs/cache/onnx`,
+    or the torch model if the export fails.
+
+    Args:
+        net_g (Synthesizer): The float32 model, on the CPU.
+        model_path (str): Path to the voice model, for the cache key.
+        threads (int): Intra-op threads, 0 lets onnxruntime use every physical core.
+    """
+    try:
+        path = onnx_path("synthesizer", file_key(model_path))
+        if not os.path.isfile(path):
+            export_synthesizer(net_g, path)
+        return OnnxSynthesizer(path, net_g.use_f0, threads)
+    except Exception as error:
+        print(f"An error occurred exporting the model to ONNX, using torch: {error}")
+        return net_g
+
+
+def load_onnx_embedder(model, threads=0):
+    """
+    Returns an OnnxEmbedder of a HuBERT embedder, exported once and kept in
+    `logs/cache/onnx`, or the torch embedder if the export fails.
+
+    Args:
+        model (HubertModelWithFinalProj): The embedder, on the CPU, with its
+            `embedder_name`.
+        threads (int): Intra-op threads, 0 lets onnxruntime use every physical core.
+    """
+    try:
+        path = onnx_path("embedder", model.embedder_name)
+        if not os.path.isfile(path):
+            export_embedder(model, path)
+        embedder = OnnxEmbedder(path, model, threads)
+    except Exception as error:
+        print(f"An error occurred exporting the embedder to ONNX, using torch: {error}")
+        return model
+    embedder.embedder_name = f"{model.embedder_name}:onnx"
+    return embedder
+
+
+def load_onnx_rmvpe(model, model_path=rmvpe_path, threads=0):
+    """
+    Returns RMVPE's E2E network as an OnnxModule, exported once and kept in
+    `logs/cache/onnx`, or the torch network if the export fails.
+
+    Args:
+        model (E2E): The network, on the CPU.
+        model_path (str): Path to the RMVPE weights, for the cache key.
+        threads (int): Intra-op threads, 0 lets onnxruntime use every physical core.
+    """
+    try:
+        path = onnx_path("rmvpe", file_key(model_path))
+        if not os.path.isfile(path):
+            export_rmvpe(model, path)
+        return OnnxModule(path, ["mel"], threads)
+    except Exception as error:
+        print(f"An error occurred exporting RMVPE to ONNX, using torch: {error}")
+        return model
+
+
+@contextlib.contextmanager
+def deterministic_noise():
+    """
+    Replaces the random tensors drawn by the synthesizer (the prior sample and the
+    sine source phase and noise) with zeros, so torch and onnxruntime can be compared.
+    Draws from an explicit generator, such as `example_inputs`, stay random.
+    """
+    rand, rand_like, randn_like = torch.rand, torch.rand_like, torch.randn_like
+
+    def zeros(*size, generator=None, **kwargs):
+        if generator is not None:
+            return rand(*size, generator=generator, **kwargs)
+        return torch.zeros(*size, **kwargs)
+
+    torch.rand, torch.rand_like, torch.randn_like = (
+        zeros,
+        torch.zeros_like,
+        torch.zeros_like,
+    )
+    try:
+        yield
+    finally:
+        torch.rand, torch.rand_like, torch.randn_like = rand, rand_like, randn_like
+
+
+def _compare(reference, candidate, inputs, repeats=3):
+    with torch.no_grad():
+        expected, result = reference(*inputs), candidate(*inputs)
+        timings = []
+        for function in (reference, candidate):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                function(*inputs)
+            timings.append((time.perf_counter() - start) / repeats)
+    return {
+        "max_difference": float((expected - result).abs().max()),
+        "torch_seconds": timings[0],
+        "onnx_seconds": timings[1],
+    }
+
+
+def check_parity(
+    model_path,
+    embedder_model="contentvec",
+    embedder_model_custom=None,
+    threads=0,
+    seconds=(3, 7),
+):
+    """
+    Exports the embedder, RMVPE and a voice model and compares onnxruntime against
+    torch on random inputs of several lengths, reporting the largest absolute output
+    difference and the time per call of both. The synthesizer is compared with its
+    random noise replaced by zeros, see `deterministic_noise`.
+
+    Args:
+        model_path (str): Path to the voice model.
+        embedder_model (str): Embedder model name.
+        embedder_model_custom (str): Path to a custom embedder.
+        threads (int): Intra-op threads, 0 lets onnxruntime use every physical core.
+        seconds (tuple): Input lengths in seconds.
+    """
+    import tempfile
+    from rvc.lib.utils import load_embedding
+    from rvc.lib.predictors.RMVPE import E2E, N_MELS
+    from rvc.infer.infer import VoiceConverter
+
+    generator = torch.Generator().manual_seed(0)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        embedder = load_embedding(embedder_model, embedder_model_custom).float().eval()
+        onnx_embedder = OnnxEmbedder(
+            export_embedder(embedder, os.path.join(directory, "embedder.onnx")),
+            embedder,
+            threads,
+        )
+        for length in seconds:
+            audio = torch.randn(1, 16000 * length, generator=generator)
+            results[f"embedder {length}s"] = _compare(
+                lambda x: embedder(x)["last_hidden_state"],
+                lambda x: onnx_embedder(x)["last_hidden_state"],
+                (audio,),
+            )
+
+        rmvpe = E2E(4, 1, (2, 2)).eval()
+        rmvpe.load_state_dict(
+            torch.load(rmvpe_path, map_location="cpu", weights_only=True)
+        )
+        onnx_rmvpe = OnnxModule(
+            export_rmvpe(rmvpe, os.path.join(directory, "rmvpe.onnx")), ["mel"], threads
+        )
+        for length in seconds:
+            frames = 32 * ((100 * length - 1) // 32 + 1)
+            mel = torch.randn(1, N_MELS, frames, generator=generator)
+            results[f"rmvpe {length}s"] = _compare(rmvpe, onnx_rmvpe, (mel,))
+
+        entry = VoiceConverter().load_entry(model_path)
+        net_g = entry.net_g.cpu().float().eval()
+        with deterministic_noise():
+            synthesizer = OnnxSynthesizer(
+                export_synthesizer(net_g, os.path.join(directory, "synthesizer.onnx")),
+                net_g.use_f0,
+                threads,
+            )
+            for length in seconds:
+                inputs = example_inputs(net_g, 100 * length, "cpu", seed=length)
+                phone, phone_lengths, sid = inputs[:3]
+                pitch, nsff0 = inputs[3:] if net_g.use_f0 else (None, None)
+                results[f"synthesizer {length}s"] = _compare(
+                    lambda *x: net_g.infer(*x)[0],
+                    lambda *x: synthesizer.infer(*x)[0],
+                    (phone, phone_lengths, pitch, nsff0, sid),
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the onnxruntime backend against torch."
+    )
+    parser.add_argument("--pth_path", type=str, required=True)
+    parser.add_argument("--embedder_model", type=str, default="contentvec")
+    parser.add_argument("--embedder_model_custom", type=str, default=None)
+    parser.add_argument("--onnx_threads", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, result in check_parity(
+        args.pth_path,
+        args.embedder_model,
+        args.embedder_model_custom,
+        args.onnx_threads,
+    ).items():
+        print(
+            f"{name}: max difference {result['max_difference']:.2e}, "
+            f"torch {result['torch_seconds']:.3f}s, "
+            f"onnx {result['onnx_seconds']:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import struct
+
+import numpy as np
+import torch
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.algorithm.commons import fold_weight_norm
+from rvc.lib.algorithm.synthesizers import Synthesizer
+from rvc.infer.model_registry import LoadedModel
+
+OPTIMIZED_SUFFIX = ".optimized.safetensors"
+OPTIMIZED_FORMAT = 1
+# Metadata of the .pth kept in the header, for `model_information`
+INFO_KEYS = (
+    "model_name",
+    "author",
+    "epoch",
+    "step",
+    "dataset_length",
+    "creation_date",
+    "model_hash",
+    "overtrain_info",
+    "embedder_model",
+    "speakers_id",
+)
+
+# safetensors dtype names
+DTYPES = {
+    "F64": np.float64,
+    "F32": np.float32,
+    "F16": np.float16,
+    "I64": np.int64,
+    "I32": np.int32,
+    "I16": np.int16,
+    "I8": np.int8,
+    "U8": np.uint8,
+    "BOOL": np.bool_,
+}
+DTYPE_NAMES = {np.dtype(dtype): name for name, dtype in DTYPES.items()}
+
+
+def write_safetensors(path, tensors, metadata=None):
+    """
+    Writes tensors to a file in the safetensors layout: the length of a JSON header as
+    a little-endian uint64, the header, then the raw little-endian tensor data.
+
+    The tensors are stored largest element size first and the header is padded to 8
+    bytes, so every tensor starts at an offset aligned to its element size and can be
+    memory-mapped as is.
+
+    Args:
+        path (str): Output file, written atomically.
+        tensors (dict): Tensor name to CPU tensor.
+        metadata (dict, optional): String keys and values stored in the header.
+    """
+    arrays = {
+        name: np.ascontiguousarray(tensor.detach().cpu().numpy())
+        for name, tensor in tensors.items()
+    }
+    order = sorted(arrays, key=lambda name: -arrays[name].itemsize)
+    header = {}
+    if metadata:
+        header["__metadata__"] = {str(k): str(v) for k, v in metadata.items()}
+    offset = 0
+    for name in order:
+        array = arrays[name]
+        if array.dtype not in DTYPE_NAMES:
+            raise ValueError(f"Unsupported dtype {array.dtype} for tensor {name}")
+        header[name] = {
+            "dtype": DTYPE_NAMES[array.dtype],
+            "shape": list(array.shape),
+            "data_offsets": [offset, offset + array.nbytes],
+        }
+        offset += array.nbytes
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 8)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for name in order:
+            array = arrays[name]
+            f.write(array.astype(array.dtype.newbyteorder("<"), copy=False).data)
+    os.replace(temp_path, path)
+
+
+def read_safetensors_header(path):
+    """
+    Returns the JSON header of a safetensors file and the offset of its data, reading
+    only the header bytes.
+
+    Args:
+        path (str): The safetensors file.
+    """
+    with open(path, "rb") as f:
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    return header, 8 + length
+
+
+def load_safetensors(path):
+    """
+    Memory-maps a safetensors file and returns its tensors and metadata. The tensors
+    are copy-on-write views of the mapping, pages are read from disk when first used.
+
+    Args:
+        path (str): The safetensors file.
+    """
+    header, data_offset = read_safetensors_header(path)
+    metadata = header.pop("__metadata__", {})
+    buffer = np.memmap(path, dtype=np.uint8, mode="c", offset=data_offset)
+    tensors = {}
+    for name, info in header.items():
+        start, end = info["data_offsets"]
+        array = buffer[start:end].view(DTYPES[info["dtype"]]).reshape(info["shape"])
+        tensors[name] = torch.from_numpy(array)
+    return tensors, metadata
+
+
+def optimized_path(model_path):
+    """
+    Returns the path of the optimized copy of a model, next to its .pth file.
+
+    Args:
+        model_path (str): Path to the voice model.
+    """
+    return os.path.splitext(model_path)[0] + OPTIMIZED_SUFFIX
+
+
+def is_optimized_model(model_path):
+    return str(model_path).endswith(OPTIMIZED_SUFFIX)
+
+
+def _fingerprint(model_path):
+    stat = os.stat(model_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def read_optimized_metadata(path):
+    """
+    Returns the metadata of an optimized model without reading its weights.
+
+    Args:
+        path (str): The optimized model.
+    """
+    header, _ = read_safetensors_header(path)
+    metadata = header.get("__metadata__", {})
+    return {key: json.loads(value) for key, value in metadata.items()}
+
+
+def find_optimized_model(model_path):
+    """
+    Returns the optimized model to load for a voice model: the path itself if it is one,
+    an up-to-date optimized copy next to the .pth file, or None.
+
+    Args:
+        model_path (str): Path to the voice model.
+    """
+    if is_optimized_model(model_path):
+        return model_path if os.path.isfile(model_path) else None
+    path = optimized_path(model_path)
+    if not os.path.isfile(path) or not os.path.isfile(model_path):
+        return None
+    try:
+        metadata = read_optimized_metadata(path)
+    except Exception as error:
+        print(f"An error occurred reading the optimized model {path}: {error}")
+        return None
+    source = _fingerprint(model_path)
+    if metadata.get("format") != OPTIMIZED_FORMAT or metadata.get("source") != source:
+        return None
+    return path
+
+
+def build_synthesizer(config, use_f0, version, vocoder):
+    """
+    Builds a Synthesizer for inference, without the posterior encoder.
+
+    Args:
+        config (list): Constructor arguments stored in the .pth file.
+        use_f0 (int): Whether the model uses pitch guidance.
+        version (str): Model version, "v1" or "v2".
+        vocoder (str): Vocoder name.
+    """
+    net_g = Synthesizer(
+        *config,
+        use_f0=use_f0,
+        text_enc_hidden_dim=768 if version == "v2" else 256,
+        vocoder=vocoder,
+    )
+    del net_g.enc_q
+    return net_g
+
+
+def export_optimized_model(model_path, output_path=None):
+    """
+    Writes an inference-ready copy of a voice model: float32 weights with weight norm
+    folded and without the posterior encoder, in a memory-mappable safetensors file
+    whose header holds the model configuration.
+
+    Args:
+        model_path (str): Path to the .pth voice model.
+        output_path (str, optional): Output file, next to the .pth file by default.
+    """
+    cpt = torch.load(model_path, map_location="cpu", weights_only=True)
+    config = list(cpt["config"])
+    config[-3] = cpt["weight"]["emb_g.weight"].shape[0]
+    use_f0 = cpt.get("f0", 1)
+    version = cpt.get("version", "v1")
+    vocoder = cpt.get("vocoder", "HiFi-GAN")
+
+    net_g = build_synthesizer(config, use_f0, version, vocoder)
+    net_g.load_state_dict(cpt["weight"], strict=False)
+    fold_weight_norm(net_g.float().eval())
+
+    metadata = {
+        "format": OPTIMIZED_FORMAT,
+        "source": _fingerprint(model_path),
+        "config": config,
+        "sr": config[-1],
+        "f0": use_f0,
+        "version": version,
+        "vocoder": vocoder,
+    }
+    metadata.update({key: cpt[key] for key in INFO_KEYS if key in cpt})
+    output_path = output_path or optimized_path(model_path)
+    write_safetensors(
+        output_path,
+        net_g.state_dict(),
+        {key: json.dumps(value) for key, value in metadata.items()},
+    )
+    print(f"Optimized model saved to {output_path}")
+    return output_path
+
+
+def load_optimized_model(path, device="cpu", model_path=None):
+    """
+    Loads an optimized model as a LoadedModel. The Synthesizer is built without
+    allocating weights and takes the memory-mapped tensors as its parameters, so on the
+    CPU the load does not copy the weights.
+
+    Args:
+        path (str): The optimized model.
+        device (str): Device to run the model on.
+        model_path (str, optional): Path the model is registered under, `path` if None.
+    """
+    tensors, metadata = load_safetensors(path)
+    metadata = {key: json.loads(value) for key, value in metadata.items()}
+    if metadata.get("format") != OPTIMIZED_FORMAT:
+        raise ValueError(f"Unsupported optimized model format in {path}")
+    with torch.device("meta"):
+        net_g = build_synthesizer(
+            metadata["config"], metadata["f0"], metadata["version"], metadata["vocoder"]
+        )
+        fold_weight_norm(net_g)
+    net_g.load_state_dict(tensors, assign=True)
+    net_g = net_g.to(device).eval()
+    return LoadedModel(
+        model_path=model_path or path,
+        net_g=net_g,
+        tgt_sr=metadata["sr"],
+        version=metadata["version"],
+        use_f0=metadata["f0"],
+        n_spk=metadata["config"][-3],
+        vocoder=metadata["vocoder"],
+        config=metadata["config"],
+    )
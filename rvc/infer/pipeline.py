@@ -1,21 +1,35 @@
 import os
-import gc
 import re
 import sys
+import time
 import torch
 import torch.nn.functional as F
 import torchcrepe
-import faiss
 import librosa
 import numpy as np
 from scipy import signal
 from torch import Tensor
+from concurrent.futures import ThreadPoolExecutor
 
 now_dir = os.getcwd()
 sys.path.append(now_dir)
 
-from rvc.lib.predictors.RMVPE import RMVPE0Predictor
-from rvc.lib.predictors.FCPE import FCPEF0Predictor
+from rvc.lib.predictors.PredictorPool import predictor_pool
+from rvc.infer.index_cache import index_cache
+from rvc.infer.retrieval import retrieve_speaker_embeddings
+from rvc.infer.f0_postprocess import (
+    Autotune,
+    REF_FREQS,
+    overlay_f0_file,
+    quantize_f0,
+)
+from rvc.infer.segmentation import (
+    find_cut_points,
+    peak_rss_gb,
+    reset_peak_rss,
+    segment_planner,
+)
+from rvc.infer.feature_cache import f0_cache, embedding_cache, audio_hash
 
 import logging
 
@@ -86,128 +100,86 @@ class AudioProcessor:
         return adjusted_audio
 
 
-class Autotune:
-    """
-    A class for applying autotune to a given fundamental frequency (F0) contour.
-    """
-
-    def __init__(self, ref_freqs):
-        """
-        Initializes the Autotune class with a set of reference frequencies.
-
-        Args:
-            ref_freqs: A list of reference frequencies representing musical notes.
-        """
-        self.ref_freqs = ref_freqs
-        self.note_dict = self.ref_freqs  # No interpolation needed
-
-    def autotune_f0(self, f0, f0_autotune_strength):
-        """
-        Autotunes a given F0 contour by snapping each frequency to the closest reference frequency.
-
-        Args:
-            f0: The input F0 contour as a NumPy array.
-        """
-        autotuned_f0 = np.zeros_like(f0)
-        for i, freq in enumerate(f0):
-            closest_note = min(self.note_dict, key=lambda x: abs(x - freq))
-            autotuned_f0[i] = freq + (closest_note - freq) * f0_autotune_strength
-        return autotuned_f0
-
-
 class Pipeline:
     """
     The main pipeline class for performing voice conversion, including preprocessing, F0 estimation,
     voice conversion using a model, and post-processing.
     """
 
-    def __init__(self, tgt_sr, config):
+    def __init__(self, tgt_sr, config, plan=None):
         """
         Initializes the Pipeline class with target sampling rate and configuration parameters.
 
         Args:
             tgt_sr: The target sampling rate for the output audio.
             config: A configuration object containing various parameters for the pipeline.
+            plan: Optional `SegmentPlan` used instead of the segment lengths of `config`.
         """
-        self.x_pad = config.x_pad
-        self.x_query = config.x_query
-        self.x_center = config.x_center
-        self.x_max = config.x_max
+        self.tgt_sr = tgt_sr
         self.sample_rate = 16000
         self.window = 160
-        self.t_pad = self.sample_rate * self.x_pad
-        self.t_pad_tgt = tgt_sr * self.x_pad
-        self.t_pad2 = self.t_pad * 2
-        self.t_query = self.sample_rate * self.x_query
-        self.t_center = self.sample_rate * self.x_center
-        self.t_max = self.sample_rate * self.x_max
+        self.apply_plan(config if plan is None else plan)
         self.time_step = self.window / self.sample_rate * 1000
         self.f0_min = 50
         self.f0_max = 1100
         self.f0_mel_min = 1127 * np.log(1 + self.f0_min / 700)
         self.f0_mel_max = 1127 * np.log(1 + self.f0_max / 700)
         self.device = config.device
-        self.ref_freqs = [
-            49.00,  # G1
-            51.91,  # G#1 / Ab1
-            55.00,  # A1
-            58.27,  # A#1 / Bb1
-            61.74,  # B1
-            65.41,  # C2
-            69.30,  # C#2 / Db2
-            73.42,  # D2
-            77.78,  # D#2 / Eb2
-            82.41,  # E2
-            87.31,  # F2
-            92.50,  # F#2 / Gb2
-            98.00,  # G2
-            103.83,  # G#2 / Ab2
-            110.00,  # A2
-            116.54,  # A#2 / Bb2
-            123.47,  # B2
-            130.81,  # C3
-            138.59,  # C#3 / Db3
-            146.83,  # D3
-            155.56,  # D#3 / Eb3
-            164.81,  # E3
-            174.61,  # F3
-            185.00,  # F#3 / Gb3
-            196.00,  # G3
-            207.65,  # G#3 / Ab3
-            220.00,  # A3
-            233.08,  # A#3 / Bb3
-            246.94,  # B3
-            261.63,  # C4
-            277.18,  # C#4 / Db4
-            293.66,  # D4
-            311.13,  # D#4 / Eb4
-            329.63,  # E4
-            349.23,  # F4
-            369.99,  # F#4 / Gb4
-            392.00,  # G4
-            415.30,  # G#4 / Ab4
-            440.00,  # A4
-            466.16,  # A#4 / Bb4
-            493.88,  # B4
-            523.25,  # C5
-            554.37,  # C#5 / Db5
-            587.33,  # D5
-            622.25,  # D#5 / Eb5
-            659.25,  # E5
-            698.46,  # F5
-            739.99,  # F#5 / Gb5
-            783.99,  # G5
-            830.61,  # G#5 / Ab5
-            880.00,  # A5
-            932.33,  # A#5 / Bb5
-            987.77,  # B5
-            1046.50,  # C6
-        ]
-        self.autotune = Autotune(self.ref_freqs)
+        self.ref_freqs = REF_FREQS.tolist()
+        self.autotune = Autotune(REF_FREQS)
         self.note_dict = self.autotune.note_dict
-        self.model_rmvpe = RMVPE0Predictor(
-            os.path.join("rvc", "models", "predictors", "rmvpe.pt"),
-            device=self.device,
+        self.autotunes = {"chromatic": self.autotune}
+        # runtime of RMVPE, set by VoiceConverter
+        self.backend = "torch"
+        self.onnx_threads = 0
+        # model the segment timings are recorded for, see `model_key`
+        self.model_key = None
+
+    def apply_plan(self, plan):
+        """
+        Sets the segment lengths of the pipeline.
+
+        Args:
+            plan: `SegmentPlan`, or an object with the same x_pad, x_query, x_center and
+                x_max attributes such as `Config`.
+        """
+        self.x_pad = plan.x_pad
+        self.x_query = plan.x_query
+        self.x_center = plan.x_center
+        self.x_max = plan.x_max
+        self.t_pad = self.sample_rate * self.x_pad
+        self.t_pad_tgt = self.tgt_sr * self.x_pad
+        self.t_pad2 = self.t_pad * 2
+        self.t_query = self.sample_rate * self.x_query
+        self.t_center = self.sample_rate * self.x_center
+        self.t_max = self.sample_rate * self.x_max
+
+    @property
+    def model_rmvpe(self):
+        """
+        The shared RMVPE predictor for this pipeline's device, loaded on first use.
+        """
+        if self.backend == "onnx":
+            return predictor_pool.get(
+                "rmvpe", self.device, backend="onnx", threads=self.onnx_threads
+            )
+        return predictor_pool.get("rmvpe", self.device)
+
+    def get_fcpe(self, f0_min, f0_max):
+        """
+        Returns the shared FCPE predictor for the given F0 range, loaded on first use.
+
+        Args:
+            f0_min: Minimum F0 value to consider.
+            f0_max: Maximum F0 value to consider.
+        """
+        return predictor_pool.get(
+            "fcpe",
+            self.device,
+            f0_min=int(f0_min),
+            f0_max=int(f0_max),
+            sample_rate=self.sample_rate,
+            threshold=0.03,
         )
 
     def get_f0_crepe(
@@ -218,6 +190,7 @@ class Pipeline:
         p_len,
         hop_length,
         model="full",
+        normalize=True,
     ):
         """
         Estimates the fundamental frequency (F0) of a given audio signal using the Crepe model.
@@ -229,9 +202,11 @@ class Pipeline:
             p_len: Desired length of the F0 output.
             hop_length: Hop length for the Crepe model.
             model: Crepe model size to use ("full" or "tiny").
+            normalize: Whether to peak-normalize the input, False if it already is.
         """
-        x = x.astype(np.float32)
-        x /= np.quantile(np.abs(x), 0.999)
+        if normalize:
+            x = x.astype(np.float32)
+            x /= np.quantile(np.abs(x), 0.999)
         audio = torch.from_numpy(x).to(self.device, copy=True)
         audio = torch.unsqueeze(audio, dim=0)
         if audio.ndim == 2 and audio.shape[0] > 1:
@@ -271,6 +246,11 @@ class Pipeline:
         """
         Estimates the fundamental frequency (F0) using a hybrid approach combining multiple methods.
 
+        The estimators run concurrently in a thread pool on one shared, peak-normalized
+        copy of the input; they spend most of their time in torch, which releases the GIL,
+        so the hybrid costs about as much as its slowest member. Their contours are
+        trimmed or NaN-padded to `p_len` frames and combined with a per-frame median.
+
         Args:
             methods_str: A string specifying the methods to combine (e.g., "hybrid[crepe+rmvpe]").
             x: The input audio signal as a NumPy array.
@@ -279,44 +259,73 @@ class Pipeline:
             p_len: Desired length of the F0 output.
             hop_length: Hop length for F0 estimation methods.
         """
-        methods_str = re.search("hybrid\[(.+)\]", methods_str)
-        if methods_str:
-            methods = [method.strip() for method in methods_str.group(1).split("+")]
-        f0_computation_stack = []
+        match = re.search(r"hybrid\[(.+)\]", methods_str)
+        if not match:
+            raise ValueError(f"Invalid hybrid F0 method: {methods_str}")
+        methods = []
+        for method in match.group(1).split("+"):
+            method = method.strip()
+            if method not in ("crepe", "crepe-tiny", "rmvpe", "fcpe"):
+                print(f"Unknown F0 method '{method}' in hybrid, skipping it.")
+            elif method not in methods:
+                methods.append(method)
+        if not methods:
+            raise ValueError(f"No usable F0 method in: {methods_str}")
         print(f"Calculating f0 pitch estimations for methods: {', '.join(methods)}")
         x = x.astype(np.float32)
         x /= np.quantile(np.abs(x), 0.999)
-        for method in methods:
-            f0 = None
-            if method == "crepe":
-                f0 = self.get_f0_crepe_computation(
-                    x, f0_min, f0_max, p_len, int(hop_length)
-                )
-            elif method == "rmvpe":
-                f0 = self.model_rmvpe.infer_from_audio(x, thred=0.03)
-                f0 = f0[1:]
-            elif method == "fcpe":
-                self.model_fcpe = FCPEF0Predictor(
-                    os.path.join("rvc", "models", "predictors", "fcpe.pt"),
-                    f0_min=int(f0_min),
-                    f0_max=int(f0_max),
-                    dtype=torch.float32,
-                    device=self.device,
-                    sample_rate=self.sample_rate,
-                    threshold=0.03,
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, len(methods))) as executor:
+            futures = [
+                executor.submit(
+                    self._estimate_hybrid_member,
+                    method,
+                    x,
+                    f0_min,
+                    f0_max,
+                    p_len,
+                    hop_length,
                 )
-                f0 = self.model_fcpe.compute_f0(x, p_len=p_len)
-                del self.model_fcpe
-                gc.collect()
-            f0_computation_stack.append(f0)
+                for method in methods
+            ]
+            results = [future.result() for future in futures]
+        timings = ", ".join(
+            f"{method} {elapsed:.2f}s" for method, (_, elapsed) in zip(methods, results)
+        )
+        print(
+            f"Hybrid f0 timings: {timings} (total {time.perf_counter() - start:.2f}s)"
+        )
 
-        f0_computation_stack = [fc for fc in f0_computation_stack if fc is not None]
-        f0_median_hybrid = None
+        f0_computation_stack = []
+        for f0, _ in results:
+            f0 = np.asarray(f0, dtype=np.float32)[:p_len]
+            if f0.shape[0] < p_len:
+                f0 = np.pad(f0, (0, p_len - f0.shape[0]), constant_values=np.nan)
+            f0_computation_stack.append(f0)
         if len(f0_computation_stack) == 1:
             f0_median_hybrid = f0_computation_stack[0]
         else:
-            f0_median_hybrid = np.nanmedian(f0_computation_stack, axis=0)
-        return f0_median_hybrid
+            f0_median_hybrid = np.nanmedian(np.stack(f0_computation_stack), axis=0)
+        return np.nan_to_num(f0_median_hybrid)
+
+    def _estimate_hybrid_member(self, method, x, f0_min, f0_max, p_len, hop_length):
+        start = time.perf_counter()
+        if method in ("crepe", "crepe-tiny"):
+            f0 = self.get_f0_crepe(
+                x,
+                f0_min,
+                f0_max,
+                p_len,
+                int(hop_length),
+                "tiny" if method == "crepe-tiny" else "full",
+                normalize=False,
+            )
+        elif method == "rmvpe":
+            f0 = self.model_rmvpe.infer_from_audio(x, thred=0.03)
+        else:
+            f0 = self.get_fcpe(f0_min, f0_max).compute_f0(x, p_len=p_len)
+        return f0, time.perf_counter() - start
 
     def get_f0(
         self,
@@ -329,6 +338,8 @@ class Pipeline:
         f0_autotune,
         f0_autotune_strength,
         inp_f0=None,
+        raw_f0=None,
+        f0_autotune_scale="chromatic",
     ):
         """
         Estimates the fundamental frequency (F0) of a given audio signal using various methods.
@@ -342,6 +353,50 @@ class Pipeline:
             hop_length: Hop length for F0 estimation methods.
             f0_autotune: Whether to apply autotune to the F0 contour.
             inp_f0: Optional input F0 contour to use instead of estimating.
+            raw_f0: Optional precomputed raw F0 contour, skips the estimation.
+            f0_autotune_scale: Scale the autotune snaps to.
+        """
+        if raw_f0 is None:
+            f0 = self.estimate_f0(input_audio_path, x, p_len, f0_method, hop_length)
+        else:
+            f0 = raw_f0
+        return self.postprocess_f0(
+            f0, pitch, f0_autotune, f0_autotune_strength, inp_f0, f0_autotune_scale
+        )
+
+    def estimate_f0(self, input_audio_path, x, p_len, f0_method, hop_length):
+        """
+        Estimates the raw F0 contour of an audio signal, before any pitch adjustment.
+
+        Args:
+            input_audio_path: Path to the input audio file.
+            x: The input audio signal as a NumPy array.
+            p_len: Desired length of the F0 output.
+            f0_method: Method to use for F0 estimation (e.g., "crepe").
+            hop_length: Hop length for F0 estimation methods.
+
+        Results are cached by audio content, method, hop length and output length, so
+        repeated conversions of the same input only pay for the post-processing.
+        """
+        key = (audio_hash(x), f0_method, int(hop_length), p_len)
+        f0 = f0_cache.get(key)
+        if f0 is not None:
+            return f0
+        f0 = self.compute_f0(input_audio_path, x, p_len, f0_method, hop_length)
+        f0_cache.put(key, f0)
+        return f0
+
+    def compute_f0(self, input_audio_path, x, p_len, f0_method, hop_length):
+        """
+        Estimates the raw F0 contour of an audio signal without going through the F0 cache,
+        for callers such as the streaming converter whose inputs never repeat.
+
+        Args:
+            input_audio_path: Path to the input audio file.
+            x: The input audio signal as a NumPy array.
+            p_len: Desired length of the F0 output.
+            f0_method: Method to use for F0 estimation (e.g., "crepe").
+            hop_length: Hop length for F0 estimation methods.
         """
         global input_audio_path2wav
         if f0_method == "crepe":
@@ -353,18 +408,7 @@ class Pipeline:
         elif f0_method == "rmvpe":
             f0 = self.model_rmvpe.infer_from_audio(x, thred=0.03)
         elif f0_method == "fcpe":
-            self.model_fcpe = FCPEF0Predictor(
-                os.path.join("rvc", "models", "predictors", "fcpe.pt"),
-                f0_min=int(self.f0_min),
-                f0_max=int(self.f0_max),
-                dtype=torch.float32,
-                device=self.device,
-                sample_rate=self.sample_rate,
-                threshold=0.03,
-            )
-            f0 = self.model_fcpe.compute_f0(x, p_len=p_len)
-            del self.model_fcpe
-            gc.collect()
+            f0 = self.get_fcpe(self.f0_min, self.f0_max).compute_f0(x, p_len=p_len)
         elif "hybrid" in f0_method:
             input_audio_path2wav[input_audio_path] = x.astype(np.double)
             f0 = self.get_f0_hybrid(
@@ -375,31 +419,93 @@ class Pipeline:
                 p_len,
                 hop_length,
             )
+        return f0
+
+    def estimate_f0_padded(self, audio, f0_method, hop_length):
+        """
+        Estimates the raw F0 contour of a whole input the way `pipeline` sees it, high-pass
+        filtered and reflect-padded by `t_pad`, so chunks of it can be passed as `raw_f0`.
+
+        Args:
+            audio: The input audio signal at 16 kHz.
+            f0_method: Method to use for F0 estimation.
+            hop_length: Hop length for F0 estimation methods.
+        """
+        audio = signal.filtfilt(bh, ah, audio)
+        audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
+        return self.estimate_f0(
+            "input_audio_path",
+            audio_pad,
+            audio_pad.shape[0] // self.window,
+            f0_method,
+            hop_length,
+        )
+
+    def slice_f0(self, f0, start, length):
+        """
+        Returns the part of a whole-input raw F0 contour that covers one padded chunk,
+        zero-filled past the end of the contour.
+
+        The contour is sliced at whole frames, so `start` must be a multiple of `window`
+        for the slice to line up with the chunk, see the `grid` of `process_audio`.
+
+        Args:
+            f0: Raw F0 contour from `estimate_f0_padded`.
+            start: First sample of the chunk in the unpadded input, on the hop grid.
+            length: Length of the chunk after padding by `t_pad` on both sides, in samples.
+        """
+        assert start % self.window == 0, start
+        first = start // self.window
+        n_frames = length // self.window + 1
+        f0 = f0[first : first + n_frames]
+        if f0.shape[0] < n_frames:
+            f0 = np.pad(f0, (0, n_frames - f0.shape[0]))
+        return f0
+
+    def get_autotune(self, scale="chromatic"):
+        """
+        Returns the Autotune instance restricted to a scale, see `f0_postprocess.parse_scale`.
+
+        Args:
+            scale: Scale name, optionally preceded by its key, e.g. "A minor".
+        """
+        autotune = self.autotunes.get(scale)
+        if autotune is None:
+            autotune = self.autotunes[scale] = Autotune(REF_FREQS, scale)
+        return autotune
 
+    def postprocess_f0(
+        self,
+        f0,
+        pitch,
+        f0_autotune,
+        f0_autotune_strength,
+        inp_f0=None,
+        f0_autotune_scale="chromatic",
+    ):
+        """
+        Applies autotune, transposition and the optional F0 file overlay to a raw F0 contour,
+        and quantizes the result to coarse mel bins.
+
+        Args:
+            f0: The raw F0 contour as a NumPy array.
+            pitch: Key to adjust the pitch of the F0 contour.
+            f0_autotune: Whether to apply autotune to the F0 contour.
+            f0_autotune_strength: Strength of the autotune correction.
+            inp_f0: Optional input F0 contour to use instead of estimating.
+            f0_autotune_scale: Scale the autotune snaps to, e.g. "chromatic" or "A minor".
+        """
         if f0_autotune is True:
-            f0 = Autotune.autotune_f0(self, f0, f0_autotune_strength)
+            f0 = self.get_autotune(f0_autotune_scale).autotune_f0(
+                f0, f0_autotune_strength
+            )
 
-        f0 *= pow(2, pitch / 12)
-        tf0 = self.sample_rate // self.window
+        f0 = f0 * pow(2, pitch / 12)
         if inp_f0 is not None:
-            delta_t = np.round(
-                (inp_f0[:, 0].max() - inp_f0[:, 0].min()) * tf0 + 1
-            ).astype("int16")
-            replace_f0 = np.interp(
-                list(range(delta_t)), inp_f0[:, 0] * 100, inp_f0[:, 1]
-            )
-            shape = f0[self.x_pad * tf0 : self.x_pad * tf0 + len(replace_f0)].shape[0]
-            f0[self.x_pad * tf0 : self.x_pad * tf0 + len(replace_f0)] = replace_f0[
-                :shape
-            ]
+            tf0 = self.sample_rate // self.window
+            f0 = overlay_f0_file(f0, inp_f0, self.x_pad * tf0, tf0)
         f0bak = f0.copy()
-        f0_mel = 1127 * np.log(1 + f0 / 700)
-        f0_mel[f0_mel > 0] = (f0_mel[f0_mel > 0] - self.f0_mel_min) * 254 / (
-            self.f0_mel_max - self.f0_mel_min
-        ) + 1
-        f0_mel[f0_mel <= 1] = 1
-        f0_mel[f0_mel > 255] = 255
-        f0_coarse = np.rint(f0_mel).astype(int)
+        f0_coarse = quantize_f0(f0, self.f0_mel_min, self.f0_mel_max)
 
         return f0_coarse, f0bak
 
@@ -416,6 +522,7 @@ class Pipeline:
         index_rate,
         version,
         protect,
+        feats=None,
     ):
         """
         Performs voice conversion on a given audio segment.
@@ -432,74 +539,328 @@ class Pipeline:
             index_rate: Blending rate for speaker embedding retrieval.
             version: Model version (Keep to support old models).
             protect: Protection level for preserving the original pitch.
+            feats: Optional embedder output of the segment, see `embed_source`.
         """
         with torch.no_grad():
             pitch_guidance = pitch != None and pitchf != None
-            # prepare source audio
-            feats = torch.from_numpy(audio0).float()
-            feats = feats.mean(-1) if feats.dim() == 2 else feats
-            assert feats.dim() == 1, feats.dim()
-            feats = feats.view(1, -1).to(self.device)
             # extract features
-            feats = model(feats)["last_hidden_state"]
+            if feats is None:
+                feats = self.extract_features(model, audio0)
             feats = (
                 model.final_proj(feats[0]).unsqueeze(0) if version == "v1" else feats
             )
-            # make a copy for pitch guidance and protection
-            feats0 = feats.clone() if pitch_guidance else None
-            if (
-                index
-            ):  # set by parent function, only true if index is available, loaded, and index rate > 0
-                feats = self._retrieve_speaker_embeddings(
-                    feats, index, big_npy, index_rate
-                )
-            # feature upsampling
-            feats = F.interpolate(feats.permute(0, 2, 1), scale_factor=2).permute(
-                0, 2, 1
-            )
             # adjust the length if the audio is short
-            p_len = min(audio0.shape[0] // self.window, feats.shape[1])
+            p_len = min(audio0.shape[0] // self.window, 2 * feats.shape[1])
             if pitch_guidance:
-                feats0 = F.interpolate(feats0.permute(0, 2, 1), scale_factor=2).permute(
-                    0, 2, 1
-                )
                 pitch, pitchf = pitch[:, :p_len], pitchf[:, :p_len]
-                # Pitch protection blending
-                if protect < 0.5:
-                    pitchff = pitchf.clone()
-                    pitchff[pitchf > 0] = 1
-                    pitchff[pitchf < 1] = protect
-                    feats = feats * pitchff.unsqueeze(-1) + feats0 * (
-                        1 - pitchff.unsqueeze(-1)
-                    )
-                    feats = feats.to(feats0.dtype)
             else:
                 pitch, pitchf = None, None
-            p_len = torch.tensor([p_len], device=self.device).long()
-            audio1 = (
-                (net_g.infer(feats.float(), p_len, pitch, pitchf.float(), sid)[0][0, 0])
-                .data.cpu()
-                .float()
-                .numpy()
+            feats = self.prepare_features(
+                feats, pitchf, index, big_npy, index_rate, protect, p_len
             )
+            audio1 = self.synthesize(
+                net_g,
+                feats,
+                [p_len],
+                pitch,
+                pitchf,
+                sid,
+                audio0.shape[0] / self.sample_rate,
+            )[0]
             # clean up
-            del feats, feats0, p_len
+            del feats
             if torch.cuda.is_available():
                 torch.cuda.empty_cache()
         return audio1
 
-    def _retrieve_speaker_embeddings(self, feats, index, big_npy, index_rate):
-        npy = feats[0].cpu().numpy()
-        score, ix = index.search(npy, k=8)
-        weight = np.square(1 / score)
-        weight /= weight.sum(axis=1, keepdims=True)
-        npy = np.sum(big_npy[ix] * np.expand_dims(weight, axis=2), axis=1)
-        feats = (
-            torch.from_numpy(npy).unsqueeze(0).to(self.device) * index_rate
-            + (1 - index_rate) * feats
+    @staticmethod
+    def upsample_features(feats):
+        """
+        Doubles the frame rate of features of shape (batch, frames, channels), from the
+        embedder's 50 frames per second to the 100 of the F0 contour.
+
+        Args:
+            feats: The features.
+        """
+        return F.interpolate(feats.permute(0, 2, 1), scale_factor=2).permute(0, 2, 1)
+
+    @staticmethod
+    def protect_features(feats, feats0, pitchf, protect):
+        """
+        Blends features back towards the original embedder output on unvoiced frames, by
+        `protect` on frames without F0 and not at all on voiced ones. A `protect` of 0.5
+        or more leaves the features unchanged.
+
+        Args:
+            feats: Features after retrieval, of shape (batch, frames, channels).
+            feats0: The same features before retrieval.
+            pitchf: Fine F0 of shape (batch, frames).
+            protect: Protection level for preserving the original pitch.
+        """
+        if protect >= 0.5:
+            return feats
+        pitchff = pitchf.clone()
+        pitchff[pitchf > 0] = 1
+        pitchff[pitchf < 1] = protect
+        pitchff = pitchff.unsqueeze(-1)
+        return (feats * pitchff + feats0 * (1 - pitchff)).to(feats0.dtype)
+
+    def prepare_features(
+        self, feats, pitchf, index, big_npy, index_rate, protect, p_len, lengths=None
+    ):
+        """
+        Turns embedder features into the input of `Synthesizer.infer`: blends them with
+        their nearest index vectors, upsamples them to the F0 frame rate, cuts them to
+        `p_len` frames and, with pitch guidance, protects the unvoiced frames.
+
+        Args:
+            feats: Embedder features of shape (batch, frames, channels), after
+                `final_proj` for v1 models.
+            pitchf: Fine F0 of shape (batch, p_len), or None without pitch guidance.
+            index: FAISS index for speaker embedding retrieval, or None.
+            big_npy: Speaker embeddings stored in a NumPy array.
+            index_rate: Blending rate for speaker embedding retrieval.
+            protect: Protection level for preserving the original pitch.
+            p_len: Number of output frames, the longest row of a padded batch.
+            lengths: Valid frames of every row of a padded batch.
+        """
+        feats0 = feats.clone() if pitchf is not None else None
+        if index:
+            feats = self._retrieve_speaker_embeddings(
+                feats, index, big_npy, index_rate, lengths
+            )
+        feats = self.upsample_features(feats)[:, :p_len]
+        if pitchf is not None:
+            feats0 = self.upsample_features(feats0)[:, :p_len]
+            feats = self.protect_features(feats, feats0, pitchf, protect)
+        return feats
+
+    def prepare_pitch(
+        self,
+        f0,
+        p_len,
+        pitch,
+        f0_autotune,
+        f0_autotune_strength,
+        inp_f0=None,
+        f0_autotune_scale="chromatic",
+    ):
+        """
+        Post-processes a raw F0 contour with `postprocess_f0` and returns its first
+        `p_len` frames as coarse and fine F0 tensors of shape (1, frames).
+
+        Args:
+            f0: The raw F0 contour.
+            p_len: Number of frames.
+            The remaining arguments are the same as for `postprocess_f0`.
+        """
+        f0_coarse, f0bak = self.postprocess_f0(
+            f0, pitch, f0_autotune, f0_autotune_strength, inp_f0, f0_autotune_scale
+        )
+        pitch = torch.tensor(f0_coarse[:p_len], device=self.device).unsqueeze(0).long()
+        pitchf = torch.tensor(
+            f0bak[:p_len], device=self.device, dtype=torch.float32
+        ).unsqueeze(0)
+        return pitch, pitchf
+
+    def synthesize(self, net_g, feats, p_lens, pitch, pitchf, sid, seconds=None):
+        """
+        Runs `Synthesizer.infer` on one batch and returns its output audio as a float32
+        array of shape (batch, samples). Single segments of `seconds` of input are timed
+        for the segment planner, with their peak device memory on CUDA and the growth of
+        the resident memory on the CPU.
+
+        Args:
+            net_g: The generative model for synthesizing speech.
+            feats: Features from `prepare_features`.
+            p_lens: Valid frames of every row.
+            pitch: Coarse F0 of shape (batch, frames), or None without pitch guidance.
+            pitchf: Fine F0 of shape (batch, frames), or None without pitch guidance.
+            sid: Speaker ID tensor of shape (1,).
+            seconds: Length of the input segment, for a batch of one row.
+        """
+        p_lens = torch.tensor(p_lens, device=self.device).long()
+        if len(p_lens) > 1:
+            sid = sid.repeat(len(p_lens))
+        if pitchf is not None:
+            pitchf = pitchf.float()
+        cuda = str(self.device).startswith("cuda")
+        if cuda:
+            # kernels queued by the embedder and the retrieval must not be timed
+            torch.cuda.synchronize(self.device)
+            torch.cuda.reset_peak_memory_stats(self.device)
+        elif seconds is not None:
+            rss_gb = reset_peak_rss()
+        start = time.perf_counter()
+        audio = (
+            net_g.infer(feats.float(), p_lens, pitch, pitchf, sid)[0][:, 0]
+            .data.cpu()
+            .float()
+            .numpy()
         )
+        if cuda:
+            torch.cuda.synchronize(self.device)
+        if seconds is not None and len(p_lens) == 1:
+            elapsed = time.perf_counter() - start
+            if cuda:
+                peak_gb = torch.cuda.max_memory_allocated(self.device) / 1024**3
+            else:
+                peak_gb = None if rss_gb is None else peak_rss_gb()
+                if peak_gb is not None:
+                    peak_gb = max(peak_gb - rss_gb, 0)
+            segment_planner.record(
+                self.device, seconds, elapsed, peak_gb, model=self.model_key
+            )
+        return audio
+
+    def finish_audio(self, audio, audio_opt, volume_envelope):
+        """
+        Matches the loudness envelope of converted audio to its input by
+        `volume_envelope` and scales it down if it would clip.
+
+        Args:
+            audio: The filtered input audio at 16 kHz.
+            audio_opt: The converted audio, modified in place.
+            volume_envelope: Blending rate for adjusting the RMS level of the output audio.
+        """
+        if volume_envelope != 1:
+            audio_opt = AudioProcessor.change_rms(
+                audio, self.sample_rate, audio_opt, self.sample_rate, volume_envelope
+            )
+        audio_max = np.abs(audio_opt).max() / 0.99
+        if audio_max > 1:
+            audio_opt /= audio_max
+        return audio_opt
+
+    def extract_features(self, model, audio0):
+        """
+        Runs the embedder on an audio segment and returns its `last_hidden_state`.
+
+        The output only depends on the segment and the embedder, so it is cached by audio
+        content and embedder name when the model carries an `embedder_name` attribute.
+
+        Args:
+            model: The feature extractor model.
+            audio0: The input audio segment.
+        """
+        key = None
+        embedder_name = getattr(model, "embedder_name", None)
+        if embedder_name is not None:
+            key = (audio_hash(audio0), embedder_name)
+            cached = embedding_cache.get(key)
+            if cached is not None:
+                return torch.from_numpy(cached).to(self.device)
+        # prepare source audio
+        feats = torch.from_numpy(audio0).float()
+        feats = feats.mean(-1) if feats.dim() == 2 else feats
+        assert feats.dim() == 1, feats.dim()
+        feats = feats.view(1, -1).to(self.device)
+        feats = model(feats)["last_hidden_state"]
+        if key is not None:
+            embedding_cache.put(key, feats.cpu().numpy())
         return feats
 
+    def _retrieve_speaker_embeddings(
+        self, feats, index, big_npy, index_rate, lengths=None
+    ):
+        return retrieve_speaker_embeddings(feats, index, big_npy, index_rate, lengths)
+
+    @staticmethod
+    def load_index(file_index, index_rate):
+        """
+        Loads the FAISS index and its vectors through the shared index cache.
+
+        Args:
+            file_index: Path to the FAISS index file.
+            index_rate: Blending rate for speaker embedding retrieval.
+        """
+        if file_index != "" and os.path.exists(file_index) and index_rate > 0:
+            try:
+                return index_cache.get(file_index)
+            except Exception as error:
+                print(f"An error occurred reading the FAISS index: {error}")
+        return None, None
+
+    @staticmethod
+    def load_f0_file(f0_file):
+        """
+        Reads a comma separated "time,frequency" F0 file into an array.
+
+        Args:
+            f0_file: Uploaded file object with a `name` attribute, or None.
+        """
+        inp_f0 = None
+        if hasattr(f0_file, "name"):
+            try:
+                with open(f0_file.name, "r") as f:
+                    lines = f.read().strip("\n").split("\n")
+                inp_f0 = []
+                for line in lines:
+                    inp_f0.append([float(i) for i in line.split(",")])
+                inp_f0 = np.array(inp_f0, dtype="float32")
+            except Exception as error:
+                print(f"An error occurred reading the F0 file: {error}")
+        return inp_f0
+
+    def prepare_source(self, audio):
+        """
+        Runs the model-independent preprocessing of `pipeline`: high-pass filtering,
+        the search for low-energy cut points of long inputs (see `find_cut_points`) and
+        reflect padding.
+
+        Args:
+            audio: The input audio signal at 16 kHz.
+        """
+        audio = signal.filtfilt(bh, ah, audio)
+        opt_ts = []
+        if audio.shape[0] + self.window > self.t_max:
+            opt_ts = find_cut_points(audio, self.window, self.t_center, self.t_query)
+            print(
+                f"Splitting {audio.shape[0] / self.sample_rate:.1f}s of audio into "
+                f"{len(opt_ts) + 1} segments of about {self.x_center}s."
+            )
+        audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
+        return {
+            "audio": audio,
+            "audio_pad": audio_pad,
+            "opt_ts": opt_ts,
+            "p_len": audio_pad.shape[0] // self.window,
+        }
+
+    def source_segments(self, source):
+        """
+        Returns the (start, end) samples of the padded audio of a source that `pipeline`
+        converts one at a time, with None as the end of the last segment.
+
+        Args:
+            source: Result of `prepare_source`.
+        """
+        segments = []
+        start = 0
+        for t in source["opt_ts"]:
+            t = t // self.window * self.window
+            segments.append((start, t + self.t_pad2 + self.window))
+            start = t
+        segments.append((start, None))
+        return segments
+
+    def embed_source(self, model, source):
+        """
+        Runs the embedder once on every segment of a source and stores the outputs in it
+        as "feats", so `pipeline` can convert the source with several voice models
+        without running the embedder again.
+
+        Args:
+            model: The feature extractor model.
+            source: Result of `prepare_source`, updated in place.
+        """
+        with torch.no_grad():
+            source["feats"] = [
+                self.extract_features(model, source["audio_pad"][start:end])
+                for start, end in self.source_segments(source)
+            ]
+        return source
+
     def pipeline(
         self,
         model,
@@ -518,6 +879,9 @@ class Pipeline:
         f0_autotune,
         f0_autotune_strength,
         f0_file,
+        raw_f0=None,
+        source=None,
+        f0_autotune_scale="chromatic",
     ):
         """
         The main pipeline function for performing voice conversion.
@@ -541,145 +905,299 @@ class Pipeline:
             hop_length: Hop length for F0 estimation methods.
             f0_autotune: Whether to apply autotune to the F0 contour.
             f0_file: Path to a file containing an F0 contour to use.
+            raw_f0: Optional precomputed raw F0 contour of the padded audio.
+            source: Optional result of `prepare_source` for this audio, shared between models.
+            f0_autotune_scale: Scale the autotune snaps to, e.g. "chromatic" or "A minor".
         """
-        if file_index != "" and os.path.exists(file_index) and index_rate > 0:
-            try:
-                index = faiss.read_index(file_index)
-                big_npy = index.reconstruct_n(0, index.ntotal)
-            except Exception as error:
-                print(f"An error occurred reading the FAISS index: {error}")
-                index = big_npy = None
-        else:
-            index = big_npy = None
-        audio = signal.filtfilt(bh, ah, audio)
-        audio_pad = np.pad(audio, (self.window // 2, self.window // 2), mode="reflect")
-        opt_ts = []
-        if audio_pad.shape[0] > self.t_max:
-            audio_sum = np.zeros_like(audio)
-            for i in range(self.window):
-                audio_sum += audio_pad[i : i - self.window]
-            for t in range(self.t_center, audio.shape[0], self.t_center):
-                opt_ts.append(
-                    t
-                    - self.t_query
-                    + np.where(
-                        np.abs(audio_sum[t - self.t_query : t + self.t_query])
-                        == np.abs(audio_sum[t - self.t_query : t + self.t_query]).min()
-                    )[0][0]
-                )
-        s = 0
+        index, big_npy = self.load_index(file_index, index_rate)
+        if source is None:
+            source = self.prepare_source(audio)
+        audio = source["audio"]
+        audio_pad = source["audio_pad"]
+        p_len = source["p_len"]
         audio_opt = []
-        t = None
-        audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
-        p_len = audio_pad.shape[0] // self.window
-        inp_f0 = None
-        if hasattr(f0_file, "name"):
-            try:
-                with open(f0_file.name, "r") as f:
-                    lines = f.read().strip("\n").split("\n")
-                inp_f0 = []
-                for line in lines:
-                    inp_f0.append([float(i) for i in line.split(",")])
-                inp_f0 = np.array(inp_f0, dtype="float32")
-            except Exception as error:
-                print(f"An error occurred reading the F0 file: {error}")
+        inp_f0 = self.load_f0_file(f0_file)
         sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
         if pitch_guidance:
-            pitch, pitchf = self.get_f0(
-                "input_audio_path",  # questionable purpose of making a key for an array
-                audio_pad,
+            if raw_f0 is None:
+                raw_f0 = self.estimate_f0(
+                    "input_audio_path",  # questionable purpose of making a key for an array
+                    audio_pad,
+                    p_len,
+                    f0_method,
+                    hop_length,
+                )
+            pitch, pitchf = self.prepare_pitch(
+                raw_f0,
                 p_len,
                 pitch,
-                f0_method,
-                hop_length,
                 f0_autotune,
                 f0_autotune_strength,
                 inp_f0,
+                f0_autotune_scale,
             )
-            pitch = pitch[:p_len]
-            pitchf = pitchf[:p_len]
-            if self.device == "mps":
-                pitchf = pitchf.astype(np.float32)
-            pitch = torch.tensor(pitch, device=self.device).unsqueeze(0).long()
-            pitchf = torch.tensor(pitchf, device=self.device).unsqueeze(0).float()
-        for t in opt_ts:
-            t = t // self.window * self.window
-            if pitch_guidance:
-                audio_opt.append(
-                    self.voice_conversion(
-                        model,
-                        net_g,
-                        sid,
-                        audio_pad[s : t + self.t_pad2 + self.window],
-                        pitch[:, s // self.window : (t + self.t_pad2) // self.window],
-                        pitchf[:, s // self.window : (t + self.t_pad2) // self.window],
-                        index,
-                        big_npy,
-                        index_rate,
-                        version,
-                        protect,
-                    )[self.t_pad_tgt : -self.t_pad_tgt]
-                )
-            else:
-                audio_opt.append(
-                    self.voice_conversion(
-                        model,
-                        net_g,
-                        sid,
-                        audio_pad[s : t + self.t_pad2 + self.window],
-                        None,
-                        None,
-                        index,
-                        big_npy,
-                        index_rate,
-                        version,
-                        protect,
-                    )[self.t_pad_tgt : -self.t_pad_tgt]
-                )
-            s = t
-        if pitch_guidance:
-            audio_opt.append(
-                self.voice_conversion(
-                    model,
-                    net_g,
-                    sid,
-                    audio_pad[t:],
-                    pitch[:, t // self.window :] if t is not None else pitch,
-                    pitchf[:, t // self.window :] if t is not None else pitchf,
-                    index,
-                    big_npy,
-                    index_rate,
-                    version,
-                    protect,
-                )[self.t_pad_tgt : -self.t_pad_tgt]
-            )
-        else:
+        for i, (start, end) in enumerate(self.source_segments(source)):
+            f0_end = None if end is None else (end - self.window) // self.window
             audio_opt.append(
                 self.voice_conversion(
                     model,
                     net_g,
                     sid,
-                    audio_pad[t:],
-                    None,
-                    None,
+                    audio_pad[start:end],
+                    pitch[:, start // self.window : f0_end] if pitch_guidance else None,
+                    (
+                        pitchf[:, start // self.window : f0_end]
+                        if pitch_guidance
+                        else None
+                    ),
                     index,
                     big_npy,
                     index_rate,
                     version,
                     protect,
+                    feats=source["feats"][i] if "feats" in source else None,
                 )[self.t_pad_tgt : -self.t_pad_tgt]
             )
-        audio_opt = np.concatenate(audio_opt)
-        if volume_envelope != 1:
-            audio_opt = AudioProcessor.change_rms(
-                audio, self.sample_rate, audio_opt, self.sample_rate, volume_envelope
-            )
-        audio_max = np.abs(audio_opt).max() / 0.99
-        if audio_max > 1:
-            audio_opt /= audio_max
+        audio_opt = self.finish_audio(audio, np.concatenate(audio_opt), volume_envelope)
         if pitch_guidance:
             del pitch, pitchf
         del sid
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         return audio_opt
+
+    def pipeline_batch(
+        self,
+        model,
+        net_g,
+        sid,
+        audios,
+        pitch,
+        f0_method,
+        file_index,
+        index_rate,
+        pitch_guidance,
+        volume_envelope,
+        version,
+        protect,
+        hop_length,
+        f0_autotune,
+        f0_autotune_strength,
+        f0_file,
+        batch_size=4,
+        bucket_ratio=1.25,
+        f0_autotune_scale="chromatic",
+    ):
+        """
+        Performs voice conversion on a list of inputs, e.g. the queued jobs of the
+        inference server, grouping inputs of similar length into padded batches so the
+        index search runs once per batch. The synthesizer runs once per batch too,
+        except on the CPU where a padded batch is slower per row than single rows. The
+        embedder runs on every input alone and RMVPE batches inputs of equal length
+        only, because padding would change their output.
+
+        Args:
+            audios: The input audio signals at 16 kHz.
+            batch_size: Maximum number of inputs converted in one forward pass.
+            bucket_ratio: Maximum ratio between the longest and shortest input of a batch.
+            The remaining arguments are the same as for `pipeline`.
+
+        Inputs that do not fit in a single segment are converted one at a time with
+        `pipeline`. The converted inputs are returned in input order.
+        """
+        results = [None] * len(audios)
+        short_ids = []
+        for i, audio in enumerate(audios):
+            if audio.shape[0] + self.window > self.t_max:
+                results[i] = self.pipeline(
+                    model=model,
+                    net_g=net_g,
+                    sid=sid,
+                    audio=audio,
+                    pitch=pitch,
+                    f0_method=f0_method,
+                    file_index=file_index,
+                    index_rate=index_rate,
+                    pitch_guidance=pitch_guidance,
+                    volume_envelope=volume_envelope,
+                    version=version,
+                    protect=protect,
+                    hop_length=hop_length,
+                    f0_autotune=f0_autotune,
+                    f0_autotune_strength=f0_autotune_strength,
+                    f0_file=f0_file,
+                    f0_autotune_scale=f0_autotune_scale,
+                )
+            else:
+                short_ids.append(i)
+
+        index, big_npy = self.load_index(file_index, index_rate)
+        inp_f0 = self.load_f0_file(f0_file)
+        sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
+        buckets = self._plan_buckets(
+            [audios[i].shape[0] for i in short_ids], batch_size, bucket_ratio
+        )
+        for bucket in buckets:
+            ids = [short_ids[j] for j in bucket]
+            outputs = self._convert_bucket(
+                model,
+                net_g,
+                sid,
+                [audios[i] for i in ids],
+                pitch,
+                f0_method,
+                index,
+                big_npy,
+                index_rate,
+                pitch_guidance,
+                volume_envelope,
+                version,
+                protect,
+                hop_length,
+                f0_autotune,
+                f0_autotune_strength,
+                inp_f0,
+                f0_autotune_scale,
+            )
+            for i, audio_opt in zip(ids, outputs):
+                results[i] = audio_opt
+        del sid
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return results
+
+    @staticmethod
+    def _plan_buckets(lengths, batch_size, bucket_ratio):
+        buckets = []
+        current = []
+        for j in np.argsort(lengths, kind="stable"):
+            if current and (
+                len(current) >= batch_size
+                or lengths[j] > lengths[current[0]] * bucket_ratio
+            ):
+                buckets.append(current)
+                current = []
+            current.append(int(j))
+        if current:
+            buckets.append(current)
+        return buckets
+
+    def _convert_bucket(
+        self,
+        model,
+        net_g,
+        sid,
+        chunks,
+        pitch,
+        f0_method,
+        index,
+        big_npy,
+        index_rate,
+        pitch_guidance,
+        volume_envelope,
+        version,
+        protect,
+        hop_length,
+        f0_autotune,
+        f0_autotune_strength,
+        inp_f0,
+        f0_autotune_scale="chromatic",
+    ):
+        sources = [self.prepare_source(chunk) for chunk in chunks]
+        padded = [source["audio_pad"] for source in sources]
+        lengths = [audio.shape[0] for audio in padded]
+
+        with torch.no_grad():
+            # the first conv layer of the embedder normalizes over the whole time axis,
+            # so padding would change the features: it runs on every chunk alone
+            rows = [self.extract_features(model, audio)[0] for audio in padded]
+            rows = [model.final_proj(row) if version == "v1" else row for row in rows]
+            frame_lengths = [row.shape[0] for row in rows]
+            p_lens = [
+                min(length // self.window, 2 * frames)
+                for length, frames in zip(lengths, frame_lengths)
+            ]
+            max_p_len = max(p_lens)
+
+            pitch_t = pitchf_t = None
+            if pitch_guidance:
+                if f0_method == "rmvpe":
+                    raw_f0s = self.model_rmvpe.infer_from_audio_batch(
+                        padded, thred=0.03
+                    )
+                else:
+                    raw_f0s = [
+                        self.estimate_f0(
+                            "input_audio_path",
+                            audio,
+                            length // self.window,
+                            f0_method,
+                            hop_length,
+                        )
+                        for audio, length in zip(padded, lengths)
+                    ]
+                pitches = [
+                    self.prepare_pitch(
+                        f0,
+                        p_len,
+                        pitch,
+                        f0_autotune,
+                        f0_autotune_strength,
+                        inp_f0,
+                        f0_autotune_scale,
+                    )
+                    for f0, p_len in zip(raw_f0s, p_lens)
+                ]
+                pitch_t = torch.nn.utils.rnn.pad_sequence(
+                    [p[0] for p, _ in pitches], batch_first=True
+                )
+                pitchf_t = torch.nn.utils.rnn.pad_sequence(
+                    [f[0] for _, f in pitches], batch_first=True
+                )
+                del pitches
+
+            feats = torch.nn.utils.rnn.pad_sequence(rows, batch_first=True)
+            del rows
+            feats = self.prepare_features(
+                feats,
+                pitchf_t,
+                index,
+                big_npy,
+                index_rate,
+                protect,
+                max_p_len,
+                frame_lengths,
+            )
+            if str(self.device) == "cpu":
+                # the vocoder's elementwise layers run at the audio rate and are bound
+                # by memory bandwidth, a padded batch is slower per row than single rows
+                outputs = [
+                    self.synthesize(
+                        net_g,
+                        feats[i : i + 1, :p_len],
+                        [p_len],
+                        pitch_t[i : i + 1, :p_len] if pitch_guidance else None,
+                        pitchf_t[i : i + 1, :p_len] if pitch_guidance else None,
+                        sid,
+                        lengths[i] / self.sample_rate,
+                    )[0]
+                    for i, p_len in enumerate(p_lens)
+                ]
+            else:
+                audio_batch = self.synthesize(
+                    net_g, feats, p_lens, pitch_t, pitchf_t, sid
+                )
+                outputs = [
+                    audio_batch[i, : audio_batch.shape[1] * p_len // max_p_len]
+                    for i, p_len in enumerate(p_lens)
+                ]
+            del feats, pitch_t, pitchf_t
+
+        return [
+            self.finish_audio(
+                source["audio"],
+                audio_opt[self.t_pad_tgt : -self.t_pad_tgt],
+                volume_envelope,
+            )
+            for source, audio_opt in zip(sources, outputs)
+        ]
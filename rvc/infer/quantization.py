@@ -0,0 +1,367 @@
+import os
+import sys
+import time
+import argparse
+import warnings
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from scipy import signal
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.algorithm.commons import fold_weight_norm
+from rvc.infer.model_registry import LoadedModel
+from rvc.infer.optimized_model import build_synthesizer
+
+QUANTIZED_SUFFIX = ".int8.pt"
+QUANTIZED_FORMAT = 2
+# Layers with fewer weights than this stay in float32, quantizing the activations of
+# small layers costs more than it saves
+MIN_QUANTIZED_WEIGHTS = 4096
+
+
+class QuantizableConv1d(torch.nn.Module):
+    """
+    A stride-1 Conv1d rewritten as an unfold followed by a linear layer, so PyTorch's
+    dynamic quantization, which only covers linear layers, can run it in INT8.
+
+    Args:
+        conv (torch.nn.Conv1d): The convolution to replace, without weight norm.
+    """
+
+    def __init__(self, conv):
+        super().__init__()
+        # tuples like Conv1d's, callers such as FFN read kernel_size[0]
+        self.kernel_size = conv.kernel_size
+        self.dilation = conv.dilation
+        self.padding = conv.padding
+        self.linear = torch.nn.Linear(
+            conv.in_channels * conv.kernel_size[0],
+            conv.out_channels,
+            bias=conv.bias is not None,
+        )
+        self.linear.weight.data = conv.weight.data.reshape(conv.out_channels, -1)
+        if conv.bias is not None:
+            self.linear.bias.data = conv.bias.data
+
+    def forward(self, x):
+        if self.kernel_size[0] == 1:
+            return self.linear(x.transpose(1, 2)).transpose(1, 2)
+        x = F.unfold(
+            x.unsqueeze(-1),
+            (self.kernel_size[0], 1),
+            dilation=(self.dilation[0], 1),
+            padding=(self.padding[0], 0),
+        )
+        return self.linear(x.transpose(1, 2)).transpose(1, 2)
+
+    @staticmethod
+    def supports(conv):
+        return (
+            type(conv) is torch.nn.Conv1d
+            and conv.stride[0] == 1
+            and conv.groups == 1
+            and conv.padding_mode == "zeros"
+            and not isinstance(conv.padding, str)
+        )
+
+
+def _quantize_linears(model, min_weights=MIN_QUANTIZED_WEIGHTS):
+    names = {
+        name
+        for name, module in model.named_modules()
+        if type(module) is torch.nn.Linear and module.weight.numel() >= min_weights
+    }
+    if not names:
+        return model
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(
+            model, names, dtype=torch.qint8, inplace=True
+        )
+
+
+def _replace_convs(model, predicate, min_weights=MIN_QUANTIZED_WEIGHTS):
+    for name, module in list(model.named_modules()):
+        for child_name, child in list(module.named_children()):
+            if (
+                QuantizableConv1d.supports(child)
+                and child.weight.numel() >= min_weights
+                and predicate(f"{name}.{child_name}".lstrip("."), child)
+            ):
+                setattr(module, child_name, QuantizableConv1d(child))
+
+
+def _is_quantized_conv(name, conv):
+    return not name.startswith("dec.") or conv.kernel_size[0] == 1
+
+
+def quantize_synthesizer(net_g, min_weights=MIN_QUANTIZED_WEIGHTS):
+    """
+    Applies dynamic INT8 quantization to a float32 Synthesizer on the CPU, in place.
+
+    Weight norm is folded first. The linear layers, the attention and FFN convolutions
+    of the TextEncoder, the WaveNet layers of the flow and the pointwise convolutions of
+    the vocoder are quantized. The vocoder's wide convolutions and transposed
+    convolutions run at the audio rate and stay in float32: rewritten as linear layers
+    they would need an unfolded copy of their input, which costs more than INT8 saves.
+
+    Args:
+        net_g (Synthesizer): The model, in eval mode on the CPU.
+        min_weights (int): Layers with fewer weights stay in float32.
+    """
+    fold_weight_norm(net_g)
+    _replace_convs(net_g, _is_quantized_conv, min_weights)
+    return _quantize_linears(net_g, min_weights).eval()
+
+
+def _rebuild_quantized_synthesizer(metadata):
+    # the layer structure only depends on the weight shapes, so it is built on the meta
+    # device and quantized from zeroed weights, which the saved state_dict overwrites
+    with torch.device("meta"):
+        net_g = build_synthesizer(
+            metadata["config"],
+            metadata["use_f0"],
+            metadata["version"],
+            metadata["vocoder"],
+        )
+        fold_weight_norm(net_g)
+        _replace_convs(net_g, _is_quantized_conv, metadata["min_weights"])
+    net_g.to_empty(device="cpu")
+    with torch.no_grad():
+        for parameter in net_g.parameters():
+            parameter.zero_()
+    return _quantize_linears(net_g, metadata["min_weights"]).eval()
+
+
+def quantize_embedder(model, min_weights=MIN_QUANTIZED_WEIGHTS):
+    """
+    Applies dynamic INT8 quantization to the transformer of a HuBERT embedder, in place.
+    The strided convolutional feature extractor stays in float32.
+
+    Args:
+        model (HubertModelWithFinalProj): The embedder, in eval mode on the CPU.
+    """
+    return _quantize_linears(model, min_weights).eval()
+
+
+def quantized_path(model_path):
+    """
+    Returns the path of the quantized copy of a model, next to its .pth file.
+
+    Args:
+        model_path (str): Path to the voice model.
+    """
+    return os.path.splitext(model_path)[0] + QUANTIZED_SUFFIX
+
+
+def _fingerprint(model_path):
+    stat = os.stat(model_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_quantized_model(model_path):
+    """
+    Returns the cached quantized model of a .pth file as a LoadedModel, or None if there
+    is none or it is stale, i.e. the .pth changed or it was written by another torch.
+
+    The file holds plain metadata and the quantized state_dict and is read with
+    `weights_only`. It is memory-mapped, so a stale file is rejected without reading
+    its weights.
+
+    Args:
+        model_path (str): Path to the voice model.
+    """
+    path = quantized_path(model_path)
+    if not os.path.isfile(path):
+        return None
+    try:
+        data = torch.load(path, map_location="cpu", weights_only=True, mmap=True)
+        metadata = data["metadata"]
+        if (
+            metadata.get("format") != QUANTIZED_FORMAT
+            or metadata.get("torch") != torch.__version__
+            or metadata.get("source") != _fingerprint(model_path)
+        ):
+            return None
+        net_g = _rebuild_quantized_synthesizer(metadata)
+        net_g.load_state_dict(data["state_dict"])
+    except Exception as error:
+        print(f"An error occurred loading the quantized model {path}: {error}")
+        return None
+    return LoadedModel(
+        model_path=model_path,
+        net_g=net_g,
+        tgt_sr=metadata["tgt_sr"],
+        version=metadata["version"],
+        use_f0=metadata["use_f0"],
+        n_spk=metadata["n_spk"],
+        vocoder=metadata["vocoder"],
+        config=metadata["config"],
+    )
+
+
+def save_quantized_model(entry, min_weights=MIN_QUANTIZED_WEIGHTS):
+    """
+    Writes a quantized model next to its .pth file as its state_dict and the metadata
+    needed to rebuild it.
+
+    Args:
+        entry (LoadedModel): The model, with a `net_g` quantized by
+            `quantize_synthesizer` and its `config`.
+        min_weights (int): The `min_weights` the model was quantized with.
+    """
+    path = quantized_path(entry.model_path)
+    try:
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(
+            {
+                "metadata": {
+                    "format": QUANTIZED_FORMAT,
+                    "torch": str(torch.__version__),
+                    "source": _fingerprint(entry.model_path),
+                    "config": list(entry.config),
+                    "min_weights": min_weights,
+                    "tgt_sr": entry.tgt_sr,
+                    "version": entry.version,
+                    "use_f0": entry.use_f0,
+                    "n_spk": entry.n_spk,
+                    "vocoder": entry.vocoder,
+                },
+                "state_dict": entry.net_g.state_dict(),
+            },
+            temp_path,
+        )
+        os.replace(temp_path, path)
+    except Exception as error:
+        print(f"An error occurred saving the quantized model {path}: {error}")
+
+
+def spectral_distance(reference, estimate, n_fft=2048, hop_length=512):
+    """
+    Returns the log-spectral distance in dB between two signals of the same rate.
+
+    Args:
+        reference (np.ndarray): Reference signal.
+        estimate (np.ndarray): Signal compared to the reference.
+    """
+    length = min(len(reference), len(estimate))
+    _, _, ref = signal.stft(
+        reference[:length], nperseg=n_fft, noverlap=n_fft - hop_length
+    )
+    _, _, est = signal.stft(
+        estimate[:length], nperseg=n_fft, noverlap=n_fft - hop_length
+    )
+    ref = 10 * np.log10(np.abs(ref) ** 2 + 1e-10)
+    est = 10 * np.log10(np.abs(est) ** 2 + 1e-10)
+    return float(np.mean(np.sqrt(np.mean((ref - est) ** 2, axis=0))))
+
+
+def compare_quantized(
+    model_path,
+    audio_paths,
+    index_path="",
+    f0_method="rmvpe",
+    embedder_model="contentvec",
+    pitch=0,
+):
+    """
+    Converts sample inputs with the float32 and the INT8 models and reports, per input,
+    the real-time factor of both and the log-spectral distance between their outputs.
+    Each model first converts the first input untimed, and the F0 and embedding caches
+    are cleared before every timed conversion, so both pay the same work.
+
+    Args:
+        model_path (str): Path to the voice model.
+        audio_paths (list): Paths to the sample inputs.
+        index_path (str): Path to the index file, or an empty string.
+        f0_method (str): Method for F0 extraction.
+        embedder_model (str): Embedder model name.
+        pitch (int): Key for F0 up-sampling.
+    """
+    from rvc.infer.infer import VoiceConverter
+    from rvc.infer.feature_cache import f0_cache, embedding_cache
+    from rvc.lib.utils import load_audio_infer
+
+    converter = VoiceConverter()
+    # both passes must compute F0 and embeddings themselves
+    converter.set_embedding_disk_cache(False)
+    audios = [load_audio_infer(path, 16000) for path in audio_paths]
+
+    def convert(audio):
+        torch.manual_seed(0)
+        return converter.vc.pipeline(
+            model=converter.hubert_model,
+            net_g=converter.net_g,
+            sid=0,
+            audio=audio,
+            pitch=pitch,
+            f0_method=f0_method,
+            file_index=index_path,
+            index_rate=0.75 if index_path else 0,
+            pitch_guidance=converter.use_f0,
+            volume_envelope=1,
+            version=converter.version,
+            protect=0.5,
+            hop_length=128,
+            f0_autotune=False,
+            f0_autotune_strength=1,
+            f0_file=None,
+        )
+
+    outputs = {}
+    results = [{"input": path, "fp32_rtf": 0, "int8_rtf": 0} for path in audio_paths]
+    for quantize in (False, True):
+        converter.set_quantize(quantize)
+        converter.get_vc(model_path, 0)
+        converter.load_hubert(embedder_model)
+        converter.last_embedder_model = embedder_model
+        # untimed, loads the F0 predictor and the index and warms up the allocator
+        convert(audios[0])
+        for i, audio in enumerate(audios):
+            f0_cache.clear()
+            embedding_cache.clear()
+            start = time.perf_counter()
+            outputs[quantize, i] = convert(audio)
+            elapsed = time.perf_counter() - start
+            results[i]["int8_rtf" if quantize else "fp32_rtf"] = elapsed / (
+                len(audio) / 16000
+            )
+    converter.set_quantize(False)
+    for i, result in enumerate(results):
+        result["spectral_distance_db"] = spectral_distance(
+            outputs[False, i], outputs[True, i]
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare INT8 quantized inference against float32."
+    )
+    parser.add_argument("--pth_path", type=str, required=True)
+    parser.add_argument("--input_paths", type=str, nargs="+", required=True)
+    parser.add_argument("--index_path", type=str, default="")
+    parser.add_argument("--f0_method", type=str, default="rmvpe")
+    parser.add_argument("--embedder_model", type=str, default="contentvec")
+    args = parser.parse_args()
+
+    for result in compare_quantized(
+        args.pth_path,
+        args.input_paths,
+        args.index_path,
+        args.f0_method,
+        args.embedder_model,
+    ):
+        print(
+            f"{result['input']}: fp32 RTF {result['fp32_rtf']:.3f}, "
+            f"int8 RTF {result['int8_rtf']:.3f}, "
+            f"spectral distance {result['spectral_distance_db']:.2f} dB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import torch
+from scipy import signal
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.pipeline import bh, ah
+
+SAMPLE_RATE = 16000
+# HuBERT emits one frame every 320 samples, so every buffer is kept on that grid
+FRAME = 320
+
+
+def _to_frames(seconds):
+    return max(1, int(round(seconds * SAMPLE_RATE / FRAME))) * FRAME
+
+
+class StreamingConverter:
+    """
+    Low-latency voice conversion of a live 16 kHz PCM stream.
+
+    Every call to `process_block` appends one block to a sliding input window made of
+    `context_time` seconds of history, `crossfade_time` seconds of overlap and the new
+    block. HuBERT and the F0 estimator see the whole window, while `Synthesizer.infer`
+    only renders its tail through the `rate` argument. Consecutive outputs overlap by
+    the crossfade length and are blended with a sin²/cos² crossfade. Its gains sum to
+    one, which keeps the level constant for the two renderings of the overlap, as they
+    are strongly correlated. An equal-power (sin/cos) fade would boost the overlap by
+    up to 3 dB.
+
+    Latency/quality knob: the algorithmic latency is `block_time + crossfade_time`
+    (see `latency`), plus the time it takes to process one block. A larger
+    `context_time` gives the embedder and the pitch estimator more history, which
+    improves quality at the cost of compute per block; `block_time` trades latency
+    for per-block overhead. The compute time per block must stay below `block_time`
+    for the stream to keep up, which `benchmark` measures.
+
+    Args:
+        voice_converter (VoiceConverter): Converter used to load the model and the embedder.
+        model_path (str): Path to the voice conversion model.
+        index_path (str): Path to the index file, or an empty string.
+        block_time (float): Duration of each input block in seconds.
+        context_time (float): Extra history given to the embedder and F0 estimator in seconds.
+        crossfade_time (float): Overlap between consecutive output blocks in seconds.
+        pitch (int): Key for F0 up-sampling.
+        f0_method (str): Method for F0 extraction.
+        index_rate (float): Rate for index matching.
+        protect (float): Protection rate for voiceless consonants and breaths.
+        f0_autotune (bool): Whether to use F0 autotune.
+        f0_autotune_strength (float): Strength of the autotune correction.
+        embedder_model (str): Embedder model name.
+        embedder_model_custom (str): Path to a custom embedder model.
+        sid (int): Speaker ID.
+    """
+
+    def __init__(
+        self,
+        voice_converter,
+        model_path: str,
+        index_path: str = "",
+        block_time: float = 0.25,
+        context_time: float = 1.0,
+        crossfade_time: float = 0.05,
+        pitch: int = 0,
+        f0_method: str = "rmvpe",
+        index_rate: float = 0.75,
+        protect: float = 0.5,
+        f0_autotune: bool = False,
+        f0_autotune_strength: float = 1,
+        embedder_model: str = "contentvec",
+        embedder_model_custom: str = None,
+        sid: int = 0,
+    ):
+        self.converter = voice_converter
+        self.converter.get_vc(model_path, sid)
+        if (
+            not self.converter.hubert_model
+            or embedder_model != self.converter.last_embedder_model
+        ):
+            self.converter.load_hubert(embedder_model, embedder_model_custom)
+            self.converter.last_embedder_model = embedder_model
+
+        self.vc = self.converter.vc
+        self.net_g = self.converter.net_g
+        self.hubert_model = self.converter.hubert_model
+        self.version = self.converter.version
+        self.use_f0 = self.converter.use_f0
+        self.tgt_sr = self.converter.tgt_sr
+        self.device = self.vc.device
+
+        self.pitch = pitch
+        self.f0_method = f0_method
+        self.index_rate = index_rate
+        self.protect = protect
+        self.f0_autotune = f0_autotune
+        self.f0_autotune_strength = f0_autotune_strength
+        self.index, self.big_npy = self.vc.load_index(index_path, index_rate)
+        self.sid = torch.tensor([sid], device=self.device).long()
+
+        self.block_size = _to_frames(block_time)
+        self.context_size = _to_frames(context_time)
+        self.crossfade_size = _to_frames(crossfade_time)
+        self.window_size = self.context_size + self.crossfade_size + self.block_size
+
+        self.tgt_block_size = self.block_size * self.tgt_sr // SAMPLE_RATE
+        self.tgt_crossfade_size = self.crossfade_size * self.tgt_sr // SAMPLE_RATE
+        fade = np.linspace(0, np.pi / 2, self.tgt_crossfade_size, dtype=np.float32)
+        self.fade_in = np.sin(fade) ** 2
+        self.fade_out = np.cos(fade) ** 2
+        self.rate = torch.tensor(
+            [(self.crossfade_size + self.block_size) / self.window_size],
+            device=self.device,
+        )
+        self.reset()
+
+    @property
+    def latency(self):
+        """
+        Algorithmic latency of the stream in seconds, excluding compute time.
+        """
+        return (self.block_size + self.crossfade_size) / SAMPLE_RATE
+
+    def reset(self):
+        """
+        Clears the input history and the pending crossfade tail.
+        """
+        self.input_buffer = np.zeros(self.window_size, dtype=np.float32)
+        self.output_tail = np.zeros(self.tgt_crossfade_size, dtype=np.float32)
+
+    def process_block(self, block):
+        """
+        Converts one block of 16 kHz audio and returns one block of audio at the model's
+        sampling rate, delayed by `latency` seconds.
+
+        Args:
+            block (np.ndarray): Mono float audio of exactly `block_size` samples.
+        """
+        block = np.asarray(block, dtype=np.float32).flatten()
+        if block.shape[0] != self.block_size:
+            raise ValueError(
+                f"Expected a block of {self.block_size} samples, got {block.shape[0]}"
+            )
+        self.input_buffer = np.concatenate(
+            [self.input_buffer[self.block_size :], block]
+        )
+        audio = self._infer_window(
+            signal.filtfilt(bh, ah, self.input_buffer).astype(np.float32)
+        )
+
+        # rendered audio covers the crossfade region followed by the new block
+        needed = self.tgt_crossfade_size + self.tgt_block_size
+        if audio.shape[0] < needed:
+            audio = np.pad(audio, (needed - audio.shape[0], 0))
+        audio = audio[-needed:]
+        head = audio[: self.tgt_crossfade_size]
+        out = audio[: self.tgt_block_size].copy()
+        out[: self.tgt_crossfade_size] = (
+            self.output_tail * self.fade_out + head * self.fade_in
+        )
+        self.output_tail = audio[self.tgt_block_size :].copy()
+        return out
+
+    def _infer_window(self, window):
+        p_len = window.shape[0] // self.vc.window
+        pitch = pitchf = None
+        if self.use_f0:
+            # every window is new audio, so the F0 cache would only be filled, never hit
+            f0 = self.vc.compute_f0(
+                "stream", window, p_len, self.f0_method, self.vc.window
+            )
+            pitch, pitchf = self.vc.prepare_pitch(
+                f0, p_len, self.pitch, self.f0_autotune, self.f0_autotune_strength
+            )
+
+        with torch.no_grad():
+            feats = torch.from_numpy(window).view(1, -1).to(self.device)
+            feats = self.hubert_model(feats)["last_hidden_state"]
+            if self.version == "v1":
+                feats = self.hubert_model.final_proj(feats[0]).unsqueeze(0)
+            # the embedder drops the last partial frame, repeat it to stay on the grid
+            feats = torch.cat((feats, feats[:, -1:]), 1)
+            feats = self.vc.prepare_features(
+                feats,
+                pitchf,
+                self.index,
+                self.big_npy,
+                self.index_rate,
+                self.protect,
+                p_len,
+            )
+            p_len = torch.tensor([feats.shape[1]], device=self.device).long()
+            audio = self.net_g.infer(
+                feats.float(), p_len, pitch, pitchf, self.sid, self.rate
+            )[0][0, 0]
+        return audio.data.cpu().float().numpy()
+
+    def stream(self, audio):
+        """
+        Converts a whole signal block by block, yielding output blocks as they are ready.
+
+        Args:
+            audio (np.ndarray): Mono 16 kHz audio.
+        """
+        remainder = audio.shape[0] % self.block_size
+        if remainder:
+            audio = np.pad(audio, (0, self.block_size - remainder))
+        for start in range(0, audio.shape[0], self.block_size):
+            yield self.process_block(audio[start : start + self.block_size])
+
+    def benchmark(self, n_blocks=100, warmup=5):
+        """
+        Measures the end-to-end processing time of single blocks on synthetic input.
+
+        Args:
+            n_blocks (int): Number of timed blocks.
+            warmup (int): Number of untimed blocks run first.
+        """
+        rng = np.random.default_rng(0)
+        t = np.arange(self.block_size) / SAMPLE_RATE
+        timings = []
+        for i in range(warmup + n_blocks):
+            block = 0.3 * np.sin(
+                2 * np.pi * 220 * (t + i * self.block_size / SAMPLE_RATE)
+            )
+            block += 0.01 * rng.standard_normal(self.block_size)
+            start = time.perf_counter()
+            self.process_block(block.astype(np.float32))
+            if i >= warmup:
+                timings.append(time.perf_counter() - start)
+        self.reset()
+        timings = np.array(timings)
+        block_time = self.block_size / SAMPLE_RATE
+        return {
+            "block_time": block_time,
+            "algorithmic_latency": self.latency,
+            "compute_mean": float(timings.mean()),
+            "compute_p95": float(np.percentile(timings, 95)),
+            "end_to_end_latency_p95": self.latency + float(np.percentile(timings, 95)),
+            "real_time_factor": float(timings.mean() / block_time),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the block latency of the streaming converter."
+    )
+    parser.add_argument("--pth_path", type=str, required=True)
+    parser.add_argument("--index_path", type=str, default="")
+    parser.add_argument("--block_time", type=float, default=0.25)
+    parser.add_argument("--context_time", type=float, default=1.0)
+    parser.add_argument("--crossfade_time", type=float, default=0.05)
+    parser.add_argument("--f0_method", type=str, default="rmvpe")
+    parser.add_argument("--n_blocks", type=int, default=100)
+    args = parser.parse_args()
+
+    from rvc.infer.infer import VoiceConverter
+
+    converter = StreamingConverter(
+        VoiceConverter(),
+        args.pth_path,
+        args.index_path,
+        block_time=args.block_time,
+        context_time=args.context_time,
+        crossfade_time=args.crossfade_time,
+        f0_method=args.f0_method,
+    )
+    for key, value in converter.benchmark(args.n_blocks).items():
+        print(f"{key}: {value:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import threading
+import weakref
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# Neighbours blended per frame
+K = 8
+# Exact torch kNN replaces the FAISS search for indexes up to this many vectors. On a
+# CPU one matmul costs about as much as an IVF probe at this size, on a GPU far less.
+EXACT_MAX_VECTORS_CPU = 4096
+EXACT_MAX_VECTORS_GPU = 65536
+# Elements of the query-to-vector distance matrix computed at once by the exact search
+EXACT_CHUNK_ELEMENTS = 1 << 24
+# Squared distances are clamped to this before weighting, so exact matches stay finite
+MIN_DISTANCE = 1e-12
+
+_device_vectors = {}
+_lock = threading.Lock()
+
+
+def device_vectors(big_npy, device):
+    """
+    Returns the vectors of an index as a float32 tensor on a device together with their
+    squared norms, cached for as long as the array is alive.
+
+    Args:
+        big_npy (np.ndarray): The index vectors, possibly memory-mapped.
+        device (torch.device): The device.
+    """
+    key = (id(big_npy), str(device))
+    with _lock:
+        entry = _device_vectors.get(key)
+    if entry is None:
+        vectors = torch.from_numpy(np.asarray(big_npy, dtype=np.float32)).to(device)
+        entry = (vectors, vectors.square().sum(1))
+        with _lock:
+            _device_vectors[key] = entry
+        weakref.finalize(big_npy, _device_vectors.pop, key, None)
+    return entry
+
+
+def exact_search(queries, vectors, norms, k=K):
+    """
+    Exact k-nearest-neighbour search by squared L2 distance with matmuls on the device
+    of the vectors, computing the distance matrix in chunks of queries.
+
+    Args:
+        queries (torch.Tensor): float32 queries of shape (n, channels).
+        vectors (torch.Tensor): float32 vectors of shape (m, channels).
+        norms (torch.Tensor): Squared norms of the vectors.
+        k (int): Number of neighbours.
+    """
+    k = min(k, len(vectors))
+    chunk = max(1, EXACT_CHUNK_ELEMENTS // len(vectors))
+    distances, ids = [], []
+    for start in range(0, len(queries), chunk):
+        q = queries[start : start + chunk]
+        d = torch.addmm(norms, q, vectors.T, alpha=-2)
+        d += q.square().sum(1, keepdim=True)
+        d, i = d.topk(k, dim=1, largest=False)
+        distances.append(d.clamp_(min=0))
+        ids.append(i)
+    return torch.cat(distances), torch.cat(ids)
+
+
+def neighbour_average(queries, index, big_npy):
+    """
+    Returns the inverse-square-distance weighted average of the K nearest index vectors
+    of every query, on the device of the queries.
+
+    The weighted gather-sum runs as a single `embedding_bag`, which reads the neighbour
+    rows straight from the vector table instead of materializing them as a
+    (queries, K, channels) tensor. Small indexes are searched exactly with torch,
+    larger ones with FAISS; their vectors are then gathered from `big_npy` (which may
+    be memory-mapped) only for the rows that were hit.
+
+    Args:
+        queries (torch.Tensor): Queries of shape (n, channels).
+        index (faiss.Index): The FAISS index.
+        big_npy (np.ndarray): The index vectors in id order.
+    """
+    device = queries.device
+    queries = queries.float()
+    exact_max = EXACT_MAX_VECTORS_CPU if device.type == "cpu" else EXACT_MAX_VECTORS_GPU
+    if index.ntotal <= exact_max:
+        vectors, norms = device_vectors(big_npy, device)
+        distances, ids = exact_search(queries, vectors, norms)
+    else:
+        distances, ids = index.search(queries.cpu().numpy(), K)
+        # missing neighbours come back as id -1 with a huge distance, i.e. no weight
+        ids = np.maximum(ids, 0)
+        if (
+            device.type == "cpu"
+            and big_npy.dtype == np.float32
+            and big_npy.flags.writeable
+        ):
+            vectors = torch.from_numpy(big_npy)
+        else:
+            rows, ids = np.unique(ids, return_inverse=True)
+            ids = ids.reshape(distances.shape)
+            vectors = torch.from_numpy(
+                np.ascontiguousarray(big_npy[rows], dtype=np.float32)
+            ).to(device)
+        distances = torch.from_numpy(distances).to(device)
+        ids = torch.from_numpy(ids).to(device)
+    weights = 1 / distances.clamp(min=MIN_DISTANCE).square()
+    weights /= weights.sum(1, keepdim=True)
+    return F.embedding_bag(ids, vectors, per_sample_weights=weights, mode="sum")
+
+
+def retrieve_speaker_embeddings(feats, index, big_npy, index_rate, lengths=None):
+    """
+    Blends features with the weighted average of their nearest index vectors, searching
+    every frame of the batch in one call.
+
+    Args:
+        feats (torch.Tensor): Features of shape (batch, frames, channels).
+        index (faiss.Index): The FAISS index.
+        big_npy (np.ndarray): The index vectors in id order.
+        index_rate (float): Blending rate for speaker embedding retrieval.
+        lengths (list, optional): Valid frames of every batch row. Padding frames are
+            not searched and keep their features.
+    """
+    flat = feats.reshape(-1, feats.shape[-1])
+    if lengths is None:
+        retrieved = neighbour_average(flat, index, big_npy)
+    else:
+        frames = feats.shape[1]
+        rows = torch.cat(
+            [
+                row * frames + torch.arange(min(int(length), frames))
+                for row, length in enumerate(lengths)
+            ]
+        ).to(feats.device)
+        retrieved = flat.to(torch.float32, copy=True)
+        retrieved[rows] = neighbour_average(flat[rows], index, big_npy)
+    return retrieved.view(feats.shape) * index_rate + (1 - index_rate) * feats
+
+
+def retrieve_segments(segments, index, big_npy, index_rate):
+    """
+    Blends several feature segments of any lengths with one search over all of them.
+
+    Args:
+        segments (list): Features of shape (1, frames, channels).
+        index (faiss.Index): The FAISS index.
+        big_npy (np.ndarray): The index vectors in id order.
+        index_rate (float): Blending rate for speaker embedding retrieval.
+    """
+    lengths = [segment.shape[1] for segment in segments]
+    feats = torch.cat(segments, 1)
+    blended = retrieve_speaker_embeddings(feats, index, big_npy, index_rate)
+    return list(torch.split(blended, lengths, 1))
@@ -0,0 +1,400 @@
+import os
+import sys
+import json
+import hashlib
+import atexit
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import torch
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+# Bounds of the segment length (x_center) in seconds
+MIN_CENTER = 10
+MAX_CENTER = 90
+# Fraction of the device memory, or of the available RAM on the CPU, the measured
+# peak memory of a segment may reach
+MEMORY_FRACTION = 0.7
+# Number of recorded segment timings kept per device and model
+MAX_TIMINGS = 64
+timings_path = os.path.join(now_dir, "logs", "cache", "segment_timings.json")
+
+
+@dataclass
+class SegmentPlan:
+    """
+    Segment lengths used by `Pipeline`, in seconds.
+
+    Attributes:
+        x_pad: Reflect padding added on each side of the input.
+        x_query: Half-width of the window searched for a quiet cut point.
+        x_center: Distance between consecutive cut points.
+        x_max: Inputs shorter than this are converted in one segment.
+        memory_gb: Memory the measured memory model was checked against, None if unused.
+        source: What the segment length is bounded by, "default" for the `Config` profile.
+    """
+
+    x_pad: int
+    x_query: int
+    x_center: int
+    x_max: int
+    memory_gb: float = None
+    source: str = "default"
+
+    def describe(self):
+        memory = "" if self.memory_gb is None else f", {self.memory_gb:.1f} GB memory"
+        return (
+            f"segments of {self.x_center}s (max {self.x_max}s, query {self.x_query}s, "
+            f"pad {self.x_pad}s){memory}, bounded by {self.source}"
+        )
+
+
+def total_memory_gb(device):
+    """
+    Returns the total memory of a CUDA device in gigabytes, or None for other devices.
+
+    Args:
+        device (str): "cpu" or a CUDA device such as "cuda:0".
+    """
+    if not str(device).startswith("cuda") or not torch.cuda.is_available():
+        return None
+    return torch.cuda.get_device_properties(torch.device(device)).total_memory / 1024**3
+
+
+def available_memory_gb():
+    """
+    Returns the RAM available to new allocations in gigabytes, or None if unknown.
+    """
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024**2
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024**3
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def memory_budget_gb(device):
+    """
+    Returns the memory a segment may use on a device in gigabytes: the total memory of
+    a CUDA device, the available RAM otherwise.
+
+    Args:
+        device (str): "cpu" or a CUDA device such as "cuda:0".
+    """
+    if str(device).startswith("cuda"):
+        return total_memory_gb(device)
+    return available_memory_gb()
+
+
+def _process_memory_gb(field):
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024**2
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """
+    Resets the peak resident memory of this process and returns its current resident
+    memory in gigabytes, or None where that is not supported (Linux only).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return None
+    return _process_memory_gb("VmRSS")
+
+
+def peak_rss_gb():
+    """
+    Returns the peak resident memory of this process since `reset_peak_rss` in
+    gigabytes, or None where that is not supported.
+    """
+    return _process_memory_gb("VmHWM")
+
+
+def model_key(vocoder, config, variant=""):
+    """
+    Returns the name timings of a model are kept under: its vocoder, a digest of its
+    `Synthesizer` configuration and the runtime variant, e.g. the backend.
+
+    Args:
+        vocoder (str): Vocoder of the model.
+        config (list): `Synthesizer` constructor arguments of the model.
+        variant (str, optional): How the model is run, e.g. "torch int8".
+    """
+    digest = hashlib.sha1(json.dumps(config).encode()).hexdigest()[:10]
+    return " ".join(part for part in (vocoder, variant, digest) if part)
+
+
+def largest_length(coefficients, budget):
+    """
+    Returns the largest segment length whose value under a fitted quadratic model
+    stays within `budget` above its constant term, or None if the model does not grow
+    with the length and so does not bound it.
+
+    Args:
+        coefficients (np.ndarray): (c0, c1, c2) from `fit_quadratic`.
+        budget (float): Allowed value minus c0.
+    """
+    c1, c2 = coefficients[1], coefficients[2]
+    budget = max(budget, 0)
+    if c2 > 0:
+        return (-c1 + np.sqrt(c1**2 + 4 * c2 * budget)) / (2 * c2)
+    if c1 > 0:
+        return budget / c1
+    return None
+
+
+def fit_quadratic(seconds, values):
+    """
+    Returns the (c0, c1, c2) coefficients of value = c0 + c1 * s + c2 * s^2 fitted to
+    measurements of at least three different segment lengths, or None if there are too
+    few of them or the fit is not increasing over the measured lengths.
+
+    Args:
+        seconds (np.ndarray): Segment lengths.
+        values (np.ndarray): Measured values.
+    """
+    if len(seconds) < 3 or len(np.unique(np.round(seconds))) < 3:
+        return None
+    basis = np.stack([np.ones_like(seconds), seconds, seconds**2], axis=1)
+    coefficients = np.linalg.lstsq(basis, values, rcond=None)[0]
+    slope = coefficients[1] + 2 * coefficients[2] * seconds.max()
+    if coefficients[2] < 0 or slope <= 0:
+        return None
+    return coefficients
+
+
+def find_cut_points(audio, window, t_center, t_query):
+    """
+    Returns the cut points of a long input: one every `t_center` samples, moved to the
+    quietest `window`-sample stretch within `t_query` samples.
+
+    The energy of every stretch is a moving sum computed from a cumulative sum, so the
+    search is linear in the input length.
+
+    Args:
+        audio (np.ndarray): Filtered 16 kHz audio.
+        window (int): Length of the summed stretch in samples.
+        t_center (int): Distance between cut points in samples.
+        t_query (int): Half-width of the search window in samples.
+    """
+    audio_pad = np.pad(audio, (window // 2, window // 2), mode="reflect")
+    cumsum = np.concatenate(([0.0], np.cumsum(audio_pad, dtype=np.float64)))
+    audio_sum = np.abs(
+        cumsum[window : window + audio.shape[0]] - cumsum[: audio.shape[0]]
+    )
+    return [
+        t - t_query + int(np.argmin(audio_sum[t - t_query : t + t_query]))
+        for t in range(t_center, audio.shape[0], t_center)
+    ]
+
+
+class SegmentPlanner:
+    """
+    Chooses the segment length of `Pipeline` from the measured throughput and memory
+    of converted segments, starting from the fixed profile of `Config`.
+
+    Every converted segment can be recorded with `record`. Until timings of at least
+    three different lengths exist, the plan is the profile of `Config` (38 s segments,
+    30 s on GPUs with 4 GB or less). With enough timings a quadratic cost model is
+    fitted and the plan uses the segment length with the lowest cost per second of
+    audio. That length is never above the profile, unless the peak memory was also
+    measured and its fitted model shows that longer segments stay within
+    `MEMORY_FRACTION` of the memory budget. The memory model also lowers the length
+    below the profile when the budget is too small. On CUDA the peak is the allocated
+    device memory and the budget the device memory; on the CPU the peak is the growth
+    of the resident memory during a segment and the budget the available RAM.
+
+    Timings are kept per device and model (see `model_key`), since the vocoder and
+    the model size change the cost of a segment. They are kept in memory and written
+    to `logs/cache/segment_timings.json` by `flush`, once per converted input and at
+    exit, so later runs start from them.
+
+    Args:
+        path (str, optional): File the timings are kept in, None keeps them in memory.
+    """
+
+    def __init__(self, path=timings_path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.timings = self._load()
+        # timings recorded since the last flush, per device
+        self.pending = {}
+
+    def _load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as error:
+            print(f"An error occurred reading the segment timings: {error}")
+            return {}
+
+    @staticmethod
+    def _device_key(device, model=None):
+        device = str(device)
+        if device.startswith("cuda") and torch.cuda.is_available():
+            device = torch.cuda.get_device_name(torch.device(device))
+        else:
+            device = "cpu"
+        return device if model is None else f"{device} | {model}"
+
+    def record(self, device, seconds, elapsed, peak_gb=None, model=None):
+        """
+        Records the conversion time of one segment, in memory only.
+
+        Args:
+            device (str): Device the segment was converted on.
+            seconds (float): Segment length including padding.
+            elapsed (float): Wall time of the conversion in seconds.
+            peak_gb (float, optional): Peak memory of the conversion, see the class.
+            model (str, optional): Model the segment was converted with, from `model_key`.
+        """
+        key = self._device_key(device, model)
+        timing = [
+            round(float(seconds), 3),
+            round(float(elapsed), 4),
+            None if peak_gb is None else round(float(peak_gb), 4),
+        ]
+        with self.lock:
+            for store in (self.timings, self.pending):
+                timings = store.setdefault(key, [])
+                timings.append(timing)
+                del timings[:-MAX_TIMINGS]
+
+    def flush(self):
+        """
+        Adds the timings recorded since the last flush to the timings file.
+
+        The file is read again first, so timings written meanwhile by other processes are
+        kept, and replaced atomically through a temporary file.
+        """
+        with self.lock:
+            if self.path is None or not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+            try:
+                timings = self._load()
+                for key, new in pending.items():
+                    timings[key] = (timings.get(key, []) + new)[-MAX_TIMINGS:]
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                temp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(temp_path, "w") as f:
+                    json.dump(timings, f)
+                os.replace(temp_path, self.path)
+            except Exception as error:
+                print(f"An error occurred writing the segment timings: {error}")
+
+    def _measurements(self, device, column, model):
+        with self.lock:
+            timings = self.timings.get(self._device_key(device, model), [])
+            rows = [
+                (timing[0], timing[column])
+                for timing in timings
+                if len(timing) > column and timing[column] is not None
+            ]
+        return np.array(rows, dtype=np.float64).reshape(-1, 2)
+
+    def cost_model(self, device, model=None):
+        """
+        Returns the (c0, c1, c2) coefficients of elapsed = c0 + c1 * s + c2 * s^2 fitted
+        to the recorded timings of a device and model, or None if there are too few.
+
+        Args:
+            device (str): Device the segments were converted on.
+            model (str, optional): Model the segments were converted with.
+        """
+        rows = self._measurements(device, 1, model)
+        return fit_quadratic(rows[:, 0], rows[:, 1])
+
+    def memory_model(self, device, model=None):
+        """
+        Returns the coefficients of the peak memory in gigabytes as a quadratic function
+        of the segment length, fitted like `cost_model`, or None.
+
+        Args:
+            device (str): Device the segments were converted on.
+            model (str, optional): Model the segments were converted with.
+        """
+        rows = self._measurements(device, 2, model)
+        return fit_quadratic(rows[:, 0], rows[:, 1])
+
+    def plan(self, device, profile, model=None):
+        """
+        Returns the segment plan for a device and model and prints it.
+
+        Args:
+            device (str): "cpu" or a CUDA device such as "cuda:0".
+            profile: Object with the x_pad, x_query, x_center and x_max of `Config`.
+            model (str, optional): Model to plan for, from `model_key`.
+        """
+        baseline = SegmentPlan(
+            x_pad=profile.x_pad,
+            x_query=profile.x_query,
+            x_center=profile.x_center,
+            x_max=profile.x_max,
+        )
+        coefficients = self.cost_model(device, model)
+        if coefficients is None:
+            print(f"Segmentation plan for {device}: {baseline.describe()}")
+            return baseline
+
+        overhead = 2 * baseline.x_pad
+        longest, bound = baseline.x_center, "default"
+        memory = self.memory_model(device, model)
+        memory_gb = memory_budget_gb(device) if memory is not None else None
+        if memory_gb is not None:
+            # largest segment whose fitted peak memory fits in the budget
+            length = largest_length(memory, memory_gb * MEMORY_FRACTION - memory[0])
+            if length is None:
+                longest, bound = MAX_CENTER, "maximum length"
+            else:
+                # a segment spans up to the center plus twice the cut search window
+                # (about 16% of the center each) and the padding
+                longest = int((length - overhead) / 1.32)
+                bound = "measured memory"
+                if longest >= MAX_CENTER:
+                    longest, bound = MAX_CENTER, "maximum length"
+        longest = max(longest, MIN_CENTER)
+
+        centers = np.arange(MIN_CENTER, longest + 1)
+        lengths = centers + overhead
+        cost = (
+            coefficients[0] + coefficients[1] * lengths + coefficients[2] * lengths**2
+        )
+        center = int(centers[np.argmin(cost / centers)])
+        if center == baseline.x_center:
+            plan = baseline
+        else:
+            # 38 s and 30 s give the former 6 GB and 4 GB GPU profiles
+            x_query = max(2, min(6, round(center * 0.16)))
+            plan = SegmentPlan(
+                x_pad=baseline.x_pad,
+                x_query=x_query,
+                x_center=center,
+                x_max=center + max(2, x_query // 2),
+                memory_gb=memory_gb,
+                source=("measured throughput" if center < longest else bound),
+            )
+        print(f"Segmentation plan for {device}: {plan.describe()}")
+        return plan
+
+
+segment_planner = SegmentPlanner()
+atexit.register(segment_planner.flush)
@@ -0,0 +1,623 @@
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import threading
+import traceback
+import dataclasses
+import http.client
+from collections import OrderedDict, deque
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlparse, parse_qsl
+
+import numpy as np
+import soundfile as sf
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.utils import load_audio_infer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 6970
+DEFAULT_MAX_BATCH_SIZE = 4
+DEFAULT_MAX_WAIT_MS = 50
+DEFAULT_MAX_QUEUE = 32
+# Finished jobs kept for the status endpoint
+DEFAULT_MAX_JOBS = 256
+# Directory the input_path and output_path of HTTP requests are confined to
+DEFAULT_AUDIO_ROOT = os.path.join(now_dir, "assets", "audios")
+
+# Conversion settings of a job and their defaults. Queued jobs with the same settings
+# are converted together, in combined forward passes.
+JOB_SETTINGS = {
+    "model_path": "",
+    "index_path": "",
+    "sid": 0,
+    "pitch": 0,
+    "f0_method": "rmvpe",
+    "index_rate": 0.75,
+    "volume_envelope": 1.0,
+    "protect": 0.5,
+    "hop_length": 128,
+    "f0_autotune": False,
+    "f0_autotune_strength": 1.0,
+    "f0_autotune_scale": "chromatic",
+    "embedder_model": "contentvec",
+    "embedder_model_custom": "",
+}
+
+
+class QueueFull(Exception):
+    pass
+
+
+def resolve_path(root, path):
+    """
+    Returns a path of an HTTP request resolved against `root`, with symbolic links
+    followed. Raises PermissionError if it points outside `root`.
+
+    Args:
+        root (str): Directory the path is confined to.
+        path (str): Path relative to `root`, or absolute.
+    """
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise PermissionError(f"'{path}' is outside the audio root")
+    return resolved
+
+
+def parse_settings(values):
+    """
+    Returns the conversion settings of a job, with defaults for the missing ones and
+    values converted to the type of their default, so query strings can be used.
+
+    Args:
+        values (dict): Setting name to value.
+    """
+    unknown = set(values) - set(JOB_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    settings = dict(JOB_SETTINGS)
+    for name, value in values.items():
+        default = JOB_SETTINGS[name]
+        if isinstance(default, bool) and isinstance(value, str):
+            value = value.strip().lower() in ("1", "true", "yes", "on")
+        settings[name] = type(default)(value if value is not None else default)
+    if not settings["model_path"]:
+        raise ValueError("model_path is required")
+    return settings
+
+
+@dataclasses.dataclass
+class Job:
+    """
+    A conversion request and its state. Timings are in seconds.
+    """
+
+    id: str
+    settings: dict
+    audio: np.ndarray = None
+    output_path: str = None
+    status: str = "queued"
+    error: str = None
+    output: bytes = None
+    sample_rate: int = None
+    duration: float = 0.0
+    batch_size: int = 0
+    timings: dict = dataclasses.field(default_factory=dict)
+    enqueued: float = 0.0
+    done: threading.Event = dataclasses.field(default_factory=threading.Event)
+
+    @property
+    def batch_key(self):
+        return tuple(sorted(self.settings.items()))
+
+    def finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.audio = None
+        self.timings["total"] = (
+            time.perf_counter() - self.enqueued + self.timings.get("decode", 0)
+        )
+        self.done.set()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "model_path": self.settings["model_path"],
+            "duration": self.duration,
+            "sample_rate": self.sample_rate,
+            "output_path": self.output_path,
+            "batch_size": self.batch_size,
+            "timings": {name: round(value, 4) for name, value in self.timings.items()},
+        }
+
+
+class InferenceService:
+    """
+    Converts queued jobs with one warm VoiceConverter on a worker thread.
+
+    Jobs are decoded by the submitting thread and queued. The worker takes the oldest
+    job, waits up to `max_wait_ms` after it was queued for more jobs with the same model
+    and settings, and converts up to `max_batch_size` of them together with
+    `Pipeline.pipeline_batch`, so inputs of similar length share the embedder, RMVPE and
+    synthesizer passes. Models stay loaded in the converter's model registry. When
+    `max_queue` jobs are waiting, `submit` raises QueueFull.
+
+    Args:
+        voice_converter (VoiceConverter, optional): Converter owned by the worker.
+        max_batch_size (int): Maximum number of jobs converted together.
+        max_wait_ms (float): Longest time a job waits for others to batch with.
+        max_queue (int): Maximum number of queued jobs.
+        max_jobs (int): Number of finished jobs kept for `jobs`.
+    """
+
+    def __init__(
+        self,
+        voice_converter=None,
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms=DEFAULT_MAX_WAIT_MS,
+        max_queue=DEFAULT_MAX_QUEUE,
+        max_jobs=DEFAULT_MAX_JOBS,
+    ):
+        if voice_converter is None:
+            from rvc.infer.infer import VoiceConverter
+
+            voice_converter = VoiceConverter()
+        self.converter = voice_converter
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000)
+        self.max_queue = max(1, int(max_queue))
+        self.max_jobs = max(1, int(max_jobs))
+        self.pending = deque()
+        self.jobs = OrderedDict()
+        self.condition = threading.Condition()
+        self.running = False
+        self.worker = None
+        self.completed = self.failed = self.batches = 0
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return self
+            self.running = True
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+        return self
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            while self.pending:
+                self.pending.popleft().finish("failed", "The server stopped")
+            self.condition.notify_all()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def submit(self, settings, audio_path=None, audio_bytes=None, output_path=None):
+        """
+        Decodes an input and queues its conversion. Returns the queued Job.
+
+        Args:
+            settings (dict): Conversion settings, see `parse_settings`.
+            audio_path (str, optional): Path to the input audio.
+            audio_bytes (bytes, optional): Content of the input audio file.
+            output_path (str, optional): WAV file to write, the output is kept in
+                memory if None.
+        """
+        settings = parse_settings(settings)
+        if self.queued() >= self.max_queue:
+            raise QueueFull(f"{self.max_queue} jobs are already queued")
+        job = Job(id=uuid.uuid4().hex, settings=settings, output_path=output_path)
+        start = time.perf_counter()
+        job.audio = self.decode(audio_path, audio_bytes)
+        job.duration = len(job.audio) / 16000
+        job.timings["decode"] = time.perf_counter() - start
+        with self.condition:
+            if len(self.pending) >= self.max_queue:
+                raise QueueFull(f"{self.max_queue} jobs are already queued")
+            job.enqueued = time.perf_counter()
+            self.pending.append(job)
+            self.jobs[job.id] = job
+            self._trim_jobs()
+            self.condition.notify_all()
+        return job
+
+    @staticmethod
+    def decode(audio_path=None, audio_bytes=None):
+        """
+        Returns an input as a 16 kHz mono signal, normalized like `convert_audio` does.
+        """
+        if audio_bytes is not None:
+            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+                temp_file.write(audio_bytes)
+            try:
+                audio = load_audio_infer(temp_file.name, 16000)
+            finally:
+                os.remove(temp_file.name)
+        elif audio_path:
+            audio = load_audio_infer(audio_path, 16000)
+        else:
+            raise ValueError("No input audio")
+        if audio.size == 0:
+            raise ValueError("The input audio is empty")
+        audio_max = np.abs(audio).max() / 0.95
+        if audio_max > 1:
+            audio /= audio_max
+        return audio
+
+    def get(self, job_id):
+        with self.condition:
+            return self.jobs.get(job_id)
+
+    def queued(self):
+        with self.condition:
+            return len(self.pending)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "queued": len(self.pending),
+                "completed": self.completed,
+                "failed": self.failed,
+                "batches": self.batches,
+                "models": self.converter.model_registry.stats(),
+            }
+
+    def _trim_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+        for job_id in finished[: max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+    def _next_batch(self):
+        with self.condition:
+            while self.running and not self.pending:
+                self.condition.wait()
+            if not self.running:
+                return []
+            first = self.pending.popleft()
+            batch = [first]
+            deadline = first.enqueued + self.max_wait
+            while True:
+                for job in list(self.pending):
+                    if len(batch) >= self.max_batch_size:
+                        break
+                    if job.batch_key == first.batch_key:
+                        self.pending.remove(job)
+                        batch.append(job)
+                remaining = deadline - time.perf_counter()
+                if len(batch) >= self.max_batch_size or remaining <= 0:
+                    return batch
+                self.condition.wait(remaining)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                self.convert_batch(batch)
+            except Exception as error:
+                print(
+                    f"An error occurred converting a batch of {len(batch)} jobs: {error}"
+                )
+                print(traceback.format_exc())
+                for job in batch:
+                    if not job.done.is_set():
+                        job.finish("failed", str(error))
+            with self.condition:
+                self.batches += 1
+                for job in batch:
+                    if job.status == "done":
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+    def convert_batch(self, batch):
+        """
+        Converts jobs with the same settings together and writes their outputs.
+
+        Args:
+            batch (list): Jobs with the same `batch_key`.
+        """
+        start = time.perf_counter()
+        for job in batch:
+            job.status = "running"
+            job.batch_size = len(batch)
+            job.timings["queue"] = start - job.enqueued
+        settings = batch[0].settings
+        converter = self.converter
+        converter.get_vc(settings["model_path"], settings["sid"])
+        if converter.net_g is None:
+            raise FileNotFoundError(f"Model not found: {settings['model_path']}")
+        embedder_model = settings["embedder_model"]
+        if (
+            not converter.hubert_model
+            or embedder_model != converter.last_embedder_model
+        ):
+            converter.load_hubert(
+                embedder_model, settings["embedder_model_custom"] or None
+            )
+            converter.last_embedder_model = embedder_model
+        loaded = time.perf_counter()
+
+        outputs = converter.vc.pipeline_batch(
+            model=converter.hubert_model,
+            net_g=converter.net_g,
+            sid=settings["sid"],
+            audios=[job.audio for job in batch],
+            pitch=settings["pitch"],
+            f0_method=settings["f0_method"],
+            file_index=settings["index_path"].strip().replace("trained", "added"),
+            index_rate=settings["index_rate"],
+            pitch_guidance=converter.use_f0,
+            volume_envelope=settings["volume_envelope"],
+            version=converter.version,
+            protect=settings["protect"],
+            hop_length=settings["hop_length"],
+            f0_autotune=settings["f0_autotune"],
+            f0_autotune_strength=settings["f0_autotune_strength"],
+            f0_autotune_scale=settings["f0_autotune_scale"],
+            f0_file=None,
+            batch_size=len(batch),
+        )
+        converted = time.perf_counter()
+
+        for job, output in zip(batch, outputs):
+            job.timings["load"] = loaded - start
+            job.timings["convert"] = converted - loaded
+            encode_start = time.perf_counter()
+            try:
+                job.sample_rate = converter.tgt_sr
+                if job.output_path:
+                    sf.write(job.output_path, output, job.sample_rate, format="WAV")
+                else:
+                    buffer = io.BytesIO()
+                    sf.write(buffer, output, job.sample_rate, format="WAV")
+                    job.output = buffer.getvalue()
+                job.timings["encode"] = time.perf_counter() - encode_start
+                job.finish("done")
+            except Exception as error:
+                job.finish("failed", str(error))
+        print(
+            f"Converted {len(batch)} job(s) with '{settings['model_path']}' in {time.perf_counter() - start:.2f} seconds."
+        )
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP interface of an InferenceService:
+
+    - `POST /convert`: a JSON body with the settings, `input_path` and optionally
+      `output_path` and `wait`, or the input file as the body with the settings in the
+      query string. Waits for the conversion unless `wait` is false, in which case it
+      answers 202 with the queued job. Answers 503 when the queue is full. The paths are
+      resolved against `audio_root` and answered with 403 if they point outside it.
+    - `GET /jobs`: the known jobs and the service statistics.
+    - `GET /jobs/<id>`: the status and per-stage timings of a job.
+    - `GET /jobs/<id>/audio`: the converted WAV of a finished job.
+    """
+
+    service = None
+    audio_root = DEFAULT_AUDIO_ROOT
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        if parts == ["jobs"]:
+            with self.service.condition:
+                jobs = [job.to_dict() for job in self.service.jobs.values()]
+            return self.send_json(HTTPStatus.OK, {"jobs": jobs, **self.service.stats()})
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                return self.send_json(HTTPStatus.NOT_FOUND, {"error": "Unknown job"})
+            if len(parts) == 2:
+                return self.send_json(HTTPStatus.OK, job.to_dict())
+            if parts[2] == "audio":
+                return self.send_audio(job)
+        self.send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+
+    def send_audio(self, job):
+        if job.status != "done":
+            return self.send_json(HTTPStatus.CONFLICT, job.to_dict())
+        data = job.output
+        if data is None:
+            with open(job.output_path, "rb") as f:
+                data = f.read()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/convert":
+            return self.send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                values = json.loads(body or b"{}")
+                audio_path, audio_bytes = values.pop("input_path", None), None
+            else:
+                values = dict(parse_qsl(url.query))
+                audio_path, audio_bytes = None, body
+            output_path = values.pop("output_path", None)
+            if audio_path:
+                audio_path = resolve_path(self.audio_root, audio_path)
+            if output_path:
+                output_path = resolve_path(self.audio_root, output_path)
+            wait = str(values.pop("wait", True)).lower() not in ("0", "false", "no")
+            job = self.service.submit(values, audio_path, audio_bytes, output_path)
+        except PermissionError as error:
+            return self.send_json(HTTPStatus.FORBIDDEN, {"error": str(error)})
+        except QueueFull as error:
+            return self.send_json(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                {"error": str(error)},
+                {"Retry-After": "1"},
+            )
+        except Exception as error:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+        if not wait:
+            return self.send_json(HTTPStatus.ACCEPTED, job.to_dict())
+        job.done.wait()
+        status = (
+            HTTPStatus.OK if job.status == "done" else HTTPStatus.INTERNAL_SERVER_ERROR
+        )
+        self.send_json(status, job.to_dict())
+
+
+def create_server(
+    service, host=DEFAULT_HOST, port=DEFAULT_PORT, audio_root=DEFAULT_AUDIO_ROOT
+):
+    """
+    Returns an HTTP server for a service, one thread per connection. Port 0 picks a free
+    port, see `server.server_address`.
+
+    Args:
+        service (InferenceService): The started service.
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        audio_root (str): Directory the input and output paths of requests are confined to.
+    """
+    handler = type(
+        "Handler",
+        (RequestHandler,),
+        {"service": service, "audio_root": os.path.realpath(audio_root)},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class InferenceClient:
+    """
+    A minimal client of the HTTP interface, for scripts and local testing.
+
+    Args:
+        host (str): Address of the server.
+        port (int): Port of the server.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection(self.host, self.port)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+        if response.getheader("Content-Type") == "application/json":
+            data = json.loads(data)
+        return response.status, data
+
+    def convert(self, input_path=None, audio_bytes=None, wait=True, **settings):
+        """
+        Submits a conversion of a file on the server or of uploaded file content.
+        Returns the HTTP status and the job.
+        """
+        if audio_bytes is not None:
+            query = urlencode({**settings, "wait": wait})
+            return self.request("POST", f"/convert?{query}", body=audio_bytes)
+        body = json.dumps({**settings, "input_path": input_path, "wait": wait})
+        return self.request(
+            "POST", "/convert", body, {"Content-Type": "application/json"}
+        )
+
+    def job(self, job_id):
+        return self.request("GET", f"/jobs/{job_id}")
+
+    def jobs(self):
+        return self.request("GET", "/jobs")
+
+    def audio(self, job_id):
+        return self.request("GET", f"/jobs/{job_id}/audio")
+
+
+def serve(
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+    max_wait_ms=DEFAULT_MAX_WAIT_MS,
+    max_queue=DEFAULT_MAX_QUEUE,
+    voice_converter=None,
+    audio_root=DEFAULT_AUDIO_ROOT,
+):
+    """
+    Runs the inference server until interrupted.
+
+    Args:
+        host (str): Address to listen on. Requests name the voice models to load by
+            path, so only listen on trusted interfaces.
+        port (int): Port to listen on.
+        max_batch_size (int): Maximum number of jobs converted together.
+        max_wait_ms (float): Longest time a job waits for others to batch with.
+        max_queue (int): Maximum number of queued jobs.
+        voice_converter (VoiceConverter, optional): Converter used by the service.
+        audio_root (str): Directory the input and output paths of requests are confined to.
+    """
+    service = InferenceService(
+        voice_converter, max_batch_size, max_wait_ms, max_queue
+    ).start()
+    server = create_server(service, host, port, audio_root)
+    print(f"Inference server listening on http://{host}:{server.server_address[1]}")
+    print(f"Reading and writing audio files under '{os.path.realpath(audio_root)}'")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local inference server.")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max_batch_size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max_wait_ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--max_queue", type=int, default=DEFAULT_MAX_QUEUE)
+    parser.add_argument("--audio_root", type=str, default=DEFAULT_AUDIO_ROOT)
+    args = parser.parse_args()
+    serve(
+        args.host,
+        args.port,
+        args.max_batch_size,
+        args.max_wait_ms,
+        args.max_queue,
+        audio_root=args.audio_root,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import queue
+import traceback
+import multiprocessing
+
+import soundfile as sf
+import torch
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+# Bytes per second of audio assumed for files soundfile cannot read, about 128 kbps
+COMPRESSED_BYTES_PER_SECOND = 16000
+
+
+def available_cores():
+    """
+    Returns the CPU cores this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_shares(cores, workers):
+    """
+    Splits cores into contiguous shares, one per worker. With more workers than cores,
+    workers share single cores.
+
+    Args:
+        cores (list): Core ids.
+        workers (int): Number of workers.
+    """
+    n = len(cores)
+    return [
+        cores[i * n // workers : (i + 1) * n // workers] or [cores[i % n]]
+        for i in range(workers)
+    ]
+
+
+def audio_duration(path):
+    try:
+        return sf.info(path).duration
+    except Exception:
+        return os.path.getsize(path) / COMPRESSED_BYTES_PER_SECOND
+
+
+def _worker(worker_id, cores, converter_settings, kwargs, tasks, results):
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        torch.set_num_threads(len(cores))
+        from rvc.infer.infer import VoiceConverter
+
+        converter = VoiceConverter(**converter_settings)
+
+        def files():
+            while True:
+                paths = tasks.get()
+                if paths is None:
+                    return
+                yield paths
+
+        def progress(input_path, output_path, error):
+            results.put(("file", worker_id, (input_path, output_path, error)))
+
+        stats = converter.convert_files(files(), progress=progress, **kwargs)
+        results.put(("done", worker_id, stats))
+    except Exception as error:
+        print(f"An error occurred in batch worker {worker_id}: {error}")
+        print(traceback.format_exc())
+        results.put(("done", worker_id, None))
+
+
+def convert_files_sharded(files, workers, converter_settings=None, **kwargs):
+    """
+    Converts files with several worker processes, each owning a VoiceConverter pinned
+    to its own share of the CPU cores, with torch using one thread per core of the
+    share. Small convolutions scale poorly over many threads, so several processes with
+    a few threads each keep a large host busy where one process plateaus.
+
+    Files are handed out longest first from a shared queue, so the longest inputs do not
+    end up last on a single worker. Progress from every worker is printed as files
+    finish, followed by a per-worker and a merged summary.
+
+    Args:
+        files (list): Pairs of input and output paths.
+        workers (int): Number of worker processes.
+        converter_settings (dict, optional): Keyword arguments of the workers'
+            VoiceConverter, e.g. quantize, backend and onnx_threads.
+        **kwargs: Settings of `VoiceConverter.convert_files`.
+    """
+    start_time = time.perf_counter()
+    files = sorted(files, key=lambda paths: audio_duration(paths[0]), reverse=True)
+    workers = max(1, min(int(workers), len(files)))
+    shares = core_shares(available_cores(), workers)
+    # each worker decodes and encodes on its own cores, one thread per stage is enough
+    kwargs.setdefault("decode_workers", 1)
+    kwargs.setdefault("encode_workers", 1)
+
+    context = multiprocessing.get_context("spawn")
+    tasks, results = context.Queue(), context.Queue()
+    for paths in files:
+        tasks.put(paths)
+    for _ in range(workers):
+        tasks.put(None)
+    processes = [
+        context.Process(
+            target=_worker,
+            args=(i, shares[i], converter_settings or {}, kwargs, tasks, results),
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    print(
+        f"Converting {len(files)} files with {workers} workers: "
+        + ", ".join(f"worker {i} on cores {share}" for i, share in enumerate(shares))
+    )
+
+    worker_stats = {}
+    finished = 0
+    while len(worker_stats) < workers:
+        try:
+            kind, worker_id, payload = results.get(timeout=1)
+        except queue.Empty:
+            for i, process in enumerate(processes):
+                if i not in worker_stats and not process.is_alive():
+                    print(f"Batch worker {i} exited with code {process.exitcode}.")
+                    worker_stats[i] = None
+            continue
+        if kind == "file":
+            finished += 1
+            input_path, output_path, error = payload
+            result = f"failed: {error}" if error else f"saved at '{output_path}'"
+            print(
+                f"[{finished}/{len(files)}] Worker {worker_id}: '{input_path}' {result}"
+            )
+        else:
+            worker_stats[worker_id] = payload
+    for process in processes:
+        process.join()
+
+    stats = {
+        "files": 0,
+        "failed": 0,
+        "audio_seconds": 0.0,
+        "compute_seconds": 0.0,
+        "elapsed": time.perf_counter() - start_time,
+        "workers": workers,
+    }
+    for i in range(workers):
+        worker = worker_stats.get(i)
+        if worker is None:
+            continue
+        print(
+            f"Worker {i} on cores {shares[i]}: {worker['files']} files, {worker['audio_seconds']:.1f} seconds of audio, "
+            f"{worker['audio_seconds'] / max(worker['elapsed'], 1e-9):.2f} audio-seconds/s."
+        )
+        for key in ("files", "failed", "audio_seconds", "compute_seconds"):
+            stats[key] += worker[key]
+    # files a crashed worker never reported on
+    stats["failed"] = max(stats["failed"], len(files) - stats["files"])
+    return stats
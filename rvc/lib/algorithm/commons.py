@@ -136,3 +136,27 @@ def grad_norm(parameters, norm_type: float = 2.0):
     return torch.linalg.vector_norm(
         torch.stack([p.grad.norm(norm_type) for p in parameters]), ord=norm_type
     ).item()
+
+
+def fold_weight_norm(model: torch.nn.Module):
+    """
+    Remove every weight norm of a model, keeping the normalized weights, for inference.
+
+    Args:
+        model: The model to modify in place.
+    """
+    from torch.nn.utils import parametrize
+
+    for module in model.modules():
+        if parametrize.is_parametrized(module, "weight"):
+            parametrize.remove_parametrizations(
+                module, "weight", leave_parametrized=True
+            )
+            # drop the hook that maps legacy weight_g/weight_v keys, it is not picklable
+            for key, hook in list(module._load_state_dict_pre_hooks.items()):
+                hook = getattr(hook, "hook", hook)
+                if getattr(hook, "__name__", "") == "_weight_norm_compat_hook":
+                    del module._load_state_dict_pre_hooks[key]
+        elif hasattr(module, "weight_g") and hasattr(module, "weight_v"):
+            torch.nn.utils.remove_weight_norm(module)
+    return model
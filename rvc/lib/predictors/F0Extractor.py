@@ -6,10 +6,9 @@ import resampy
 import torch
 import torchcrepe
 import torchfcpe
-import os
 
 # from tools.anyf0.rmvpe import RMVPE
-from rvc.lib.predictors.RMVPE import RMVPE0Predictor
+from rvc.lib.predictors.PredictorPool import predictor_pool
 from rvc.configs.config import Config
 
 config = Config()
@@ -76,11 +75,7 @@ class F0Extractor:
             )
             f0 = f0.squeeze().cpu().numpy()
         elif method == "rmvpe":
-            model_rmvpe = RMVPE0Predictor(
-                os.path.join("rvc", "models", "predictors", "rmvpe.pt"),
-                device=config.device,
-                # hop_length=80
-            )
+            model_rmvpe = predictor_pool.get("rmvpe", config.device)
             f0 = model_rmvpe.infer_from_audio(self.wav16k, thred=0.03)
 
         else:
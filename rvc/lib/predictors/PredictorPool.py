@@ -0,0 +1,82 @@
+import os
+import threading
+
+import torch
+
+from rvc.lib.predictors.RMVPE import RMVPE0Predictor
+from rvc.lib.predictors.FCPE import FCPEF0Predictor
+
+predictors_dir = os.path.join("rvc", "models", "predictors")
+
+
+class PredictorPool:
+    """
+    A thread-safe pool of F0 predictors shared across pipelines and calls.
+
+    Each predictor is loaded lazily the first time it is requested and is keyed by
+    method, device and predictor settings, so every combination is loaded only once.
+    """
+
+    def __init__(self):
+        self.predictors = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+
+    def get(self, method, device, **kwargs):
+        """
+        Returns the predictor for a method and device, loading it on first use.
+
+        Args:
+            method (str): F0 method, "rmvpe" or "fcpe".
+            device (str): Device the predictor runs on.
+            **kwargs: Predictor settings, e.g. f0_min, f0_max, sample_rate and threshold for FCPE,
+                or backend and threads to run RMVPE through onnxruntime.
+        """
+        key = (method, str(device), tuple(sorted(kwargs.items())))
+        predictor = self.predictors.get(key)
+        if predictor is not None:
+            return predictor
+
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        # load outside the pool lock so different predictors can load in parallel
+        with key_lock:
+            predictor = self.predictors.get(key)
+            if predictor is None:
+                predictor = self._load(method, device, **kwargs)
+                self.predictors[key] = predictor
+        return predictor
+
+    @staticmethod
+    def _load(method, device, **kwargs):
+        if method == "rmvpe":
+            backend = kwargs.pop("backend", "torch")
+            threads = kwargs.pop("threads", 0)
+            model_path = os.path.join(predictors_dir, "rmvpe.pt")
+            predictor = RMVPE0Predictor(model_path, device=device, **kwargs)
+            if backend == "onnx":
+                from rvc.infer.onnx_backend import load_onnx_rmvpe
+
+                predictor.model = load_onnx_rmvpe(predictor.model, model_path, threads)
+            return predictor
+        elif method == "fcpe":
+            return FCPEF0Predictor(
+                os.path.join(predictors_dir, "fcpe.pt"),
+                dtype=torch.float32,
+                device=device,
+                **kwargs,
+            )
+        raise ValueError(f"Unknown F0 predictor: {method}")
+
+    def clear(self):
+        """
+        Releases every loaded predictor.
+        """
+        with self.lock:
+            self.predictors.clear()
+            self.key_locks.clear()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+predictor_pool = PredictorPool()
@@ -8,6 +8,8 @@ from typing import List
 
 N_MELS = 128
 N_CLASS = 360
+DEFAULT_WINDOW_FRAMES = 4096
+DEFAULT_OVERLAP_FRAMES = 256
 
 
 class ConvBlockRes(nn.Module):
@@ -424,9 +426,18 @@ class RMVPE0Predictor:
     Args:
         model_path (str): Path to the RMVPE0 model file.
         device (str, optional): Device to use for computation. Defaults to None, which uses CUDA if available.
+        window_frames (int, optional): Longest input, in frames, processed in a single forward pass.
+            Longer inputs are processed in overlapping windows so memory stays bounded. None disables windowing.
+        overlap_frames (int, optional): Overlap between consecutive windows, crossfaded in the salience domain.
     """
 
-    def __init__(self, model_path, device=None):
+    def __init__(
+        self,
+        model_path,
+        device=None,
+        window_frames=DEFAULT_WINDOW_FRAMES,
+        overlap_frames=DEFAULT_OVERLAP_FRAMES,
+    ):
         self.resample_kernel = {}
         model = E2E(4, 1, (2, 2))
         ckpt = torch.load(model_path, map_location="cpu", weights_only=True)
@@ -439,6 +450,8 @@ class RMVPE0Predictor:
             N_MELS, 16000, 1024, 160, None, 30, 8000
         ).to(device)
         self.model = self.model.to(device)
+        self.window_frames = window_frames
+        self.overlap_frames = overlap_frames
         cents_mapping = 20 * np.arange(N_CLASS) + 1997.3794084376191
         self.cents_mapping = np.pad(cents_mapping, (4, 4))
 
@@ -478,6 +491,9 @@ class RMVPE0Predictor:
             audio (np.ndarray): Audio signal.
             thred (float, optional): Threshold for salience. Defaults to 0.03.
         """
+        n_frames = audio.shape[0] // self.mel_extractor.hop_length + 1
+        if self.window_frames and n_frames > self.window_frames:
+            return self.infer_from_audio_windowed(audio, thred=thred)
         audio = torch.from_numpy(audio).float().to(self.device).unsqueeze(0)
         mel = self.mel_extractor(audio, center=True)
         hidden = self.mel2hidden(mel)
@@ -485,6 +501,88 @@ class RMVPE0Predictor:
         f0 = self.decode(hidden, thred=thred)
         return f0
 
+    def infer_from_audio_windowed(self, audio, thred=0.03):
+        """
+        Infers F0 from audio in overlapping windows of `window_frames` frames.
+
+        Each window gets the exact mel frames of a full-length pass. The salience of
+        consecutive windows is crossfaded over `overlap_frames` and decoded right away,
+        so peak memory depends on the window size and not on the input length.
+
+        Args:
+            audio (np.ndarray): Audio signal.
+            thred (float, optional): Threshold for salience. Defaults to 0.03.
+        """
+        hop_length = self.mel_extractor.hop_length
+        n_fft = self.mel_extractor.n_fft
+        n_frames = audio.shape[0] // hop_length + 1
+        window = self.window_frames
+        overlap = min(self.overlap_frames, window // 2)
+        step = window - overlap
+        fade = ((np.arange(overlap) + 0.5) / overlap)[:, None].astype(np.float32)
+
+        f0_parts = []
+        tail = None
+        for start in range(0, n_frames, step):
+            end = min(start + window, n_frames)
+            segment = self._centered_segment(
+                audio, start * hop_length, (end - 1) * hop_length + n_fft
+            )
+            segment = torch.from_numpy(segment).float().to(self.device).unsqueeze(0)
+            mel = self.mel_extractor(segment, center=False)
+            hidden = self.mel2hidden(mel).squeeze(0).cpu().numpy()
+            if tail is not None:
+                n = min(tail.shape[0], hidden.shape[0])
+                hidden[:n] = tail[:n] * (1 - fade[:n]) + hidden[:n] * fade[:n]
+            if end == n_frames:
+                f0_parts.append(self.decode(hidden, thred=thred))
+                break
+            f0_parts.append(self.decode(hidden[:step], thred=thred))
+            tail = hidden[step:]
+        return np.concatenate(f0_parts)
+
+    def _centered_segment(self, audio, start, end):
+        # samples [start, end) of the audio reflect-padded by n_fft // 2, as torch.stft(center=True) does
+        pad = self.mel_extractor.n_fft // 2
+        start, end = start - pad, end - pad
+        left, right = max(0, -start), max(0, end - audio.shape[0])
+        segment = audio[max(start, 0) : min(end, audio.shape[0])]
+        if left or right:
+            segment = np.pad(segment, (left, right), mode="reflect")
+        return segment
+
+    def infer_from_audio_batch(self, audios, thred=0.03):
+        """
+        Infers F0 for several audio signals, running signals of equal length in a single
+        forward pass.
+
+        Signals of different lengths are not padded into one batch: the reflect padding
+        of the mel frames, the convolutions and the BiGRU would all see the padding and
+        change the F0 near the end of the shorter signals. The result is the same as
+        calling `infer_from_audio` on every signal.
+
+        Args:
+            audios (list of np.ndarray): Audio signals.
+            thred (float, optional): Threshold for salience. Defaults to 0.03.
+        """
+        groups = {}
+        for i, audio in enumerate(audios):
+            groups.setdefault(audio.shape[0], []).append(i)
+        f0s = [None] * len(audios)
+        for length, ids in groups.items():
+            n_frames = length // self.mel_extractor.hop_length + 1
+            if len(ids) == 1 or (self.window_frames and n_frames > self.window_frames):
+                for i in ids:
+                    f0s[i] = self.infer_from_audio(audios[i], thred=thred)
+                continue
+            batch = np.stack([audios[i] for i in ids]).astype(np.float32, copy=False)
+            batch = torch.from_numpy(batch).to(self.device)
+            mel = self.mel_extractor(batch, center=True)
+            hidden = self.mel2hidden(mel).cpu().numpy()
+            for row, i in enumerate(ids):
+                f0s[i] = self.decode(hidden[row], thred=thred)
+        return f0s
+
     def to_local_average_cents(self, salience, thred=0.05):
         """
         Converts salience to local average cents.
@@ -493,22 +591,22 @@ class RMVPE0Predictor:
             salience (np.ndarray): Salience values.
             thred (float, optional): Threshold for salience. Defaults to 0.05.
         """
+        frames = np.arange(salience.shape[0])
         center = np.argmax(salience, axis=1)
-        salience = np.pad(salience, ((0, 0), (4, 4)))
-        center += 4
-        todo_salience = []
-        todo_cents_mapping = []
-        starts = center - 4
-        ends = center + 5
-        for idx in range(salience.shape[0]):
-            todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
-            todo_cents_mapping.append(self.cents_mapping[starts[idx] : ends[idx]])
-        todo_salience = np.array(todo_salience)
-        todo_cents_mapping = np.array(todo_cents_mapping)
+        # 9-bin window around each peak, bins outside the salience range count as zero
+        window = center[:, None] + np.arange(-4, 5)
+        inside = (window >= 0) & (window < salience.shape[1])
+        todo_salience = np.where(
+            inside,
+            salience[frames[:, None], np.clip(window, 0, salience.shape[1] - 1)],
+            0,
+        ).astype(salience.dtype, copy=False)
+        todo_cents_mapping = self.cents_mapping[window + 4]
         product_sum = np.sum(todo_salience * todo_cents_mapping, 1)
         weight_sum = np.sum(todo_salience, 1)
         devided = product_sum / weight_sum
-        maxx = np.max(salience, axis=1)
+        # salience is a sigmoid output, so the peak value is also the zero-padded row maximum
+        maxx = salience[frames, center]
         devided[maxx <= thred] = 0
         return devided
 
@@ -0,0 +1,708 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+
+def time_call(function, repeats=5):
+    """
+    Returns the best wall-clock time of several calls to a function, in seconds.
+
+    Args:
+        function (callable): Function called without arguments.
+        repeats (int): Number of timed calls.
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def local_average_cents_loop(salience, cents_mapping, thred=0.05):
+    """
+    Per-frame reference implementation of RMVPE0Predictor.to_local_average_cents.
+    """
+    center = np.argmax(salience, axis=1)
+    salience = np.pad(salience, ((0, 0), (4, 4)))
+    center += 4
+    todo_salience = []
+    todo_cents_mapping = []
+    starts = center - 4
+    ends = center + 5
+    for idx in range(salience.shape[0]):
+        todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
+        todo_cents_mapping.append(cents_mapping[starts[idx] : ends[idx]])
+    todo_salience = np.array(todo_salience)
+    todo_cents_mapping = np.array(todo_cents_mapping)
+    product_sum = np.sum(todo_salience * todo_cents_mapping, 1)
+    weight_sum = np.sum(todo_salience, 1)
+    devided = product_sum / weight_sum
+    maxx = np.max(salience, axis=1)
+    devided[maxx <= thred] = 0
+    return devided
+
+
+def benchmark_local_average_cents(n_frames=60000, repeats=3):
+    """
+    Compares the vectorized RMVPE salience decode against the per-frame loop.
+
+    Args:
+        n_frames (int): Number of salience frames, 60000 is a 10-minute track.
+        repeats (int): Number of timed calls per implementation.
+    """
+    from rvc.lib.predictors.RMVPE import RMVPE0Predictor, N_CLASS
+
+    rng = np.random.default_rng(0)
+    salience = rng.random((n_frames, N_CLASS), dtype=np.float32) * 0.1
+    salience[np.arange(n_frames), rng.integers(0, N_CLASS, n_frames)] = 0.9
+    predictor = RMVPE0Predictor.__new__(RMVPE0Predictor)
+    predictor.cents_mapping = np.pad(
+        20 * np.arange(N_CLASS) + 1997.3794084376191, (4, 4)
+    )
+
+    expected = local_average_cents_loop(salience, predictor.cents_mapping, 0.03)
+    result = predictor.to_local_average_cents(salience, thred=0.03)
+    loop_time = time_call(
+        lambda: local_average_cents_loop(salience, predictor.cents_mapping, 0.03),
+        repeats,
+    )
+    vectorized_time = time_call(
+        lambda: predictor.to_local_average_cents(salience, thred=0.03), repeats
+    )
+    return {
+        "frames": n_frames,
+        "identical": bool(np.array_equal(expected, result)),
+        "loop_seconds": loop_time,
+        "vectorized_seconds": vectorized_time,
+        "speedup": loop_time / vectorized_time,
+    }
+
+
+def autotune_loop(f0, note_dict, f0_autotune_strength):
+    """
+    Per-frame reference implementation of Autotune.autotune_f0.
+    """
+    autotuned_f0 = np.zeros_like(f0)
+    for i, freq in enumerate(f0):
+        closest_note = min(note_dict, key=lambda x: abs(x - freq))
+        autotuned_f0[i] = freq + (closest_note - freq) * f0_autotune_strength
+    return autotuned_f0
+
+
+def benchmark_autotune(n_frames=60000, repeats=3):
+    """
+    Compares the vectorized autotune against the per-frame loop on a synthetic contour.
+
+    Args:
+        n_frames (int): Number of F0 frames, 60000 is a 10-minute track.
+        repeats (int): Number of timed calls per implementation.
+    """
+    from rvc.infer.f0_postprocess import Autotune, REF_FREQS
+
+    rng = np.random.default_rng(0)
+    f0 = np.exp(rng.uniform(np.log(40), np.log(1200), n_frames)).astype(np.float32)
+    f0[rng.random(n_frames) < 0.3] = 0
+    autotune = Autotune(REF_FREQS)
+    note_dict = REF_FREQS.tolist()
+
+    expected = autotune_loop(f0, note_dict, 0.7)
+    result = autotune.autotune_f0(f0, 0.7)
+    loop_time = time_call(lambda: autotune_loop(f0, note_dict, 0.7), repeats)
+    vectorized_time = time_call(lambda: autotune.autotune_f0(f0, 0.7), repeats)
+    return {
+        "frames": n_frames,
+        "identical": bool(np.array_equal(expected, result)),
+        "loop_seconds": loop_time,
+        "vectorized_seconds": vectorized_time,
+        "speedup": loop_time / vectorized_time,
+    }
+
+
+def random_synthesizer(vocoder="HiFi-GAN"):
+    """
+    Returns a Synthesizer with pitch guidance, random weights and the 40 kHz configuration.
+
+    Args:
+        vocoder (str): Vocoder of the synthesizer.
+    """
+    import json
+    from rvc.lib.algorithm.synthesizers import Synthesizer
+
+    with open(os.path.join(now_dir, "rvc", "configs", "40000.json"), "r") as f:
+        config = json.load(f)
+    data, model = config["data"], config["model"]
+    return Synthesizer(
+        data["filter_length"] // 2 + 1,
+        config["train"]["segment_size"] // data["hop_length"],
+        model["inter_channels"],
+        model["hidden_channels"],
+        model["filter_channels"],
+        model["n_heads"],
+        model["n_layers"],
+        model["kernel_size"],
+        model["p_dropout"],
+        model["resblock"],
+        model["resblock_kernel_sizes"],
+        model["resblock_dilation_sizes"],
+        model["upsample_rates"],
+        model["upsample_initial_channel"],
+        model["upsample_kernel_sizes"],
+        1,
+        model["gin_channels"],
+        data["sample_rate"],
+        use_f0=True,
+        vocoder=vocoder,
+    )
+
+
+def retrieve_speaker_embeddings_numpy(feats, index, big_npy, index_rate):
+    """
+    Reference implementation of the index retrieval with a NumPy gather of shape
+    (frames, 8, channels).
+    """
+    import torch
+
+    npy = feats.reshape(-1, feats.shape[-1]).cpu().numpy()
+    score, ix = index.search(npy, k=8)
+    weight = np.square(1 / score)
+    weight /= weight.sum(axis=1, keepdims=True)
+    npy = np.sum(big_npy[ix] * np.expand_dims(weight, axis=2), axis=1)
+    return (
+        torch.from_numpy(npy).view(feats.shape).to(feats.device) * index_rate
+        + (1 - index_rate) * feats
+    )
+
+
+def benchmark_retrieval(frames=4000, vectors=40000, repeats=3):
+    """
+    Compares the batched retrieval engine against the NumPy reference, with a FAISS
+    IVF index built like extract_index.py builds it, a float16 memory-mapped vector file
+    and a small index searched exactly with torch.
+
+    Args:
+        frames (int): Number of feature frames, 50 per second of audio.
+        vectors (int): Number of index vectors.
+        repeats (int): Number of timed calls per implementation.
+    """
+    import tempfile
+    import faiss
+    import torch
+    from rvc.infer import retrieval
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(256, 768)).astype(np.float32)
+
+    def features(n):
+        labels = rng.integers(0, len(centers), n)
+        return centers[labels] + rng.normal(size=(n, 768)).astype(np.float32)
+
+    def build(big_npy):
+        n_ivf = min(int(16 * np.sqrt(len(big_npy))), len(big_npy) // 39)
+        index = faiss.index_factory(768, f"IVF{n_ivf},Flat")
+        index.train(big_npy)
+        index.add(big_npy)
+        faiss.extract_index_ivf(index).nprobe = 1
+        return index
+
+    feats = torch.from_numpy(features(frames)).unsqueeze(0)
+    big_npy = features(vectors)
+    index = build(big_npy)
+    small_npy = features(retrieval.EXACT_MAX_VECTORS_CPU)
+    small_index = faiss.IndexFlatL2(768)
+    small_index.add(small_npy)
+
+    results = {
+        "frames": frames,
+        "vectors": vectors,
+        # the (frames, 8, channels) float32 gather of the reference
+        "reference_temporary_mb": frames * retrieval.K * 768 * 4 / (1024 * 1024),
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "vectors.npy")
+        np.save(path, big_npy.astype(np.float16))
+        mapped = np.load(path, mmap_mode="r")
+        cases = {
+            "ivf": (index, big_npy, index, big_npy),
+            "ivf_mmap_float16": (index, big_npy, index, mapped),
+            # the reference searches the small index exactly with FAISS
+            "exact": (small_index, small_npy, small_index, small_npy),
+        }
+        for name, (ref_index, ref_npy, new_index, new_npy) in cases.items():
+            expected = retrieve_speaker_embeddings_numpy(
+                feats, ref_index, ref_npy, 0.75
+            )
+            result = retrieval.retrieve_speaker_embeddings(
+                feats, new_index, new_npy, 0.75
+            )
+            reference_time = time_call(
+                lambda: retrieve_speaker_embeddings_numpy(
+                    feats, ref_index, ref_npy, 0.75
+                ),
+                repeats,
+            )
+            batched_time = time_call(
+                lambda: retrieval.retrieve_speaker_embeddings(
+                    feats, new_index, new_npy, 0.75
+                ),
+                repeats,
+            )
+            search_time = time_call(
+                lambda: ref_index.search(feats[0].numpy(), retrieval.K), repeats
+            )
+            results[f"{name} max_difference"] = (expected - result).abs().max().item()
+            results[f"{name} faiss_search_seconds"] = search_time
+            results[f"{name} reference_seconds"] = reference_time
+            results[f"{name} batched_seconds"] = batched_time
+            results[f"{name} speedup"] = reference_time / batched_time
+        del mapped
+    return results
+
+
+def benchmark_batched(seconds=(2.0, 2.5, 2.5, 3.1), repeats=1):
+    """
+    Compares `Pipeline.pipeline_batch` against converting every chunk with `pipeline`,
+    with a randomly initialized HuBERT base embedder, RMVPE and synthesizer on the CPU.
+
+    The synthesizer samples noise, so the outputs of both paths differ by design; the
+    check compares what they pass to `Synthesizer.infer` instead: the features after
+    retrieval and protection, and the coarse and fine F0 of every chunk.
+
+    Args:
+        seconds (tuple): Length of every chunk. Equal lengths share an RMVPE pass.
+        repeats (int): Number of timed calls per implementation.
+    """
+    import tempfile
+    import types
+    import faiss
+    import torch
+    from transformers import HubertConfig
+    from rvc.infer.pipeline import Pipeline
+    from rvc.infer.feature_cache import f0_cache
+    from rvc.lib.predictors.RMVPE import E2E, RMVPE0Predictor
+    from rvc.lib.utils import HubertModelWithFinalProj
+
+    class ParityPipeline(Pipeline):
+        model_rmvpe = None
+
+    class Recorder:
+        def __init__(self, net_g):
+            self.net_g = net_g
+            self.calls = []
+
+        def infer(self, feats, p_len, pitch, pitchf, sid):
+            self.calls.append((feats, p_len, pitch, pitchf))
+            return self.net_g.infer(feats, p_len, pitch, pitchf, sid)
+
+    torch.manual_seed(0)
+    config = types.SimpleNamespace(
+        x_pad=1, x_query=6, x_center=38, x_max=41, device="cpu"
+    )
+    pipeline = ParityPipeline(40000, config)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "rmvpe.pt")
+        torch.save(E2E(4, 1, (2, 2)).state_dict(), path)
+        pipeline.model_rmvpe = RMVPE0Predictor(path, device="cpu")
+    model = HubertModelWithFinalProj(HubertConfig()).eval()
+    net_g = random_synthesizer().eval()
+    rng = np.random.default_rng(0)
+    chunks = [
+        (rng.standard_normal(int(16000 * length)) * 0.1).astype(np.float32)
+        for length in sorted(seconds)
+    ]
+    index = faiss.IndexFlatL2(768)
+    index.add(rng.standard_normal((2048, 768)).astype(np.float32))
+    arguments = dict(
+        model=model,
+        sid=0,
+        pitch=0,
+        f0_method="rmvpe",
+        index_rate=0.5,
+        pitch_guidance=True,
+        volume_envelope=1,
+        version="v2",
+        protect=0.33,
+        hop_length=128,
+        f0_autotune=False,
+        f0_autotune_strength=1,
+        f0_file=None,
+    )
+
+    results = {"chunks": len(chunks)}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_index = os.path.join(temp_dir, "parity.index")
+        faiss.write_index(index, file_index)
+        arguments["file_index"] = file_index
+
+        single = Recorder(net_g)
+        for chunk in chunks:
+            pipeline.pipeline(net_g=single, audio=chunk, **arguments)
+        batched = Recorder(net_g)
+        pipeline.pipeline_batch(
+            net_g=batched, audios=chunks, batch_size=len(chunks), **arguments
+        )
+        # the chunks are sorted by length, so the batch rows keep their order
+        rows = [
+            [tensor[row] for tensor in call]
+            for call in batched.calls
+            for row in range(len(call[1]))
+        ]
+        differences = {"feats": 0.0, "pitch": 0.0, "pitchf": 0.0}
+        for i, (call, row) in enumerate(zip(single.calls, rows)):
+            p_len = int(call[1][0])
+            results[f"chunk {i} frames"] = f"{p_len} / {int(row[1])}"
+            for name, expected, result in zip(
+                ("feats", "pitch", "pitchf"),
+                (call[0][0], call[2][0], call[3][0]),
+                (row[0], row[2], row[3]),
+            ):
+                difference = (
+                    (expected[:p_len].float() - result[:p_len].float())
+                    .abs()
+                    .max()
+                    .item()
+                )
+                differences[name] = max(differences[name], difference)
+        for name, difference in differences.items():
+            results[f"{name} max_difference"] = difference
+
+        def convert_single():
+            # the batched path does not read the F0 cache either
+            f0_cache.clear()
+            for chunk in chunks:
+                pipeline.pipeline(net_g=net_g, audio=chunk, **arguments)
+
+        single_time = time_call(convert_single, repeats)
+        batched_time = time_call(
+            lambda: pipeline.pipeline_batch(
+                net_g=net_g, audios=chunks, batch_size=len(chunks), **arguments
+            ),
+            repeats,
+        )
+    results["single_seconds"] = single_time
+    results["batched_seconds"] = batched_time
+    results["speedup"] = single_time / batched_time
+    return results
+
+
+def benchmark_feature_cache(puts=200, repeats=3):
+    """
+    Checks the keys of the embedding cache and times its memory and disk tiers.
+
+    A key must hit for the same segment and embedder and miss when a single sample, the
+    dtype or the embedder changes. The disk tier must survive a new cache instance
+    (a later run) and stay within its budget, which here holds about half of the puts.
+
+    Args:
+        puts (int): Number of stored embedder outputs, 2 seconds of features each.
+        repeats (int): Number of timed runs per tier.
+    """
+    import tempfile
+    from rvc.infer.feature_cache import EmbeddingCache, audio_hash
+
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(32000).astype(np.float32)
+    value = rng.standard_normal((1, 100, 768)).astype(np.float32)
+    changed = audio.copy()
+    changed[1000] += 1e-6
+
+    results = {}
+    cache = EmbeddingCache()
+    cache.put((audio_hash(audio), "contentvec"), value)
+    results["same_segment_hits"] = (
+        cache.get((audio_hash(audio.copy()), "contentvec")) is not None
+    )
+    results["changed_sample_misses"] = (
+        cache.get((audio_hash(changed), "contentvec")) is None
+    )
+    results["changed_dtype_misses"] = (
+        cache.get((audio_hash(audio.astype(np.float64)), "contentvec")) is None
+    )
+    results["changed_embedder_misses"] = cache.get((audio_hash(audio), "spin")) is None
+
+    keys = [(f"{i:040x}", "contentvec") for i in range(puts)]
+    budget_mb = puts * value.nbytes / (2 * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, "embeddings")
+
+        def fill(cache):
+            for key in keys:
+                cache.put(key, value)
+
+        memory_time = time_call(lambda: fill(EmbeddingCache()), repeats)
+        disk_time = time_call(
+            lambda: fill(EmbeddingCache(cache_dir, disk_mb=budget_mb)), repeats
+        )
+        later = EmbeddingCache(cache_dir, disk_mb=budget_mb)
+        on_disk = sum(
+            os.path.getsize(os.path.join(cache_dir, name))
+            for name in os.listdir(cache_dir)
+        )
+        results["disk_within_budget"] = on_disk <= later.disk_budget
+        results["tracked_bytes_match_disk"] = later.disk_bytes == on_disk
+        results["later_run_hits"] = later.get(keys[-1]) is not None
+        results["oldest_pruned"] = later.get(keys[0]) is None
+    results["memory_put_seconds"] = memory_time / puts
+    results["disk_put_seconds"] = disk_time / puts
+    return results
+
+
+def find_cut_points_loop(audio, window, t_center, t_query):
+    """
+    Reference implementation of find_cut_points, the former per-offset summation loop.
+    """
+    audio_pad = np.pad(audio, (window // 2, window // 2), mode="reflect")
+    audio_sum = np.zeros_like(audio)
+    for i in range(window):
+        audio_sum += audio_pad[i : i - window]
+    opt_ts = []
+    for t in range(t_center, audio.shape[0], t_center):
+        stretch = np.abs(audio_sum[t - t_query : t + t_query])
+        opt_ts.append(t - t_query + np.where(stretch == stretch.min())[0][0])
+    return opt_ts
+
+
+def benchmark_segmentation(minutes=5, repeats=3):
+    """
+    Checks the cut points of long inputs against the former loop and the choices of
+    the segment planner, and times the cut point search.
+
+    The input is noise with a short quiet gap near every expected cut point, so both
+    implementations must land in the gaps. The planner must keep the `Config` profile
+    without timings, pick the length with the lowest fitted cost per second once
+    timings of enough lengths exist, write nothing before `flush` and merge the
+    timings of two planners sharing a file. Timings of one model must not affect the
+    plan of another, a peak memory model of the CPU must cap the length by the
+    available RAM, and memory that does not grow with the length must not bound it.
+
+    Args:
+        minutes (float): Length of the input.
+        repeats (int): Number of timed calls per implementation.
+    """
+    import tempfile
+    import types
+    from rvc.infer.segmentation import (
+        MEMORY_FRACTION,
+        SegmentPlanner,
+        available_memory_gb,
+        find_cut_points,
+        largest_length,
+    )
+
+    window, t_center, t_query = 160, 16000 * 38, 16000 * 6
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(int(16000 * 60 * minutes))
+    gaps = []
+    for t in range(t_center, audio.shape[0], t_center):
+        gap = t + int(rng.integers(-t_query // 2, t_query // 2))
+        audio[gap : gap + 1600] *= 1e-3
+        gaps.append(gap)
+
+    expected = find_cut_points_loop(audio, window, t_center, t_query)
+    result = find_cut_points(audio, window, t_center, t_query)
+    loop_time = time_call(
+        lambda: find_cut_points_loop(audio, window, t_center, t_query), repeats
+    )
+    cumsum_time = time_call(
+        lambda: find_cut_points(audio, window, t_center, t_query), repeats
+    )
+    results = {
+        "cut_points": len(result),
+        "identical_cut_points": bool(np.array_equal(expected, result)),
+        "cut_points_in_gaps": all(
+            gap <= t <= gap + 1600 for gap, t in zip(gaps, result)
+        ),
+        "loop_seconds": loop_time,
+        "cumsum_seconds": cumsum_time,
+        "speedup": loop_time / cumsum_time,
+    }
+
+    profile = types.SimpleNamespace(x_pad=1, x_query=6, x_center=38, x_max=41)
+    # elapsed = 0.5 + 0.02 s + 0.002 s^2 has its lowest cost per second of center
+    # at about 16.6 s, with the 2 s of padding added to every segment
+    coefficients = (0.5, 0.02, 0.002)
+    centers = np.arange(10, profile.x_center + 1)
+    lengths = centers + 2
+    cost = coefficients[0] + coefficients[1] * lengths + coefficients[2] * lengths**2
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "segment_timings.json")
+        planner = SegmentPlanner(path)
+        results["default_center"] = planner.plan("cpu", profile).x_center
+        for seconds in (12, 20, 30, 40):
+            elapsed = np.polyval(coefficients[::-1], seconds)
+            planner.record("cpu", seconds, elapsed)
+        results["written_before_flush"] = os.path.exists(path)
+        results["fitted_center"] = planner.plan("cpu", profile).x_center
+        results["expected_center"] = int(centers[np.argmin(cost / centers)])
+        planner.flush()
+        other = SegmentPlanner(path)
+        other.record("cpu", 25, np.polyval(coefficients[::-1], 25))
+        planner.record("cpu", 35, np.polyval(coefficients[::-1], 35))
+        other.flush()
+        planner.flush()
+        results["merged_timings"] = len(SegmentPlanner(path).timings["cpu"])
+
+    # the timings above were recorded without a model, so this one has none
+    planner = SegmentPlanner(None)
+    for seconds in (12, 20, 30, 40):
+        planner.record("cpu", seconds, np.polyval(coefficients[::-1], seconds))
+    results["other_model_center"] = planner.plan("cpu", profile, "model").x_center
+
+    # a cost that keeps falling per second of audio up to the maximum length, and a
+    # peak memory reaching the RAM budget at segments of 30 s, which allow a center
+    # of int((30 - 2) / 1.32) = 21 s
+    coefficients = (5.0, 0.02, 1e-4)
+    budget = available_memory_gb() * MEMORY_FRACTION
+    memory = (0.0, budget / 60, budget / 1800)
+    for seconds in (12, 20, 30, 40):
+        planner.record(
+            "cpu",
+            seconds,
+            np.polyval(coefficients[::-1], seconds),
+            np.polyval(memory[::-1], seconds),
+            model="model",
+        )
+    plan = planner.plan("cpu", profile, "model")
+    results["memory_bound_center"] = f"{plan.x_center} ({plan.source})"
+    results["flat_memory_unbounded"] = (
+        largest_length((1.0, 0.0, 0.0), 2.0) is None
+        and largest_length((1.0, -0.5, 0.0), 2.0) is None
+    )
+    return results
+
+
+def benchmark_index(rows=6000, files=3, repeats=1):
+    """
+    Builds an index from feature files, updates it with a new file and rebuilds it from
+    scratch, checking that the update keeps the vector file aligned with the index and
+    matches the rebuild. Also checks the Auto choices, the default k-means sample size,
+    that recall is evaluated by default and that an IVF-PQ index saved without it is
+    reported as untuned.
+
+    Args:
+        rows (int): Feature rows per file.
+        files (int): Feature files of the first build.
+        repeats (int): Number of timed builds.
+    """
+    import io
+    import json
+    import tempfile
+    import contextlib
+    import faiss
+    from rvc.infer.index_cache import vectors_path
+    from rvc.train.process import extract_index as E
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(64, 768)).astype(np.float32)
+
+    def write_features(feature_dir, i):
+        labels = rng.integers(0, len(centers), rows)
+        features = centers[labels] + 0.5 * rng.normal(size=(rows, 768))
+        np.save(os.path.join(feature_dir, f"{i}.npy"), features.astype(np.float32))
+
+    def run(exp_dir, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            E.extract_index(exp_dir, *args)
+        return output.getvalue()
+
+    def load(exp_dir):
+        index_path = os.path.join(exp_dir, f"{os.path.basename(exp_dir)}.index")
+        with open(index_path[: -len(".index")] + "_index_report.json") as f:
+            report = json.load(f)
+        return faiss.read_index(index_path), np.load(vectors_path(index_path)), report
+
+    budget = E.DEFAULT_MEMORY_BUDGET_MB
+    budget_rows = budget * 1024 * 1024 // (768 * 4)
+    results = {
+        "auto_100k_default_budget": E.resolve_algorithm("Auto", 100000, 768, budget),
+        "auto_100k_256mb": E.resolve_algorithm("Auto", 100000, 768, 256),
+        "auto_300k": E.resolve_algorithm("Auto", 300000, 768, budget),
+        "default_kmeans_sample_rows": min(
+            E.training_rows("KMeans", 10**6), budget_rows // 2
+        ),
+        "kmeans_sample_rows_needed": E.KMEANS_CLUSTERS * E.MIN_POINTS_PER_CENTROID,
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        exp_dir = os.path.join(temp_dir, "model")
+        feature_dir = os.path.join(exp_dir, "extracted")
+        os.makedirs(feature_dir)
+        for i in range(files):
+            write_features(feature_dir, i)
+        output = run(exp_dir, "Auto")
+        results["auto_choice_printed"] = "Auto picked Faiss" in output
+        index, vectors, report = load(exp_dir)
+        results["build_evaluated"] = bool(report["results"])
+        results["build_seconds"] = time_call(
+            lambda: run(exp_dir, "Auto", budget, True), repeats
+        )
+
+        index_path = os.path.join(exp_dir, "model.index")
+        mtime = os.path.getmtime(index_path)
+        run(exp_dir, "Auto")
+        results["unchanged_skipped"] = os.path.getmtime(index_path) == mtime
+
+        write_features(feature_dir, files)
+        update_time = time_call(lambda: run(exp_dir, "Auto"), 1)
+        index, vectors, report = load(exp_dir)
+        expected = np.concatenate(
+            [np.load(os.path.join(feature_dir, f"{i}.npy")) for i in range(files + 1)]
+        )
+        updated = index.reconstruct_n(0, index.ntotal)
+        results["update_mode"] = report["mode"]
+        results["update_vectors"] = int(index.ntotal)
+        results["update_seconds"] = update_time
+        results["update_vectors_aligned"] = bool(
+            np.allclose(vectors, expected, atol=1e-2)
+        )
+
+        run(exp_dir, "Auto", budget, True, True)
+        index, vectors, report = load(exp_dir)
+        results["rebuild_matches_update"] = bool(
+            np.array_equal(index.reconstruct_n(0, index.ntotal), updated)
+        )
+        results["rebuild_evaluated"] = bool(report["results"])
+        results["rebuild_recall"] = report["chosen"]["recall"]
+
+        run(exp_dir, "IVF-PQ", budget, True)
+        index, vectors, report = load(exp_dir)
+        name = report["search_parameter"]
+        results["pq_tuned"] = f"{name}={report['chosen'][name]}"
+        results["pq_recall"] = report["chosen"]["recall"]
+        results["pq_latency_ms"] = report["chosen"]["latency_ms"]
+        results["pq_file_size_mb"] = report["file_size_mb"]
+        output = run(exp_dir, "IVF-PQ", budget, True, False)
+        index, vectors, report = load(exp_dir)
+        results["pq_opt_out_warned"] = not report["results"] and "Warning" in output
+    return results
+
+
+benchmarks = {
+    "rmvpe_decode": benchmark_local_average_cents,
+    "autotune": benchmark_autotune,
+    "retrieval": benchmark_retrieval,
+    "batched": benchmark_batched,
+    "feature_cache": benchmark_feature_cache,
+    "segmentation": benchmark_segmentation,
+    "index": benchmark_index,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run micro-benchmarks.")
+    parser.add_argument("benchmark", choices=list(benchmarks), nargs="+")
+    args = parser.parse_args()
+    for name in args.benchmark:
+        print(f"{name}:")
+        for key, value in benchmarks[name]().items():
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
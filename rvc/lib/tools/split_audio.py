@@ -2,7 +2,7 @@ import numpy as np
 import librosa
 
 
-def process_audio(audio, sr=16000, silence_thresh=-60, min_silence_len=250):
+def process_audio(audio, sr=16000, silence_thresh=-60, min_silence_len=250, grid=1):
     """
     Splits an audio signal into segments using a fixed frame size and hop size.
 
@@ -11,6 +11,8 @@ def process_audio(audio, sr=16000, silence_thresh=-60, min_silence_len=250):
     - sr (int): The sample rate of the input audio (default is 16000).
     - silence_thresh (int): Silence threshold (default =-60dB)
     - min_silence_len (int): Minimum silence duration (default 250ms).
+    - grid (int): Segment boundaries are widened outwards to multiples of this many
+      samples, e.g. the F0 hop so a whole-input contour can be sliced per segment (default 1).
 
     Returns:
     - list of np.ndarray: A list of audio segments.
@@ -21,6 +23,9 @@ def process_audio(audio, sr=16000, silence_thresh=-60, min_silence_len=250):
     intervals = librosa.effects.split(
         audio, top_db=-silence_thresh, frame_length=frame_length, hop_length=hop_length
     )
+    if grid > 1:
+        intervals[:, 0] = intervals[:, 0] // grid * grid
+        intervals[:, 1] = np.minimum(-(-intervals[:, 1] // grid) * grid, len(audio))
     audio_segments = [audio[start:end] for start, end in intervals]
 
     return audio_segments, intervals
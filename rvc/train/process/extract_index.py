@@ -1,16 +1,622 @@
 import os
 import sys
+import json
+import time
 from multiprocessing import cpu_count
 
 import faiss
 import numpy as np
-from sklearn.cluster import MiniBatchKMeans
+from distutils.util import strtobool
 
-# Parse command line arguments
-exp_dir = str(sys.argv[1])
-index_algorithm = str(sys.argv[2])
+now_dir = os.getcwd()
+sys.path.append(now_dir)
 
-try:
+from rvc.infer.index_cache import load_vectors, vectors_path
+
+INDEX_ALGORITHMS = ["Auto", "Faiss", "KMeans", "IVF-PQ", "OPQ-IVF-PQ", "HNSW"]
+# Above this many rows, Auto and KMeans reduce the set to its k-means centroids
+KMEANS_MIN_ROWS = 2e5
+KMEANS_CLUSTERS = 10000
+KMEANS_ITERATIONS = 20
+PQ_SUBQUANTIZERS = 64
+HNSW_NEIGHBORS = 32
+# Retrieval blends neighbours in float32, half precision storage is plenty
+VECTORS_DTYPE = np.float16
+
+# Memory used for the training sample and streamed chunks. Half of it holds the
+# sample, so the default fits the KMEANS_CLUSTERS * MIN_POINTS_PER_CENTROID
+# 768-dimensional float32 vectors (1.1 GB) the k-means reduction needs. Auto also
+# compresses sets whose exact vectors would not fit in it.
+DEFAULT_MEMORY_BUDGET_MB = 3072
+# faiss warns below this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+# faiss subsamples k-means training sets to this many points per centroid
+MAX_POINTS_PER_CENTROID = 256
+# An update retrains the index once new vectors sit this much farther (relatively)
+# from their IVF centroids than the vectors it was built from
+DRIFT_THRESHOLD = 0.25
+
+# Recall report
+RECALL_K = 8
+RECALL_QUERIES = 1000
+RECALL_TARGET = 0.9
+NPROBES = [1, 2, 4, 8, 16, 32, 64]
+EF_SEARCHES = [16, 32, 64, 128, 256]
+# Index types whose saved search parameter trades recall for speed
+TUNED_ALGORITHMS = ("IVF-PQ", "OPQ-IVF-PQ", "HNSW")
+
+
+def scan_features(feature_dir):
+    """
+    Returns the feature files of a model with their row counts, and the feature
+    dimension, reading only the file headers.
+
+    Args:
+        feature_dir (str): The `extracted` directory of the model.
+    """
+    files = []
+    dim = None
+    for name in sorted(os.listdir(feature_dir)):
+        if not name.endswith(".npy"):
+            continue
+        file_path = os.path.join(feature_dir, name)
+        rows, dim = np.load(file_path, mmap_mode="r").shape
+        files.append((file_path, rows))
+    if not files:
+        raise ValueError(f"No feature files found in {feature_dir}.")
+    return files, dim
+
+
+def iter_features(files, chunk_rows):
+    """
+    Yields the features of the files as float32 chunks of at most `chunk_rows` rows,
+    memory-mapping each file so only one chunk is resident at a time.
+
+    Args:
+        files (list): Pairs of file path and row count, from `scan_features`.
+        chunk_rows (int): Maximum rows per chunk.
+    """
+    for file_path, _ in files:
+        data = np.load(file_path, mmap_mode="r")
+        for start in range(0, len(data), chunk_rows):
+            yield np.ascontiguousarray(data[start : start + chunk_rows], np.float32)
+
+
+def reservoir_sample(files, size, chunk_rows, seed=0):
+    """
+    Draws a uniform sample of `size` rows over all feature files in a single pass.
+
+    Args:
+        files (list): Pairs of file path and row count, from `scan_features`.
+        size (int): Number of rows to sample.
+        chunk_rows (int): Rows read at a time.
+        seed (int): Random seed.
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    seen = 0
+    for chunk in iter_features(files, chunk_rows):
+        if reservoir is None:
+            reservoir = np.empty((size, chunk.shape[1]), np.float32)
+        fill = min(len(chunk), max(0, size - seen))
+        reservoir[seen : seen + fill] = chunk[:fill]
+        if fill < len(chunk):
+            # Algorithm R: row t replaces a random slot with probability size / (t + 1)
+            positions = np.arange(seen + fill, seen + len(chunk))
+            slots = rng.integers(0, positions + 1)
+            keep = slots < size
+            reservoir[slots[keep]] = chunk[fill:][keep]
+        seen += len(chunk)
+    return reservoir[: min(seen, size)]
+
+
+def resolve_algorithm(index_algorithm, n_rows, dim, memory_budget_mb):
+    """
+    Returns the index type to build. Auto reduces large sets with k-means and otherwise
+    keeps exact IVF-Flat vectors as before, unless they would not fit in the memory
+    budget, in which case it compresses them with OPQ+IVF-PQ.
+
+    Args:
+        index_algorithm (str): One of INDEX_ALGORITHMS.
+        n_rows (int): Number of feature vectors.
+        dim (int): Feature dimension.
+        memory_budget_mb (int): The memory budget of the build.
+    """
+    if index_algorithm not in INDEX_ALGORITHMS:
+        raise ValueError(f"Unknown index algorithm: {index_algorithm}")
+    if index_algorithm == "Auto":
+        if n_rows > KMEANS_MIN_ROWS:
+            return "KMeans"
+        if n_rows * dim * 4 > memory_budget_mb * 1024 * 1024:
+            return "OPQ-IVF-PQ"
+        return "Faiss"
+    if index_algorithm in ("IVF-PQ", "OPQ-IVF-PQ") and n_rows < 1000:
+        print(f"Too few vectors ({n_rows}) to train {index_algorithm}, using Faiss.")
+        return "Faiss"
+    return index_algorithm
+
+
+def ivf_lists(n_rows):
+    return max(1, min(int(16 * np.sqrt(n_rows)), n_rows // MIN_POINTS_PER_CENTROID))
+
+
+def index_factory_string(algorithm, n_rows):
+    """
+    Returns the FAISS factory string of an index type for a number of vectors.
+
+    Args:
+        algorithm (str): Index type, from `resolve_algorithm`.
+        n_rows (int): Number of vectors the index holds.
+    """
+    n_ivf = ivf_lists(n_rows)
+    if algorithm == "HNSW":
+        return f"HNSW{HNSW_NEIGHBORS},Flat"
+    if algorithm in ("IVF-PQ", "OPQ-IVF-PQ"):
+        # 8-bit codes need 256 centroids per subquantizer
+        nbits = 8 if n_rows >= 256 * MIN_POINTS_PER_CENTROID else 4
+        pq = f"IVF{n_ivf},PQ{PQ_SUBQUANTIZERS}x{nbits}"
+        return f"OPQ{PQ_SUBQUANTIZERS},{pq}" if algorithm == "OPQ-IVF-PQ" else pq
+    return f"IVF{n_ivf},Flat"
+
+
+def training_rows(algorithm, n_rows):
+    """
+    Returns how many training vectors an index type can make use of, beyond which
+    faiss would subsample them anyway.
+
+    Args:
+        algorithm (str): Index type, from `resolve_algorithm`.
+        n_rows (int): Number of vectors the index holds.
+    """
+    if algorithm == "HNSW":
+        return 0
+    if algorithm == "KMeans" and n_rows > KMEANS_MIN_ROWS:
+        return KMEANS_CLUSTERS * MAX_POINTS_PER_CENTROID
+    rows = ivf_lists(n_rows) * MAX_POINTS_PER_CENTROID
+    if algorithm in ("IVF-PQ", "OPQ-IVF-PQ"):
+        rows = max(rows, 256 * MAX_POINTS_PER_CENTROID)
+    return rows
+
+
+def search_parameter(index):
+    """
+    Returns the name, the candidate values, a setter and the current value of the
+    search-time parameter of an index, or None if it has none.
+    """
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        return (
+            "nprobe",
+            [n for n in NPROBES if n <= ivf.nlist],
+            lambda n: setattr(ivf, "nprobe", n),
+            ivf.nprobe,
+        )
+    except RuntimeError:
+        pass
+    hnsw = faiss.downcast_index(
+        index.index if isinstance(index, faiss.IndexPreTransform) else index
+    )
+    if isinstance(hnsw, faiss.IndexHNSW):
+        return (
+            "efSearch",
+            EF_SEARCHES,
+            lambda n: setattr(hnsw.hnsw, "efSearch", n),
+            hnsw.hnsw.efSearch,
+        )
+    return None
+
+
+def _neighbours(ix, ids):
+    # queries are indexed vectors, so leave out the query itself
+    return [
+        [j for j in row if j != own and j >= 0][:RECALL_K] for row, own in zip(ix, ids)
+    ]
+
+
+def exact_search(vectors, queries, chunk_rows):
+    """
+    Exact k-nearest-neighbour search over vectors read in chunks, e.g. from a
+    memory-mapped file.
+
+    Args:
+        vectors (np.ndarray): The vectors to search.
+        queries (np.ndarray): The queries, float32.
+        chunk_rows (int): Rows read at a time.
+    """
+    heap = faiss.ResultHeap(len(queries), RECALL_K + 1)
+    for start in range(0, len(vectors), chunk_rows):
+        chunk = np.ascontiguousarray(vectors[start : start + chunk_rows], np.float32)
+        distances, ix = faiss.knn(queries, chunk, min(RECALL_K + 1, len(chunk)))
+        heap.add_result(distances, ix + start)
+    heap.finalize()
+    return heap.D, heap.I
+
+
+def evaluate_index(index, vectors, chunk_rows):
+    """
+    Measures recall@8 against exact search and the search latency of an index for every
+    candidate value of its search parameter, on a sample of its own vectors as queries.
+
+    Args:
+        index (faiss.Index): The index, holding `vectors` in order.
+        vectors (np.ndarray): The indexed vectors, possibly memory-mapped.
+        chunk_rows (int): Rows read at a time for the exact search.
+    """
+    rng = np.random.default_rng(0)
+    ids = np.sort(
+        rng.choice(len(vectors), min(RECALL_QUERIES, len(vectors)), replace=False)
+    )
+    queries = np.ascontiguousarray(vectors[ids], np.float32)
+    start = time.perf_counter()
+    truth = _neighbours(exact_search(vectors, queries, chunk_rows)[1], ids)
+    exact_ms = 1000 * (time.perf_counter() - start) / len(ids)
+
+    parameter = search_parameter(index)
+    name, values, setter, _ = parameter if parameter else (None, [None], None, None)
+    results = []
+    for value in values:
+        if setter is not None:
+            setter(value)
+        start = time.perf_counter()
+        found = _neighbours(index.search(queries, RECALL_K + 1)[1], ids)
+        latency_ms = 1000 * (time.perf_counter() - start) / len(ids)
+        recall = np.mean(
+            [len(set(a) & set(b)) / max(1, len(b)) for a, b in zip(found, truth)]
+        )
+        results.append(
+            {
+                name or "setting": value,
+                "recall": float(recall),
+                "latency_ms": latency_ms,
+            }
+        )
+    return name, results, exact_ms
+
+
+def choose_setting(name, results):
+    """
+    Returns the cheapest search setting that reaches RECALL_TARGET, or the one with the
+    best recall.
+    """
+    for result in results:
+        if result["recall"] >= RECALL_TARGET:
+            return result
+    return max(results, key=lambda result: result["recall"])
+
+
+def new_index(dim, factory):
+    index = faiss.index_factory(dim, factory)
+    try:
+        faiss.extract_index_ivf(index).nprobe = 1
+    except RuntimeError:
+        pass
+    return index
+
+
+def coarse_errors(index, chunk):
+    """
+    Returns the squared distances of vectors to their nearest IVF centroid, or None
+    for indexes without a coarse quantizer.
+
+    Args:
+        index (faiss.Index): A trained index.
+        chunk (np.ndarray): float32 vectors.
+    """
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+    if isinstance(index, faiss.IndexPreTransform):
+        for i in range(index.chain.size()):
+            chunk = index.chain.at(i).apply(chunk)
+    distances, _ = ivf.quantizer.search(chunk, 1)
+    return distances[:, 0]
+
+
+def mean_coarse_error(index, chunks):
+    """
+    Returns the mean of `coarse_errors` over chunks of vectors, or None.
+    """
+    total, count = 0.0, 0
+    for chunk in chunks:
+        errors = coarse_errors(index, chunk)
+        if errors is None:
+            return None
+        total += float(errors.sum())
+        count += len(errors)
+    return total / max(count, 1)
+
+
+def add_vectors(index, chunks, vectors_out, measure=True):
+    """
+    Adds vectors to an index chunk by chunk, copying them into the companion vector
+    array as they go. Returns the mean `coarse_errors` of the added vectors when
+    `measure` is set and the index has a coarse quantizer.
+
+    Args:
+        index (faiss.Index): A trained index.
+        chunks (iterable): float32 arrays of vectors.
+        vectors_out (np.ndarray): Array receiving the vectors at their index ids.
+        measure (bool): Whether to measure the coarse quantization error.
+    """
+    total, count = 0.0, 0
+    for chunk in chunks:
+        errors = coarse_errors(index, chunk) if measure else None
+        if errors is not None:
+            total += float(errors.sum())
+            count += len(errors)
+        start = index.ntotal
+        index.add(chunk)
+        vectors_out[start : start + len(chunk)] = chunk
+    return total / count if count else None
+
+
+def open_vectors(index_path, rows, dim):
+    """
+    Creates the companion vector file of an index as a writable memory map under a
+    temporary name. `commit_vectors` moves it into place.
+
+    Args:
+        index_path (str): Path of the index file.
+        rows (int): Number of vectors.
+        dim (int): Vector dimension.
+    """
+    temp_path = vectors_path(index_path) + ".tmp"
+    return np.lib.format.open_memmap(
+        temp_path, mode="w+", dtype=VECTORS_DTYPE, shape=(rows, dim)
+    )
+
+
+def commit_vectors(index_path, vectors):
+    """
+    Flushes a vector file from `open_vectors` and replaces the previous one atomically,
+    so processes that still map the previous version keep a valid view.
+
+    Args:
+        index_path (str): Path of the index file.
+        vectors (np.memmap): The vector file.
+    """
+    vectors.flush()
+    path = vectors_path(index_path)
+    os.replace(vectors.filename, path)
+    return path
+
+
+def print_report(report):
+    if report["mode"] == "update":
+        print(
+            f"Added {report['new_vectors']} vectors from {report['new_files']} new files, "
+            f"skipped {report['skipped_vectors']} vectors in {report['skipped_files']} "
+            "unchanged files."
+        )
+    print(
+        f"Index {report['factory']} ({report['algorithm']}): {report['vectors']} vectors, "
+        f"{report['file_size_mb']:.1f} MB (vectors {report['vectors_file_size_mb']:.1f} MB), "
+        f"built in {report['build_seconds']:.1f} seconds."
+    )
+    print(
+        "  phases: "
+        + ", ".join(
+            f"{phase} {seconds:.1f}s" for phase, seconds in report["phases"].items()
+        )
+    )
+    name = report["search_parameter"]
+    if not report["results"]:
+        setting = f"{name}={report['search_value']}" if name else "default"
+        if report["algorithm"] in TUNED_ALGORITHMS:
+            print(
+                f"  Warning: {setting} saved untuned, recall not evaluated. Its recall "
+                "can be low, build with --index_evaluate true to tune it."
+            )
+        else:
+            print(f"  {setting} saved, recall not evaluated.")
+        return
+    for result in report["results"]:
+        setting = f"{name}={result[name]}" if name else "default"
+        chosen = " (saved)" if result is report["chosen"] else ""
+        print(
+            f"  {setting}: recall@{RECALL_K} {result['recall']:.3f}, "
+            f"{result['latency_ms']:.3f} ms/query{chosen}"
+        )
+    print(f"  exact search: {report['exact_latency_ms']:.3f} ms/query")
+
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_manifest(manifest_path):
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_manifest(manifest_path, manifest):
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    os.replace(temp_path, manifest_path)
+
+
+def plan_update(manifest, files, dim, index_algorithm):
+    """
+    Compares the feature files with the manifest of an existing index. Returns the new
+    files, the unchanged ones and the reason a full rebuild is needed, if any.
+
+    Args:
+        manifest (dict): The manifest written with the index.
+        files (list): Pairs of file path and row count, from `scan_features`.
+        dim (int): Feature dimension.
+        index_algorithm (str): The requested index algorithm.
+    """
+    known = manifest["files"]
+    names = {os.path.basename(file_path) for file_path, _ in files}
+    new_files, skipped = [], []
+    for file_path, rows in files:
+        entry = known.get(os.path.basename(file_path))
+        if entry is None:
+            new_files.append((file_path, rows))
+        elif entry != {**file_signature(file_path), "rows": rows}:
+            return new_files, skipped, f"'{file_path}' changed"
+        else:
+            skipped.append((file_path, rows))
+    removed = [name for name in known if name not in names]
+    if removed:
+        return new_files, skipped, f"{len(removed)} feature files were removed"
+    if manifest["dimension"] != dim:
+        return new_files, skipped, "the feature dimension changed"
+    if manifest["index_algorithm"] != index_algorithm:
+        return new_files, skipped, "the index algorithm changed"
+    return new_files, skipped, None
+
+
+def check_update(
+    index, manifest, new_files, index_algorithm, memory_budget_mb, chunk_rows
+):
+    """
+    Returns the reason new vectors cannot simply be added to an existing index, or None.
+
+    Args:
+        index (faiss.Index): The existing index.
+        manifest (dict): The manifest written with the index.
+        new_files (list): Pairs of file path and row count of the new features.
+        index_algorithm (str): The requested index algorithm.
+        memory_budget_mb (int): The memory budget of the build.
+        chunk_rows (int): Rows read at a time.
+    """
+    if manifest.get("reduced"):
+        return "the index holds k-means centroids of the features"
+    if index.ntotal != manifest["vectors"]:
+        return "the index does not match its manifest"
+    total = index.ntotal + sum(rows for _, rows in new_files)
+    algorithm = resolve_algorithm(
+        index_algorithm, total, manifest["dimension"], memory_budget_mb
+    )
+    if algorithm != manifest["algorithm"]:
+        return f"{index_algorithm} picks another index type for {total} vectors"
+    try:
+        nlist = faiss.extract_index_ivf(index).nlist
+    except RuntimeError:
+        return None
+    if ivf_lists(total) > 2 * nlist:
+        return f"{total} vectors outgrow {nlist} IVF lists"
+    baseline = manifest.get("coarse_error")
+    if baseline:
+        error = mean_coarse_error(index, iter_features(new_files, chunk_rows))
+        drift = error / baseline - 1
+        print(f"New features are {drift:+.1%} farther from the IVF centroids.")
+        if drift > DRIFT_THRESHOLD:
+            return f"the features drifted by {drift:.1%}"
+    return None
+
+
+def finish_index(
+    exp_dir, index, vectors, algorithm, chunk_rows, end_phase, report, evaluate=True
+):
+    """
+    Writes a built or updated index, its vector file and the report, and returns the
+    report. With `evaluate`, the search parameter is tuned on a recall measurement
+    first, otherwise the index keeps its current setting and the report warns about it
+    for the TUNED_ALGORITHMS.
+
+    Args:
+        exp_dir (str): The model directory in `logs`.
+        index (faiss.Index): The index.
+        vectors (np.memmap): Its vector file, from `open_vectors`.
+        algorithm (str): Index type, from `resolve_algorithm`.
+        chunk_rows (int): Rows read at a time.
+        end_phase (callable): Records the time of a phase, returns the phase times.
+        report (dict): Report fields collected so far.
+        evaluate (bool): Whether to measure recall and tune the search parameter.
+    """
+    model_name = os.path.basename(exp_dir)
+    index_path = os.path.join(exp_dir, f"{model_name}.index")
+
+    results, chosen, exact_ms = [], None, None
+    if evaluate:
+        name, results, exact_ms = evaluate_index(index, vectors, chunk_rows)
+        setting = search_parameter(index)
+        if algorithm in ("Faiss", "KMeans"):
+            chosen = results[0]
+            if setting:
+                setting[2](1)
+        else:
+            chosen = choose_setting(name, results)
+            if setting:
+                setting[2](chosen[name])
+        end_phase("evaluate")
+    setting = search_parameter(index)
+    name, value = (setting[0], setting[3]) if setting else (None, None)
+
+    vectors_filepath = commit_vectors(index_path, vectors)
+    faiss.write_index(index, index_path)
+    print(f"Saved index file '{index_path}'")
+    phases = end_phase("write")
+
+    report.update(
+        {
+            "algorithm": algorithm,
+            "vectors": int(index.ntotal),
+            "dimension": int(vectors.shape[1]),
+            "file_size_mb": os.path.getsize(index_path) / (1024 * 1024),
+            "vectors_file_size_mb": os.path.getsize(vectors_filepath) / (1024 * 1024),
+            "build_seconds": sum(
+                seconds for phase, seconds in phases.items() if phase != "evaluate"
+            ),
+            "phases": phases,
+            "search_parameter": name,
+            "search_value": value,
+            "results": results,
+            "chosen": chosen,
+            "exact_latency_ms": exact_ms,
+        }
+    )
+    print_report(report)
+    with open(
+        os.path.join(exp_dir, f"{model_name}_index_report.json"), "w"
+    ) as report_file:
+        json.dump(report, report_file, indent=4)
+    return report
+
+
+def extract_index(
+    exp_dir,
+    index_algorithm,
+    memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+    rebuild=False,
+    evaluate=True,
+):
+    """
+    Builds or updates the retrieval index of a model from its extracted features and
+    writes a report next to it with the file size, the build time, and unless
+    `evaluate` is turned off, recall@8 and search latency.
+
+    Features are streamed from disk: a reservoir sample of at most half the memory
+    budget trains the index (or the k-means reduction, with faiss on every core), then
+    vectors are added file by file in chunks. Only the index itself grows with the
+    dataset.
+
+    The IVF-PQ types store 64-byte codes instead of 3 KB per vector and HNSW trades
+    file size for fast search. Their search parameter (nprobe or efSearch) is saved at
+    the cheapest value reaching a recall@8 of RECALL_TARGET against exact search. When
+    `evaluate` is turned off it stays at nprobe 1 or the faiss default efSearch, with a
+    warning. Faiss and KMeans keep nprobe 1.
+
+    A manifest records the size and mtime of every feature file in the index. When the
+    index exists, only new files are added to it, keeping its trained structure. It is
+    rebuilt instead when files changed or were removed, when the new features drifted
+    more than DRIFT_THRESHOLD from the IVF centroids, or when the data outgrew them.
+
+    Args:
+        exp_dir (str): The model directory in `logs`.
+        index_algorithm (str): One of INDEX_ALGORITHMS.
+        memory_budget_mb (int): Memory for the training sample and streamed chunks.
+        rebuild (bool): Rebuild the index from scratch even if it is up to date.
+        evaluate (bool): Measure recall and latency and tune the search parameter.
+            False skips the measurement.
+    """
     feature_dir = os.path.join(exp_dir, f"extracted")
     model_name = os.path.basename(exp_dir)
 
@@ -22,56 +628,206 @@ try:
 
     index_filename_added = f"{model_name}.index"
     index_filepath_added = os.path.join(exp_dir, index_filename_added)
+    manifest_path = os.path.join(exp_dir, f"{model_name}_index_manifest.json")
 
-    if os.path.exists(index_filepath_added):
-        pass
-    else:
-        npys = []
-        listdir_res = sorted(os.listdir(feature_dir))
-
-        for name in listdir_res:
-            file_path = os.path.join(feature_dir, name)
-            phone = np.load(file_path)
-            npys.append(phone)
-
-        big_npy = np.concatenate(npys, axis=0)
-
-        big_npy_idx = np.arange(big_npy.shape[0])
-        np.random.shuffle(big_npy_idx)
-        big_npy = big_npy[big_npy_idx]
-
-        if big_npy.shape[0] > 2e5 and (
-            index_algorithm == "Auto" or index_algorithm == "KMeans"
-        ):
-            big_npy = (
-                MiniBatchKMeans(
-                    n_clusters=10000,
-                    verbose=True,
-                    batch_size=256 * cpu_count(),
-                    compute_labels=False,
-                    init="random",
-                )
-                .fit(big_npy)
-                .cluster_centers_
+    faiss.omp_set_num_threads(cpu_count())
+    phases = {}
+    phase_start = time.perf_counter()
+
+    def end_phase(phase):
+        nonlocal phase_start
+        now = time.perf_counter()
+        phases[phase] = phases.get(phase, 0.0) + now - phase_start
+        phase_start = now
+        return phases
+
+    files, dim = scan_features(feature_dir)
+    n_rows = sum(rows for _, rows in files)
+    budget_rows = max(1, int(memory_budget_mb * 1024 * 1024) // (dim * 4))
+    chunk_rows = max(RECALL_K + 1, budget_rows // 8)
+    end_phase("scan")
+
+    if os.path.exists(index_filepath_added) and not rebuild:
+        manifest = load_manifest(manifest_path)
+        if manifest is None:
+            print(
+                f"Index file '{index_filepath_added}' has no manifest, keeping it. "
+                "Rebuild it to enable incremental updates."
+            )
+            return
+        new_files, skipped, reason = plan_update(manifest, files, dim, index_algorithm)
+        if reason is None and not new_files:
+            print(
+                f"Index file '{index_filepath_added}' is up to date, skipped "
+                f"{len(skipped)} files."
+            )
+            return
+        if reason is None:
+            index_added = faiss.read_index(index_filepath_added)
+            reason = check_update(
+                index_added,
+                manifest,
+                new_files,
+                index_algorithm,
+                memory_budget_mb,
+                chunk_rows,
+            )
+        old_vectors = None
+        if reason is None:
+            old_vectors = load_vectors(index_filepath_added, index_added)
+            if old_vectors is None:
+                reason = "its vector file is missing"
+        end_phase("check")
+        if reason is None:
+            new_rows = sum(rows for _, rows in new_files)
+            vectors = open_vectors(
+                index_filepath_added, index_added.ntotal + new_rows, dim
             )
+            for start in range(0, len(old_vectors), chunk_rows):
+                chunk = old_vectors[start : start + chunk_rows]
+                vectors[start : start + len(chunk)] = chunk
+            # release the old file before it is replaced
+            del old_vectors
+            add_vectors(
+                index_added,
+                iter_features(new_files, chunk_rows),
+                vectors,
+                measure=False,
+            )
+            end_phase("add")
+            report = finish_index(
+                exp_dir,
+                index_added,
+                vectors,
+                manifest["algorithm"],
+                chunk_rows,
+                end_phase,
+                {
+                    "mode": "update",
+                    "factory": manifest["factory"],
+                    "memory_budget_mb": memory_budget_mb,
+                    "new_files": len(new_files),
+                    "new_vectors": new_rows,
+                    "skipped_files": len(skipped),
+                    "skipped_vectors": sum(rows for _, rows in skipped),
+                },
+                evaluate,
+            )
+            manifest["vectors"] = report["vectors"]
+            manifest["files"].update(
+                {
+                    os.path.basename(file_path): {
+                        **file_signature(file_path),
+                        "rows": rows,
+                    }
+                    for file_path, rows in new_files
+                }
+            )
+            save_manifest(manifest_path, manifest)
+            return
+        print(f"Rebuilding the index: {reason}.")
 
-        n_ivf = min(int(16 * np.sqrt(big_npy.shape[0])), big_npy.shape[0] // 39)
+    algorithm = resolve_algorithm(index_algorithm, n_rows, dim, memory_budget_mb)
+    if index_algorithm == "Auto":
+        print(f"Auto picked {algorithm} for {n_rows} vectors.")
+    sample_rows = min(n_rows, training_rows(algorithm, n_rows), budget_rows // 2)
+    reduced = algorithm == "KMeans" and n_rows > KMEANS_MIN_ROWS
 
-        # index_added
-        index_added = faiss.index_factory(768, f"IVF{n_ivf},Flat")
-        index_ivf_added = faiss.extract_index_ivf(index_added)
-        index_ivf_added.nprobe = 1
-        index_added.train(big_npy)
+    sample = None
+    if sample_rows:
+        sample = reservoir_sample(files, sample_rows, chunk_rows)
+        print(f"Sampled {len(sample)} of {n_rows} vectors for training.")
+    end_phase("sample")
 
-        batch_size_add = 8192
-        for i in range(0, big_npy.shape[0], batch_size_add):
-            index_added.add(big_npy[i : i + batch_size_add])
+    if reduced:
+        if len(sample) < KMEANS_CLUSTERS * MIN_POINTS_PER_CENTROID:
+            print(
+                f"Warning: {len(sample)} training vectors for {KMEANS_CLUSTERS} clusters, "
+                "raise the memory budget for better centroids."
+            )
+        kmeans = faiss.Kmeans(
+            dim,
+            KMEANS_CLUSTERS,
+            niter=KMEANS_ITERATIONS,
+            verbose=True,
+            seed=1234,
+            max_points_per_centroid=MAX_POINTS_PER_CENTROID,
+        )
+        kmeans.train(sample)
+        # the index holds the centroids instead of the vectors
+        centroids = kmeans.centroids
+        factory = index_factory_string(algorithm, len(centroids))
+        index_added = new_index(dim, factory)
+        index_added.train(centroids)
+        end_phase("train")
+        vectors = open_vectors(index_filepath_added, len(centroids), dim)
+        coarse_error = add_vectors(
+            index_added,
+            (
+                centroids[i : i + chunk_rows]
+                for i in range(0, len(centroids), chunk_rows)
+            ),
+            vectors,
+        )
+    else:
+        factory = index_factory_string(algorithm, n_rows)
+        index_added = new_index(dim, factory)
+        if not index_added.is_trained:
+            index_added.train(sample)
+        end_phase("train")
+        vectors = open_vectors(index_filepath_added, n_rows, dim)
+        coarse_error = add_vectors(
+            index_added, iter_features(files, chunk_rows), vectors
+        )
+    del sample
+    end_phase("add")
 
-        faiss.write_index(index_added, index_filepath_added)
-        print(f"Saved index file '{index_filepath_added}'")
+    report = finish_index(
+        exp_dir,
+        index_added,
+        vectors,
+        algorithm,
+        chunk_rows,
+        end_phase,
+        {
+            "mode": "build",
+            "factory": factory,
+            "memory_budget_mb": memory_budget_mb,
+            "training_vectors": sample_rows,
+        },
+        evaluate,
+    )
+    save_manifest(
+        manifest_path,
+        {
+            "index_algorithm": index_algorithm,
+            "algorithm": algorithm,
+            "factory": factory,
+            "dimension": int(dim),
+            "vectors": report["vectors"],
+            "reduced": reduced,
+            "coarse_error": coarse_error,
+            "files": {
+                os.path.basename(file_path): {**file_signature(file_path), "rows": rows}
+                for file_path, rows in files
+            },
+        },
+    )
 
-except Exception as error:
-    print(f"An error occurred extracting the index: {error}")
-    print(
-        "If you are running this code in a virtual environment, make sure you have enough GPU available to generate the Index file."
+
+if __name__ == "__main__":
+    exp_dir = str(sys.argv[1])
+    index_algorithm = str(sys.argv[2])
+    memory_budget_mb = (
+        int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_MEMORY_BUDGET_MB
     )
+    rebuild = bool(strtobool(sys.argv[4])) if len(sys.argv) > 4 else False
+    evaluate = bool(strtobool(sys.argv[5])) if len(sys.argv) > 5 else True
+
+    try:
+        extract_index(exp_dir, index_algorithm, memory_budget_mb, rebuild, evaluate)
+    except Exception as error:
+        print(f"An error occurred extracting the index: {error}")
+        print(
+            "If you are running this code in a virtual environment, make sure you have enough GPU available to generate the Index file."
+        )
@@ -1,6 +1,8 @@
 import torch
 from datetime import datetime
 
+from rvc.infer.optimized_model import is_optimized_model, read_optimized_metadata
+
 
 def prettify_date(date_str):
     if date_str is None:
@@ -13,7 +15,11 @@ def prettify_date(date_str):
 
 
 def model_information(path):
-    model_data = torch.load(path, map_location="cpu", weights_only=True)
+    if is_optimized_model(path):
+        # only the header is read, not the weights
+        model_data = read_optimized_metadata(path)
+    else:
+        model_data = torch.load(path, map_location="cpu", weights_only=True)
 
     print(f"Loaded model from {path}")
 
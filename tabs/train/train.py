@@ -313,7 +313,7 @@ def train_tab():
                     interactive=True,
                     allow_custom_value=True,
                 )
-                architecture = gr.Radio( # silinebilir satır
+                architecture = gr.Radio(  # silinebilir satır
                     label=i18n("Architecture"),
                     info=i18n(
                         "Choose the model architecture:\n- **RVC (V2)**: Default option, compatible with all clients.\n- **Applio**: Advanced quality with improved vocoders and higher sample rates, Applio-only."
@@ -618,9 +618,7 @@ def train_tab():
                 500,
                 step=1,
                 label=i18n("Toplam Epoch"),
-                info=i18n(
-                    "Model eğitim süreci için toplam epoch sayısını belirtir."
-                ),
+                info=i18n("Model eğitim süreci için toplam epoch sayısını belirtir."),
                 interactive=True,
             )
         with gr.Accordion(i18n("Ekstra Ayarlar"), open=False):
@@ -635,13 +633,13 @@ def train_tab():
                         interactive=True,
                     )
                     save_every_weights = gr.Checkbox(
-                    label=i18n("Her Ağırlığı Kaydet"),
-                    info=i18n(
-                        "Bu ayar, her epoch sonunda modelin ağırlıklarının kaydedilmesini sağlar."
-                    ),
-                    value=True,
-                    interactive=True,
-                )
+                        label=i18n("Her Ağırlığı Kaydet"),
+                        info=i18n(
+                            "Bu ayar, her epoch sonunda modelin ağırlıklarının kaydedilmesini sağlar."
+                        ),
+                        value=True,
+                        interactive=True,
+                    )
                 pretrained = gr.Checkbox(
                     label=i18n("Önceden Eğitilmiş"),
                     info=i18n(
@@ -740,7 +738,7 @@ def train_tab():
                 info=i18n(
                     "KMeans is a clustering algorithm that divides the dataset into K clusters. This setting is particularly useful for large datasets."
                 ),
-                choices=["Auto", "Faiss", "KMeans"],
+                choices=["Auto", "Faiss", "KMeans", "IVF-PQ", "OPQ-IVF-PQ", "HNSW"],
                 value="Auto",
                 interactive=True,
             )